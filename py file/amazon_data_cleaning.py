@@ -23,23 +23,48 @@
 # In[1]:
 
 
+import os
+import sys
 import pandas as pd             # Data handling
-import plotly.express as px     # Simple interactive charts
-import plotly.graph_objects as go  # Custom interactive charts
-from plotly.subplots import make_subplots  # Multiple plots in one figure
-
-# Load dataset
-amazon = pd.read_csv(
-    r"C:\datanomics\python\project\Advanced_python_project\file\raw data\Amazon.csv",
-    low_memory=False
-)
 
-df = amazon.copy()  # Work on a copy
+import charts  # plotly figures (plotly is imported when a figure is built)
+from backends import get_backend  # pandas / polars dataframe engines
+from price_analysis import analyze_prices  # price bins & elasticity
+from geo import GeoRollup  # country -> state -> city rollup
+from time_rollups import TimeRollup  # day/week/month/quarter/year rollups
+from customer_features import CustomerFeatures, new_vs_returning_monthly  # RFM table
+from orders import OrderTable  # one row per order_id
+from money import MONEY_COLUMNS, to_dollars  # money is stored as integer cents
+from discounts import DiscountAnalytics  # single-scan discount tables
+from concentration import concentration  # Lorenz / Gini / top-X% shares
+from sellers import SellerScorecard  # per-seller statistics & rankings
+from windows import RollingWindows  # 7 / 28 / 90-day windows and KPI deltas
+from pipeline import load_clean, print_report  # cached, deduplicated and validated rows
+
+# A directory or glob of partition files also works with backend.load;
+# pipeline.py --data handles those end to end (see ingest.py)
+DATA_PATH = r"C:\datanomics\python\project\Advanced_python_project\file\raw data\Amazon.csv"
+
+# Pick the dataframe backend for this run: "pandas" (default) or "polars"
+backend = get_backend(os.environ.get("AMAZON_BACKEND", "pandas"))
+
+# Load dataset: the backend standardizes column names to snake_case,
+# converts order_date to datetime, lowercases/strips text and extracts year,
+# month, month name. It then drops order lines already ingested (fingerprints
+# of the key columns, checked against every file read before, see dedup.py)
+# and enforces schema, nulls, ranges, date bounds and the amount identity;
+# bad rows go to ../file/quarantine/<run>/<source>.csv with reason codes.
+# The cleaned rows are cached under ../file/cache, so a second run does not
+# parse the CSV (.gz / .bz2 / .zst exports are streamed).
+df, load_report = load_clean(DATA_PATH, backend)
+
+# Duplicates dropped per file (repeated within the file, or already
+# delivered by a file ingested before) and rows quarantined per reason
+print_report(load_report, file=sys.stdout)
 
 # Quick look at data
 print(df.columns)           # Column names
 print("Dataset Shape:", df.shape)  # Rows & columns
-print(df.duplicated().sum())       # Duplicate rows
 df.info()                     # Column info
 df.dtypes                     # Column types
 df.isnull().any()             # Missing values
@@ -52,21 +77,8 @@ df.describe()                 # Summary stats
 # In[2]:
 
 
-# Standardize column names to snake_case
-df.columns = (
-    df.columns
-    .str.replace(r'([a-z0-9])([A-Z])', r'\1_\2', regex=True)
-    .str.replace(r'([A-Z]+)([A-Z][a-z])', r'\1_\2', regex=True)
-    .str.lower()
-)
-
-# Convert order_date column to datetime
-df['order_date'] = pd.to_datetime(df['order_date'])
-
-# Standardize text data: lowercase & remove extra spaces
-df = df.apply(
-    lambda col: col.str.lower().str.strip() if col.dtype == "object" else col
-)
+# The same rows in the backend's own form (a LazyFrame with polars)
+data = backend.from_pandas(df)
 
 # Check updated column names
 df.columns
@@ -78,10 +90,8 @@ df.head()
 # In[3]:
 
 
-# Extract year, month, and month name from OrderDate
-df["year"] = df["order_date"].dt.year
-df["month"] = df["order_date"].dt.month
-df["month_name"] = df["order_date"].dt.month_name()
+# Cost totals and the chart tables below, computed by the selected backend
+tables = backend.chart_data(data)
 
 
 # ### IQR Outlier Detection
@@ -97,8 +107,10 @@ numeric_cols = ['quantity', 'unit_price', 'discount', 'total_amount']
 outlier_summary = {}
 
 for col in numeric_cols:
-    Q1 = df[col].quantile(0.25)
-    Q3 = df[col].quantile(0.75)
+    # Money columns are stored in cents; report them in dollars
+    values = to_dollars(df[col]) if col in MONEY_COLUMNS else df[col]
+    Q1 = values.quantile(0.25)
+    Q3 = values.quantile(0.75)
     IQR = Q3 - Q1
 
     # Define bounds
@@ -106,15 +118,15 @@ for col in numeric_cols:
     upper_bound = Q3 + 1.5 * IQR
 
     # Find outliers
-    outliers = df[(df[col] < lower_bound) | (df[col] > upper_bound)]
+    outliers = values[(values < lower_bound) | (values > upper_bound)]
 
     # Store summary
     outlier_summary[col] = {
         'Lower Bound': lower_bound,
         'Upper Bound': upper_bound,
         'Outlier Count': outliers.shape[0],
-        'Min Outlier': outliers[col].min() if not outliers.empty else None,
-        'Max Outlier': outliers[col].max() if not outliers.empty else None
+        'Min Outlier': outliers.min() if not outliers.empty else None,
+        'Max Outlier': outliers.max() if not outliers.empty else None
     }
 
 # Convert to DataFrame for easy viewing
@@ -147,74 +159,19 @@ outlier_df
 
 
 # --- Calculate KPIs ---
-total_revenue = df['total_amount'].sum()  # Total sales amount
-
-# AOV: average order value per order
-order_revenue = df.groupby('order_id')['total_amount'].sum()
-aov = order_revenue.mean()
-
-total_orders = df['order_id'].nunique()     # Total number of orders
-total_customers = df['customer_id'].nunique()  # Total unique customers
-total_quantity = df['quantity'].sum()       # Total items sold
-total_discount = df['discount'].sum()       # Total discounts given
-
-# --- Create 2-row, 3-column grid for KPI cards ---
-fig = make_subplots(
-    rows=2, cols=3,
-    specs=[[{"type": "indicator"}, {"type": "indicator"}, {"type": "indicator"}],
-           [{"type": "indicator"}, {"type": "indicator"}, {"type": "indicator"}]]
-)
-
-# Add KPI cards
-fig.add_trace(go.Indicator(
-    mode="number",
-    value=total_revenue,
-    number={'prefix': "$", 'valueformat': ',.0f'},
-    title={"text": "Total Revenue"}
-), row=1, col=1)
-
-fig.add_trace(go.Indicator(
-    mode="number",
-    value=aov,
-    number={'prefix': "$", 'valueformat': ',.2f'},
-    title={"text": "Average Order Value (AOV)"}
-), row=1, col=2)
-
-fig.add_trace(go.Indicator(
-    mode="number",
-    value=total_orders,
-    number={'valueformat': ',.0f'},
-    title={"text": "Total Orders"}
-), row=1, col=3)
-
-fig.add_trace(go.Indicator(
-    mode="number",
-    value=total_customers,
-    number={'valueformat': ',.0f'},
-    title={"text": "Total Customers"}
-), row=2, col=1)
-
-fig.add_trace(go.Indicator(
-    mode="number",
-    value=total_quantity,
-    number={'valueformat': ',.0f'},
-    title={"text": "Total Quantity Sold"}
-), row=2, col=2)
-
-fig.add_trace(go.Indicator(
-    mode="number",
-    value=total_discount,
-    number={'prefix': "$", 'valueformat': ',.0f'},
-    title={"text": "Total Discount Given"}
-), row=2, col=3)
-
-# Layout settings
-fig.update_layout(
-    template='plotly_white',
-    height=500,
-    title_text="Key Performance Indicators (KPIs)",
-    title_x=0.5
-)
+# Order-level table: the line items are grouped by order_id once and every
+# order-grain metric (AOV, order counts, per-order discount) reads from it
+orders = OrderTable.build(df)
+kpis = orders.kpis()
+total_revenue = kpis['total_revenue']      # Total sales amount
+aov = kpis['aov']                          # AOV: average order value per order
+total_orders = kpis['total_orders']        # Total number of orders
+total_customers = kpis['total_customers']  # Total unique customers
+total_quantity = kpis['total_quantity']    # Total items sold
+total_discount = kpis['total_discount']    # Total discounts given
+
+# --- 2-row, 3-column grid of KPI cards ---
+fig = charts.kpi_cards(kpis)
 
 # Show and save the KPI dashboard
 fig.show()
@@ -253,89 +210,19 @@ fig.show()
 
 
 # --- Prepare data ---
-df_monthly = df.groupby('month')['total_amount'].sum().reset_index()  # Sum revenue per month
-df_yearly = df.groupby('year')['total_amount'].sum().reset_index()    # Sum revenue per year
-
-# --- Create figure ---
-fig = go.Figure()
-
-# Add Monthly Revenue trace
-fig.add_trace(
-    go.Scatter(
-        x=df_monthly['month'],
-        y=df_monthly['total_amount'],
-        mode='lines+markers',
-        name='Monthly Revenue',
-        visible=True,
-        line=dict(shape='spline')  # Smooth line
-    )
-)
+df_monthly = tables['monthly_revenue']  # Sum revenue per month (all years)
 
-# Add Yearly Revenue trace
-fig.add_trace(
-    go.Scatter(
-        x=df_yearly['year'],
-        y=df_yearly['total_amount'],
-        mode='lines+markers',
-        name='Yearly Revenue',
-        visible=False,
-        line=dict(shape='spline')
-    )
-)
+# Daily base rolled up to week / month / quarter / year, with distinct
+# customer and order counts merged from daily sketches
+timeline = TimeRollup.build(df)
+df_yearly = timeline.level('year')      # Sum revenue per year
+df_yearly['year'] = df_yearly['period'].dt.year
 
-# --- COVID Vertical Lines (Initially Hidden) ---
-fig.update_layout(
-    shapes=[
-        dict(type="line", x0=2020, x1=2020, y0=0, y1=1, xref="x", yref="paper", line=dict(dash="dash", width=2), visible=False),  # COVID start
-        dict(type="line", x0=2022, x1=2022, y0=0, y1=1, xref="x", yref="paper", line=dict(dash="dash", width=2), visible=False)   # Post-COVID recovery
-    ]
-)
+# Monthly active customers per calendar month (no extra pass over df)
+monthly_active = timeline.level('month')[['period', 'customers', 'orders']]
 
-# --- Dropdown Menu to switch traces ---
-fig.update_layout(
-    updatemenus=[
-        dict(
-            buttons=[
-                dict(
-                    label="Monthly Revenue",
-                    method="update",
-                    args=[
-                        {"visible": [True, False]},  # Show monthly, hide yearly
-                        {"title": "Monthly Revenue Trend",
-                         "shapes[0].visible": False,
-                         "shapes[1].visible": False}
-                    ],
-                ),
-                dict(
-                    label="Yearly Revenue",
-                    method="update",
-                    args=[
-                        {"visible": [False, True]},  # Show yearly, hide monthly
-                        {"title": "Yearly Revenue Trend (COVID Impact Highlighted)",
-                         "shapes[0].visible": True,
-                         "shapes[1].visible": True}
-                    ],
-                ),
-            ],
-            direction="down",
-            showactive=True,
-            x=1,
-            xanchor="right",
-            y=1.25,
-            yanchor="top"
-        )
-    ]
-)
-
-# --- Layout Styling ---
-fig.update_layout(
-    title="Monthly Revenue Trend",
-    title_x=0.5,
-    template="plotly_white",
-    margin=dict(t=120)
-)
-
-fig.update_xaxes(rangeslider_visible=True)  # Enable range slider
+# --- Monthly / yearly lines with a dropdown and COVID markers ---
+fig = charts.revenue_trend(df_monthly, df_yearly)
 
 # --- Show and save figure ---
 fig.show()
@@ -364,6 +251,25 @@ fig.show()
 # 
 # - Diversify products and focus on long-term growth over event-driven spikes.
 
+# ### Rolling Windows & KPI Deltas
+# 
+# Trailing 7 / 28 / 90-day revenue, AOV, orders and active customers for every day, computed from the daily base of the time rollup. The KPI deltas compare the last 28 days with the 4 weeks before (MoM) and the same 4 weeks a year earlier (YoY).
+
+# In[24]:
+
+
+rolling = RollingWindows.build(timeline)
+fig = charts.rolling_metrics(rolling.table)
+fig.show()
+# fig.write_html("../visuals/Rolling_Metrics.html")
+
+# --- Last 28 days vs 4 weeks / 52 weeks earlier ---
+kpi_deltas = rolling.deltas()
+fig = charts.kpi_deltas(kpi_deltas)
+fig.show()
+# fig.write_html("../visuals/KPI_Deltas.html")
+
+
 # ### Top Revenue by Dimention
 # 
 # Shows revenue breakdown by different dimensions. Users can switch via dropdown to see revenue by category, product, brand, seller, location (state/city), or payment method.
@@ -377,67 +283,10 @@ dimensions = [
     "seller_id", "state", "city", "payment_method"
 ]
 
-fig = go.Figure()
-total_rev = df['total_amount'].sum()  # Total revenue for percentage calculation
-
-# --- Create one bar trace per dimension ---
-for i, dim in enumerate(dimensions):
-    # Sum revenue per value and get top 15
-    grouped = (
-        df.groupby(dim)['total_amount']
-        .sum()
-        .sort_values(ascending=False)
-        .head(15)
-    )
-
-    # Shorten long labels
-    x_labels = [str(x)[:30] + ("..." if len(str(x)) > 30 else "") for x in grouped.index]
-
-    # Add bar trace
-    fig.add_trace(
-        go.Bar(
-            x=x_labels,
-            y=grouped.values,
-            visible=True if i == 0 else False,  # Show first dimension by default
-            customdata=(grouped.values / total_rev) * 100,  # % of total revenue
-            hovertemplate='%{x}<br>Revenue: $%{y:,.0f}<br>Percent of Total: %{customdata:.2f}%'
-        )
-    )
-
-# --- Create dropdown menu to switch dimensions ---
-buttons = []
-for i, dim in enumerate(dimensions):
-    visibility = [False] * len(dimensions)
-    visibility[i] = True
-
-    buttons.append(
-        dict(
-            label=dim.replace('_', ' ').title(),
-            method="update",
-            args=[
-                {"visible": visibility},
-                {"title": f"Revenue by {dim.replace('_',' ').title()}"}
-            ]
-        )
-    )
-
-# --- Layout settings ---
-fig.update_layout(
-    updatemenus=[dict(
-        buttons=buttons,
-        direction="down",
-        showactive=True,
-        x=1,
-        xanchor="right",
-        y=1.2,
-        yanchor="top"
-    )],
-    title="Revenue by Category",
-    title_x=0.5,
-    template="plotly_white",
-    margin=dict(t=120),
-    xaxis=dict(tickangle=45),
-    yaxis=dict(title="Revenue")
+# --- One bar trace per dimension (top 15), switched by a dropdown ---
+fig = charts.revenue_by_dimension(
+    {dim: tables[f'revenue_by_{dim}'] for dim in dimensions},
+    total_rev=kpis['total_revenue']  # Total revenue for percentage calculation
 )
 
 # --- Show and save figure ---
@@ -469,6 +318,23 @@ fig.show()
 # 
 # - Diversify offerings to reduce dependency on a few key entities.
 
+# ### Seller Scorecard
+# 
+# Revenue, orders, units, AOV, discount rate, customer reach and repeat-customer share for every seller, plus each seller's monthly revenue. Rankings and percentile bands read the scorecard arrays instead of regrouping the transactions.
+
+# In[25]:
+
+
+sellers = SellerScorecard.build(df)
+fig = charts.seller_scorecard(sellers.top('revenue', 20))
+fig.show()
+# fig.write_html("../visuals/Seller_Scorecard.html")
+
+# --- Top decile by repeat-customer share, and one seller's monthly trend ---
+sellers.band('repeat_share', 90).head(10)
+sellers.seller(sellers.top('revenue', 1)['seller_id'][0])[1]
+
+
 # ### Revenue vs Tax, Shipping Cost, and Discount
 # 
 # Compares total revenue against key cost components: shipping cost and discounts to see how they affect overall revenue.
@@ -477,36 +343,10 @@ fig.show()
 
 
 # --- Aggregate totals for key metrics ---
-metrics = {
-    'Revenue': df['total_amount'].sum(),
-    'Tax': df['tax'].sum(),
-    'Shipping Cost': df['shipping_cost'].sum(),
-    'Discount': df['discount'].sum()
-}
-
-# Convert metrics to DataFrame for plotting
-metrics_df = pd.DataFrame({
-    'Metric': list(metrics.keys()),
-    'Amount': list(metrics.values())
-})
+metrics = tables['cost_totals']
 
 # --- Plot bar chart ---
-fig4 = px.bar(
-    metrics_df,
-    x='Metric',
-    y='Amount',
-    text='Amount',
-    title="Revenue vs Tax, Shipping Cost, and Discount",
-    labels={'Amount': 'Amount ($)'}
-)
-
-# Format labels and layout
-fig4.update_traces(texttemplate='$%{y:,.0f}', textposition='outside')
-fig4.update_layout(
-    yaxis=dict(range=[0, max(metrics_df['Amount'])*1.1]),  # Add 10% space above bars
-    title_x=0.5,
-    template='plotly_white'
-)
+fig4 = charts.cost_comparison(metrics)
 
 # --- Show and save figure ---
 fig4.show()
@@ -546,70 +386,10 @@ fig4.show()
 # In[10]:
 
 
-# --- Define dimensions to analyze ---
-dimensions = ["product_name", "category", "brand"]
-
-fig = go.Figure()
-
-# --- Create one treemap per dimension ---
-for i, dim in enumerate(dimensions):
-    # Sum quantity per value and get top 10
-    grouped = (
-        df.groupby(dim)['quantity']
-        .sum()
-        .sort_values(ascending=False)
-        .head(10)
-        .reset_index()
-    )
-
-    # Add treemap trace
-    fig.add_trace(
-        go.Treemap(
-            labels=grouped[dim],
-            parents=[""] * len(grouped),
-            values=grouped['quantity'],
-            marker=dict(
-                colors=grouped['quantity'],
-                colorscale="Blues",
-                colorbar=dict(title="Quantity")
-            ),
-            visible=True if i == 0 else False  # Show first dimension by default
-        )
-    )
-
-# --- Dropdown menu to switch dimensions ---
-buttons = []
-for i, dim in enumerate(dimensions):
-    visibility = [False] * len(dimensions)
-    visibility[i] = True
-
-    buttons.append(
-        dict(
-            label=dim.replace('_', ' ').title(),
-            method="update",
-            args=[
-                {"visible": visibility},
-                {"title": f"Top 10 {dim.replace('_',' ').title()} by Quantity Sold"}
-            ]
-        )
-    )
-
-# --- Layout settings ---
-fig.update_layout(
-    updatemenus=[dict(
-        buttons=buttons,
-        direction="down",
-        showactive=True,
-        x=1,
-        xanchor="right",
-        y=1.15,
-        yanchor="top"
-    )],
-    title="Top 10 Product Name by Quantity Sold",
-    title_x=0.5,
-    template="plotly_white",
-    margin=dict(t=100)
-)
+# --- One treemap per dimension, switched by a dropdown ---
+fig = charts.top_quantity_treemap({
+    dim: tables[f'quantity_by_{dim}'] for dim in ["product_name", "category", "brand"]
+})
 
 # --- Show and save figure ---
 fig.show()
@@ -643,35 +423,12 @@ fig.show()
 # In[11]:
 
 
-# --- Create price bins ---
-df['price_bin'] = pd.cut(df['unit_price'], bins=12)  # Divide prices into 12 ranges
-
-# --- Calculate average quantity per price bin ---
-grouped = (
-    df.groupby('price_bin', observed=False)['quantity']
-      .mean()
-      .reset_index()
-)
-
-# Convert bin to midpoint for cleaner x-axis
-grouped['price_mid'] = grouped['price_bin'].apply(lambda x: x.mid)
+# --- Average quantity per price bin (12 equal-width ranges) ---
+# Also returns the price elasticity of each category from the same pass
+grouped, category_elasticity = analyze_prices(df, bins=12, strategy="width")
 
 # --- Plot line chart ---
-fig = px.line(
-    grouped.sort_values('price_mid'),
-    x='price_mid',
-    y='quantity',
-    markers=True,
-    title="Price Sensitivity Analysis"
-)
-
-# Layout settings
-fig.update_layout(
-    title_x=0.5,
-    xaxis_title="Price",
-    yaxis_title="Average Quantity Sold",
-    template="plotly_white"
-)
+fig = charts.price_sensitivity(grouped)
 
 # --- Show and save figure ---
 fig.show()
@@ -710,26 +467,15 @@ fig.show()
 # In[12]:
 
 
-# --- Aggregate total quantity by country ---
-country_revenue = (
-    df.groupby('country')['quantity']
-    .sum()
-    .reset_index()
-)
+# --- Country -> state -> city rollup (built once, country codes cached) ---
+geo = GeoRollup.build(df)
+country_revenue = geo.level('country')
 
-# --- Plot choropleth map ---
-fig6 = px.choropleth(
-    country_revenue,
-    locations="country",
-    locationmode='country names',
-    color="quantity",
-    hover_name="country",
-    color_continuous_scale='Plasma',
-    title='Global Revenue Heatmap'
-)
+# Drill-down tables come from the same tree, e.g. states of the USA:
+# geo.children(country_code='USA')
 
-# Layout settings
-fig6.update_layout(title_x=0.5)
+# --- Plot choropleth map ---
+fig6 = charts.sales_by_location(country_revenue)
 
 # --- Show and save figure ---
 fig6.show()
@@ -761,39 +507,25 @@ fig6.show()
 # In[13]:
 
 
-# --- Aggregate total revenue per customer ---
-customer_rev = (
-    df.groupby('customer_id')['total_amount']
-    .sum()
-    .sort_values(ascending=False)
-    .reset_index()
-)
+# --- Customer feature table: one grouped pass, one row per customer ---
+# (first/last purchase, orders, revenue, quantity, discounts)
+customers = CustomerFeatures.build(df)
 
-# --- Calculate cumulative revenue and percentages ---
-customer_rev['cumulative_revenue'] = customer_rev['total_amount'].cumsum()
-total_revenue = customer_rev['total_amount'].sum()
-customer_rev['cumulative_percent'] = 100 * customer_rev['cumulative_revenue'] / total_revenue
+# --- Lorenz curve, Gini and top-X% shares of customer revenue ---
+# (exact sort here; mode="histogram" bins the values in one pass instead)
+customer_concentration = concentration(customers.table['monetary'])
+customer_concentration.summary()   # gini, top_1/10/20/50_share
 
-# Calculate customer rank % for plotting
-customer_rev['customer_rank_percent'] = 100 * (customer_rev.index + 1) / len(customer_rev)
+# --- Same measures for products and sellers ---
+product_concentration = concentration(backend.dimension_totals(data, 'product_name')['total_amount'])
+seller_concentration = concentration(backend.dimension_totals(data, 'seller_id')['total_amount'])
 
 # --- Plot cumulative revenue line chart ---
-fig7 = px.line(
-    customer_rev,
-    x='customer_rank_percent',
-    y='cumulative_percent',
-    title='Revenue Concentration',
-    labels={
-        'customer_rank_percent': 'Customer % (Top to Bottom)',
-        'cumulative_percent': 'Cumulative Revenue %'
-    }
-)
-
-# Layout settings
-fig7.update_layout(
-    title_x=0.5,
-    template='plotly_white'
-)
+fig7 = charts.revenue_concentration({
+    'Customer': customer_concentration.pareto(),
+    'Product Name': product_concentration.pareto(),
+    'Seller': seller_concentration.pareto(),
+})
 
 # --- Show and save figure ---
 fig7.show()
@@ -836,26 +568,10 @@ fig7.show()
 
 
 # --- Count number of orders per customer ---
-orders_per_customer = (
-    df.groupby('customer_id')['order_id']
-    .nunique()
-    .reset_index(name='order_count')
-)
+orders_per_customer = customers.orders_per_customer()
 
 # --- Plot histogram of customer purchase frequency ---
-fig8 = px.histogram(
-    orders_per_customer,
-    x='order_count',
-    nbins=20,
-    title='Customer Purchase Frequency Distribution',
-    labels={'order_count': 'Number of Orders per Customer'}
-)
-
-# Layout settings
-fig8.update_layout(
-    title_x=0.5,
-    template='plotly_white'
-)
+fig8 = charts.purchase_frequency(orders_per_customer)
 
 # --- Show and save figure ---
 fig8.show()
@@ -885,48 +601,16 @@ fig8.show()
 # In[15]:
 
 
-import numpy as np
-
-# --- Ensure order_date is datetime ---
-df['order_date'] = pd.to_datetime(df['order_date'])
+# --- Monthly customers by type ---
+# New customers come from first-purchase months in the feature table;
+# returning customers are the month's other active customers (exact counts)
+monthly_customers = new_vs_returning_monthly(customers)
 
-# --- First purchase date per customer ---
-first_purchase = df.groupby('customer_id')['order_date'].min().reset_index()
-first_purchase.columns = ['customer_id', 'first_purchase_date']
-
-# Merge first purchase info back to main df
-df = df.merge(first_purchase, on='customer_id')
-
-# --- Mark new vs returning customers ---
-df['customer_type'] = np.where(
-    df['order_date'] == df['first_purchase_date'],
-    'New',
-    'Returning'
-)
-
-# --- Monthly aggregation by customer type ---
-monthly_customers = (
-    df.groupby([pd.Grouper(key='order_date', freq='M'), 'customer_type'])
-    ['customer_id']
-    .nunique()
-    .reset_index()
-)
+# RFM segments (recency, frequency, monetary scores 1-5) from the same table
+rfm = customers.rfm()
 
 # --- Plot line chart ---
-fig9 = px.line(
-    monthly_customers,
-    x='order_date',
-    y='customer_id',
-    color='customer_type',
-    title='New vs Returning Customers Over Time',
-    labels={'customer_id': 'Number of Customers'}
-)
-
-# Layout settings
-fig9.update_layout(
-    title_x=0.5,
-    template='plotly_white'
-)
+fig9 = charts.customer_types(monthly_customers)
 
 # --- Show and save figure ---
 fig9.show()
@@ -958,22 +642,15 @@ fig9.show()
 # In[16]:
 
 
-# --- Aggregate discount and revenue per order ---
-discount_revenue = df.groupby('order_id').agg({
-    'discount': 'sum',
-    'total_amount': 'sum'
-}).reset_index()
+# --- Every discount table (per order, flag, category, depth, uplift) in one scan ---
+discounts = DiscountAnalytics.build(df, orders)
+print("Discount share of gross sales:", round(discounts.totals['discount_share'], 4))
 
-import plotly.express as px
+# --- Aggregate discount and revenue per order ---
+discount_revenue = discounts['discount_per_order']
 
 # --- Plot scatter: discount vs revenue ---
-fig10 = px.scatter(
-    discount_revenue,
-    x='discount',
-    y='total_amount',
-    title='Discount vs Revenue per Order',
-    labels={'discount': 'Total Discount', 'total_amount': 'Order Revenue'}
-)
+fig10 = charts.discount_vs_revenue(discount_revenue)
 
 # --- Show and save figure ---
 fig10.show()
@@ -1003,20 +680,11 @@ fig10.show()
 # In[21]:
 
 
-# --- Flag orders with discount ---
-df['has_discount'] = df['discount'] > 0
-
-# --- Aggregate revenue by discount flag ---
-revenue_by_discount = df.groupby('has_discount')['total_amount'].sum().reset_index()
+# --- Revenue by discount flag (discount > 0) ---
+revenue_by_discount = discounts['revenue_by_discount_flag']
 
 # --- Plot bar chart ---
-fig = px.bar(
-    revenue_by_discount,
-    x='has_discount',
-    y='total_amount',
-    title='Revenue: Discounted vs Non-Discounted Orders',
-    labels={'has_discount': 'Discount Applied', 'total_amount': 'Revenue'}
-)
+fig = charts.revenue_by_discount(revenue_by_discount)
 
 # --- Show figure ---
 fig.show()
@@ -1047,15 +715,10 @@ fig.show()
 
 
 # --- Calculate average discount per category ---
-avg_discount_category = df.groupby('category')['discount'].mean().reset_index()
+avg_discount_category = discounts['avg_discount_by_category']
 
 # --- Plot bar chart ---
-fig = px.bar(
-    avg_discount_category,
-    x='category',
-    y='discount',
-    title='Average Discount by Category'
-)
+fig = charts.average_discount_by_category(avg_discount_category)
 
 # --- Show figure ---
 fig.show()
@@ -1078,6 +741,24 @@ fig.show()
 #   - Monitor how discounts impact customer behavior and sales velocity per category.
 # 
 
+# ### Discount Depth & Uplift
+# 
+# Revenue per discount-depth bucket, and how much more discounted lines sell
+# than full-price lines per category and brand.
+
+# In[23]:
+
+
+# --- Revenue per discount-depth bucket ---
+fig = charts.revenue_by_discount_depth(discounts['depth'])
+fig.show()
+# fig.write_html("../visuals/Revenue_by_Discount_Depth.html")
+
+# --- Quantity / revenue uplift of discounted lines ---
+discounts['uplift_by_category']
+discounts['uplift_by_brand'].sort_values('quantity_uplift', ascending=False).head(10)
+
+
 # ## Conclusion
 
 # ### 📌 General Conclusion & Key Takeaways
@@ -0,0 +1,543 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# # Dataframe Backends
+#
+# Every analysis stage reads its data through a backend so the same totals and
+# chart tables can be produced by different dataframe engines:
+#
+# - `pandas` - eager reference implementation (matches the notebook cells)
+# - `polars` - lazy, multithreaded engine; cleaning, duplicate removal and
+#   validation run as one query plan (`screen`), and all aggregations are
+#   collected together so Polars can fuse them into one optimized plan
+#
+# Every backend returns plain pandas objects, so plotting code does not care
+# which engine produced the numbers. Money is stored as integer cents after
+# cleaning (see money.py); tables and totals come back in dollars.
+
+import os
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+from compressed import compression_of, read_csv, spooled_copy
+from dedup import (
+    LINE_KEY, LINEAGE_COLUMNS, FingerprintIndex, drop_duplicates, drop_partition_duplicates, duplicate_mask,
+    fingerprints,
+)
+from ingest import PARTITION_COLUMN, is_partitioned, partition_names, partition_paths, read_partitions
+from money import CENTS, MONEY_COLUMNS, compact_numbers, in_dollars, smallest_int, to_dollars
+from validation import (
+    QUARANTINE_DIR, TOLERANCE, check_schema, date_bounds, polars_reason_mask, quarantine, report, validate,
+)
+
+
+# Columns the text cleaning must not touch
+DATE_COLUMN = 'order_date'
+
+# Columns derived from the order date by the cleaning step
+DERIVED_COLUMNS = ('year', 'month', 'month_name')
+
+# Dimensions used by the "Top Revenue by Dimension" chart
+REVENUE_DIMENSIONS = [
+    "category", "product_name", "brand",
+    "seller_id", "state", "city", "payment_method"
+]
+
+# Dimensions used by the "Top 10 Product, Category and Brand" treemap
+QUANTITY_DIMENSIONS = ["product_name", "category", "brand"]
+
+
+def index_sources(path):
+    """{name: source} of every file of `path`: its partition (or file) name and absolute path.
+
+    The name labels reports and quarantine files, the path identifies the
+    file in the fingerprint index (dedup.py).
+    """
+    if is_partitioned(path):
+        paths = partition_paths(path)
+        return dict(zip(partition_names(paths), map(os.path.abspath, paths)))
+    return {os.path.basename(path): os.path.abspath(path)}
+
+
+def standardize_columns(columns):
+    """Convert CamelCase column names (OrderID, UnitPrice) to snake_case."""
+    return (
+        pd.Index(columns)
+        .str.replace(r'([a-z0-9])([A-Z])', r'\1_\2', regex=True)
+        .str.replace(r'([A-Z]+)([A-Z][a-z])', r'\1_\2', regex=True)
+        .str.lower()
+    )
+
+
+def source_columns(columns):
+    """Standardized source columns to parse to produce `columns` (None: all).
+
+    The order date is always parsed: cleaning converts it, the date parts are
+    derived from it, and it keeps the row count of a file.
+    """
+    if columns is None:
+        return None
+    return {col for col in columns if col not in DERIVED_COLUMNS} | {DATE_COLUMN}
+
+
+# ## Pandas (reference)
+
+class PandasBackend:
+    name = "pandas"
+
+    # --- Load & clean ---
+
+    def load(self, path, workers=None, processes=False, columns=None):
+        """Read the raw CSV (or every partition of a directory / glob) and clean it.
+
+        Partitions are read and cleaned concurrently, see ingest.py. With
+        `columns` only those columns (plus the order date) are parsed.
+        """
+        if is_partitioned(path):
+            read = self.read if columns is None else partial(self.read, columns=columns)
+            return read_partitions(partition_paths(path), read, workers, processes)
+        return self.read(path, columns)
+
+    def read(self, path, columns=None):
+        """Cleaned frame of one CSV file (gzip / bz2 / zstd files are streamed)."""
+        usecols = None
+        if columns is not None:
+            wanted = source_columns(columns)
+            usecols = lambda name: standardize_columns([name])[0] in wanted
+        return self.clean(read_csv(path, low_memory=False, usecols=usecols), columns)
+
+    def clean(self, raw, columns=None):
+        df = raw.copy()
+        df.columns = standardize_columns(df.columns)
+
+        # Convert order_date column to datetime
+        df[DATE_COLUMN] = pd.to_datetime(df[DATE_COLUMN])
+
+        # Standardize text data: lowercase & remove extra spaces
+        text_cols = [
+            col for col in df.columns
+            if df[col].dtype == "object" or pd.api.types.is_string_dtype(df[col])
+        ]
+        for col in text_cols:
+            df[col] = df[col].str.lower().str.strip()
+
+        # Extract year, month, and month name from order_date
+        derived = DERIVED_COLUMNS if columns is None else set(columns)
+        if "year" in derived:
+            df["year"] = df[DATE_COLUMN].dt.year
+        if "month" in derived:
+            df["month"] = df[DATE_COLUMN].dt.month
+        if "month_name" in derived:
+            df["month_name"] = df[DATE_COLUMN].dt.month_name()
+
+        # Money as integer cents, counts and date parts in the smallest width
+        return compact_numbers(df)
+
+    # --- Duplicates & validation ---
+
+    def screen(self, df, source="data", row_column=None, quarantine_dir=QUARANTINE_DIR, index=None):
+        """Drop repeated order lines and invalid rows (dedup.py, validation.py).
+
+        `source` is the path the data was loaded from. Duplicates are looked
+        for partition by partition against the fingerprint `index`; without
+        one, within this input only. With `row_column` the rows are numbered
+        (in place) before any is dropped.
+        Returns `(data, {file or partition: duplicate report}, validation report)`.
+        """
+        if row_column:
+            df[row_column] = np.arange(len(df), dtype=smallest_int(0, len(df)))
+        index = FingerprintIndex(None) if index is None else index
+        sources = index_sources(source)
+        name = next(iter(sources))
+        if PARTITION_COLUMN in df.columns:
+            df, duplicates = drop_partition_duplicates(df, index, sources)
+        else:
+            df, duplicates = drop_duplicates(df, index, source=sources[name])
+            duplicates = {name: duplicates}
+        df, checked = validate(df, name, quarantine_dir=quarantine_dir)
+        return df, duplicates, checked
+
+    def to_pandas(self, data):
+        return data
+
+    def from_pandas(self, df):
+        """Wrap an already cleaned pandas frame."""
+        return df
+
+    # --- Totals ---
+
+    def cost_totals(self, df):
+        return {
+            'Revenue': to_dollars(df['total_amount'].sum()),
+            'Tax': to_dollars(df['tax'].sum()),
+            'Shipping Cost': to_dollars(df['shipping_cost'].sum()),
+            'Discount': df['discount'].sum(),
+        }
+
+    # --- Chart tables ---
+
+    def monthly_revenue(self, df):
+        return in_dollars(df.groupby('month')['total_amount'].sum().reset_index())
+
+    def top_by_dimension(self, df, dim, value='total_amount', n=15):
+        grouped = df.groupby(dim)[value].sum().reset_index()
+        return in_dollars(
+            grouped.sort_values([value, dim], ascending=[False, True])
+            .head(n)
+            .reset_index(drop=True)
+        )
+
+    def dimension_totals(self, df, dim, value='total_amount'):
+        """`value` summed per `dim` group, in no particular order (no sort)."""
+        return in_dollars(df.groupby(dim, observed=True, sort=False)[value].sum().reset_index())
+
+    # --- Everything the dashboard needs ---
+
+    def chart_data(self, data):
+        """Return the cost totals and the chart tables the dashboard reads, keyed by name."""
+        tables = {
+            'cost_totals': self.cost_totals(data),
+            'monthly_revenue': self.monthly_revenue(data),
+        }
+        for dim in REVENUE_DIMENSIONS:
+            tables[f'revenue_by_{dim}'] = self.top_by_dimension(data, dim, 'total_amount', 15)
+        for dim in QUANTITY_DIMENSIONS:
+            tables[f'quantity_by_{dim}'] = self.top_by_dimension(data, dim, 'quantity', 10)
+        return tables
+
+
+# ## Polars (lazy, multithreaded)
+
+class PolarsBackend:
+    name = "polars"
+
+    def __init__(self):
+        try:
+            import polars as pl
+        except ImportError as exc:
+            raise ImportError(
+                "The polars backend needs the 'polars' package: pip install polars"
+            ) from exc
+        self.pl = pl
+
+    # --- Load & clean (lazy) ---
+
+    def load(self, path, workers=None, processes=False, columns=None):
+        """Return a LazyFrame of the cleaned data; nothing is read yet.
+
+        A directory or glob is scanned as one frame (Polars reads the files in
+        parallel); columns missing from a partition are null and numeric types
+        are widened to fit every partition. With `columns` the frame is
+        narrowed to them and projection pushdown skips parsing the rest.
+        `workers` and `processes` are accepted for interface parity and ignored.
+        """
+        pl = self.pl
+        if not is_partitioned(path):
+            return self._project(self.clean(self._scan(path)), columns)
+
+        paths = partition_paths(path)
+        scans = [
+            self._scan(part).with_columns(pl.lit(name).alias(PARTITION_COLUMN))
+            for part, name in zip(paths, partition_names(paths))
+        ]
+        return self._project(self.clean(pl.concat(scans, how="diagonal_relaxed")), columns)
+
+    def _project(self, lf, columns):
+        if columns is None:
+            return lf
+        wanted = set(columns) | source_columns(columns) | {PARTITION_COLUMN}
+        return lf.select([col for col in lf.collect_schema().names() if col in wanted])
+
+    def _scan(self, path):
+        if compression_of(path):
+            # scan_csv needs a plain file
+            path = spooled_copy(path)
+        lf = self.pl.scan_csv(path, infer_schema_length=10000)
+        names = lf.collect_schema().names()
+        return lf.rename(dict(zip(names, standardize_columns(names))))
+
+    def clean(self, raw):
+        pl = self.pl
+        if isinstance(raw, pd.DataFrame):
+            raw = pl.from_dict({col: raw[col].tolist() for col in raw.columns}).lazy()
+
+        names = raw.collect_schema().names()
+        lf = raw.rename(dict(zip(names, standardize_columns(names))))
+
+        schema = lf.collect_schema()
+        text_cols = [
+            col for col, dtype in schema.items()
+            if dtype == pl.Utf8 and col not in (DATE_COLUMN, PARTITION_COLUMN)
+        ]
+        date = pl.col(DATE_COLUMN)
+        if schema[DATE_COLUMN] == pl.Utf8:
+            date = date.str.to_datetime()
+
+        return (
+            lf.with_columns(
+                [pl.col(col).str.to_lowercase().str.strip_chars() for col in text_cols]
+                + [date.alias(DATE_COLUMN)]
+            )
+            .with_columns(
+                pl.col(DATE_COLUMN).dt.year().cast(pl.Int16).alias('year'),
+                pl.col(DATE_COLUMN).dt.month().cast(pl.Int8).alias('month'),
+                pl.col(DATE_COLUMN).dt.strftime('%B').alias('month_name'),
+                # Money as integer cents; strict casts fail on overflow
+                *[(pl.col(col) * CENTS).round(0).cast(pl.Int64).alias(col)
+                  for col in MONEY_COLUMNS if col in schema],
+                pl.col('quantity').cast(pl.Int32),
+            )
+        )
+
+    def screen(self, lf, source="data", row_column=None, quarantine_dir=QUARANTINE_DIR, index=None):
+        """Drop repeated order lines and invalid rows inside the lazy plan.
+
+        Duplicates (first occurrence kept, partitions in order) and the
+        validation checks are Polars expressions on the cleaned scan. The
+        valid rows, the failing rows and the duplicate counts are collected
+        together, so the files are parsed once; the valid rows come back as a
+        LazyFrame over the collected frame. With a fingerprint `index`, rows
+        delivered by earlier runs are dropped as well (see `_screen_history`).
+        Same results as PandasBackend.screen.
+        """
+        pl = self.pl
+        check_schema(self.to_pandas(lf.head(0)))
+        names = lf.collect_schema().names()
+        key = [col for col in LINE_KEY if col in names] or [col for col in names if col not in LINEAGE_COLUMNS]
+        partitioned = PARTITION_COLUMN in names
+        if row_column:
+            lf = lf.with_row_index(row_column)
+        reasons = polars_reason_mask(pl, *date_bounds(), TOLERANCE).alias('_reasons')
+        name = next(iter(index_sources(source)))
+        if index is not None:
+            return self._screen_history(lf.with_columns(reasons), key, source, index, quarantine_dir)
+
+        first = pl.struct(key).is_first_distinct()
+        flagged = lf.with_columns(
+            first.alias('_first'),
+            (first.over(PARTITION_COLUMN) if partitioned else first).alias('_first_in_file'),
+            reasons,
+        )
+        counts = [
+            pl.len().alias('rows'),
+            (~pl.col('_first_in_file')).sum().alias('duplicates_in_file'),
+            (pl.col('_first_in_file') & ~pl.col('_first')).sum().alias('duplicates_of_sources'),
+            pl.col('_first').sum().alias('kept'),
+        ]
+        valid, bad, duplicates = pl.collect_all([
+            flagged.filter(pl.col('_first') & (pl.col('_reasons') == 0)).drop('_first', '_first_in_file', '_reasons'),
+            flagged.filter(pl.col('_first') & (pl.col('_reasons') != 0)).drop('_first', '_first_in_file'),
+            (flagged.group_by(PARTITION_COLUMN, maintain_order=True).agg(counts) if partitioned
+             else flagged.select(pl.lit(name).alias(PARTITION_COLUMN), *counts)),
+        ])
+        duplicates = {row.pop(PARTITION_COLUMN): row for row in duplicates.to_dicts()}
+        return self._checked(valid, bad, duplicates, name, quarantine_dir)
+
+    def _screen_history(self, flagged, key, source, index, quarantine_dir):
+        """`screen` against a fingerprint index: rows are fingerprinted like the pandas backend does.
+
+        The index holds pandas row hashes (dedup.fingerprints), so the key
+        columns are converted once and every partition goes through
+        `dedup.duplicate_mask` in order.
+        """
+        pl = self.pl
+        frame = flagged.collect()
+        fps = fingerprints(self.to_pandas(frame.select(key)))
+        sources = index_sources(source)
+
+        keep = np.zeros(len(frame), dtype=bool)
+        duplicates = {}
+        if PARTITION_COLUMN in frame.columns:
+            codes, parts = pd.factorize(frame[PARTITION_COLUMN].to_numpy())
+            for code, part in enumerate(parts):
+                rows = np.flatnonzero(codes == code)
+                keep[rows], duplicates[part] = duplicate_mask(fps[rows], index, sources.get(part, str(part)))
+        else:
+            name = next(iter(sources))
+            keep, duplicates[name] = duplicate_mask(fps, index, sources[name])
+        index.save()
+
+        kept = frame.filter(pl.Series(keep))
+        return self._checked(
+            kept.filter(pl.col('_reasons') == 0).drop('_reasons'),
+            kept.filter(pl.col('_reasons') != 0),
+            duplicates, next(iter(sources)), quarantine_dir,
+        )
+
+    def _checked(self, valid, bad, duplicates, name, quarantine_dir):
+        """`(valid rows, duplicate reports, validation report)`; the failing rows are quarantined."""
+        masks = bad['_reasons'].to_numpy()
+        checked = report(sum(row['kept'] for row in duplicates.values()), masks)
+        checked['files'] = quarantine(self.to_pandas(bad.drop('_reasons')), masks, name,
+                                      quarantine_dir=quarantine_dir)
+        return valid.lazy(), duplicates, checked
+
+    def from_pandas(self, df):
+        """LazyFrame over an already cleaned pandas frame."""
+        columns = {
+            # Text (categoricals included) as object arrays with None for nulls
+            col: df[col].to_numpy() if df[col].dtype.kind in "biufM" else df[col].to_numpy(dtype=object, na_value=None)
+            for col in df.columns
+        }
+        return self.pl.DataFrame(columns).lazy()
+
+    def to_pandas(self, data):
+        if isinstance(data, self.pl.LazyFrame):
+            data = data.collect()
+        # Go through NumPy so pyarrow is not required
+        return pd.DataFrame({col: data[col].to_numpy() for col in data.columns})
+
+    def _money_sum(self, col):
+        # Widen before summing: Polars keeps Int32 sums in Int32
+        return self.pl.col(col).cast(self.pl.Int64).sum()
+
+    # --- Lazy query builders ---
+
+    def _cost_totals(self, lf):
+        pl = self.pl
+        return lf.select(
+            (self._money_sum('total_amount') / CENTS).alias('Revenue'),
+            (self._money_sum('tax') / CENTS).alias('Tax'),
+            (self._money_sum('shipping_cost') / CENTS).alias('Shipping Cost'),
+            pl.col('discount').sum().alias('Discount'),
+        )
+
+    @staticmethod
+    def _group_by(lf, key):
+        # pandas drops null keys (a column missing from some partitions); match it
+        return lf.drop_nulls(key).group_by(key)
+
+    def _sum_by(self, lf, key, value):
+        return self._group_by(lf, key).agg(self._money_sum(value)).sort(key)
+
+    def _top_by_dimension(self, lf, dim, value, n):
+        return (
+            self._group_by(lf, dim).agg(self._money_sum(value))
+            .sort([value, dim], descending=[True, False])
+            .head(n)
+        )
+
+    # --- Public API (same shape as PandasBackend) ---
+
+    def _scalar_row(self, frame):
+        return {key: values[0] for key, values in frame.to_dict(as_series=False).items()}
+
+    def cost_totals(self, lf):
+        return self._scalar_row(self._cost_totals(lf).collect())
+
+    def _table(self, query):
+        return in_dollars(self.to_pandas(query))
+
+    def monthly_revenue(self, lf):
+        return self._table(self._sum_by(lf, 'month', 'total_amount'))
+
+    def top_by_dimension(self, lf, dim, value='total_amount', n=15):
+        return self._table(self._top_by_dimension(lf, dim, value, n))
+
+    def dimension_totals(self, lf, dim, value='total_amount'):
+        return self._table(self._group_by(lf, dim).agg(self._money_sum(value)))
+
+    def chart_data(self, lf):
+        """Collect the cost totals and every chart query in one go.
+
+        `collect_all` optimizes the queries together, so the CSV scan and the
+        cleaning expressions they share are executed once for all of them.
+        """
+        pl = self.pl
+        queries = {
+            'cost_totals': self._cost_totals(lf),
+            'monthly_revenue': self._sum_by(lf, 'month', 'total_amount'),
+        }
+        for dim in REVENUE_DIMENSIONS:
+            queries[f'revenue_by_{dim}'] = self._top_by_dimension(lf, dim, 'total_amount', 15)
+        for dim in QUANTITY_DIMENSIONS:
+            queries[f'quantity_by_{dim}'] = self._top_by_dimension(lf, dim, 'quantity', 10)
+
+        frames = dict(zip(queries, pl.collect_all(list(queries.values()))))
+        tables = {name: self._table(frame) for name, frame in frames.items()}
+        tables['cost_totals'] = self._scalar_row(frames['cost_totals'])
+        return tables
+
+
+BACKENDS = {
+    'pandas': PandasBackend,
+    'polars': PolarsBackend,
+}
+
+
+def get_backend(name="pandas"):
+    """Return a backend instance by name ('pandas' or 'polars')."""
+    try:
+        return BACKENDS[name]()
+    except KeyError:
+        raise ValueError(
+            f"Unknown backend {name!r}; choose one of {', '.join(BACKENDS)}"
+        ) from None
+
+
+# ## Backend Parity
+#
+# The pandas backend is the reference: every other backend must produce the
+# same cost totals and chart tables (up to float rounding).
+
+def _normalize(table):
+    table = table.copy()
+    for col in table.columns:
+        if pd.api.types.is_datetime64_any_dtype(table[col]):
+            table[col] = table[col].astype('datetime64[ns]')
+        elif pd.api.types.is_numeric_dtype(table[col]) and not pd.api.types.is_bool_dtype(table[col]):
+            table[col] = table[col].astype('float64')
+        elif not pd.api.types.is_bool_dtype(table[col]):
+            table[col] = table[col].astype(object)
+    return table.sort_values(list(table.columns)).reset_index(drop=True)
+
+
+def check_parity(path, names=("pandas", "polars"), rtol=1e-9):
+    """Compare the chart data of each backend against the pandas reference.
+
+    Returns a dict of table name -> mismatch message (empty when all agree).
+    """
+    reference = PandasBackend()
+    expected = reference.chart_data(reference.load(path))
+    mismatches = {}
+
+    for name in names:
+        if name == reference.name:
+            continue
+        backend = get_backend(name)
+        actual = backend.chart_data(backend.load(path))
+
+        for key, want in expected.items():
+            got = actual.get(key)
+            label = f"{name}:{key}"
+            if got is None:
+                mismatches[label] = "missing"
+            elif isinstance(want, dict):
+                for metric, value in want.items():
+                    if not abs(float(got[metric]) - float(value)) <= rtol * max(1.0, abs(float(value))):
+                        mismatches[f"{label}.{metric}"] = f"{got[metric]} != {value}"
+            else:
+                try:
+                    pd.testing.assert_frame_equal(
+                        _normalize(got), _normalize(want),
+                        check_dtype=False, rtol=rtol
+                    )
+                except AssertionError as exc:
+                    mismatches[label] = str(exc)
+    return mismatches
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) < 2:
+        sys.exit("usage: python backends.py <Amazon.csv> [backend ...]")
+
+    problems = check_parity(sys.argv[1], names=sys.argv[2:] or ["polars"])
+    for label, message in problems.items():
+        print(f"❌ {label}: {message}")
+    if problems:
+        sys.exit(1)
+    print("✅ All backends match the pandas reference")
@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# # Columnar Cache
+#
+# The cleaned dataset is stored one `.npy` file per column, keyed by the
+# source file's path, size and modification time. A warm run loads the arrays
+# directly instead of parsing and cleaning the CSV again. Text columns are
+# stored dictionary-encoded (integer codes + distinct values), so no pickling
+# is involved and they come back as pandas categoricals.
+#
+# A run that only needs some columns caches just those; a later run that needs
+# more parses only the missing columns and adds them to the same cache.
+
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from ingest import partition_paths
+
+
+CACHE_DIR = "../file/cache"
+
+# Bump when the cleaning steps change so old caches are not reused
+CACHE_VERSION = 3
+
+# Position of every cached row in the parsed source, so columns a run did not
+# load can be parsed later and lined up with the cached rows
+ROW_COLUMN = 'source_row'
+
+
+def source_key(path):
+    """Short hash identifying one version of a source file (or of every partition)."""
+    parts = []
+    for part in partition_paths(path):
+        stat = os.stat(part)
+        parts.append(f"{os.path.abspath(part)}|{stat.st_size}|{stat.st_mtime_ns}")
+    raw = "|".join(parts + [str(CACHE_VERSION)])
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def frame_dir(path, cache_dir=CACHE_DIR):
+    return os.path.join(cache_dir, "clean", source_key(path))
+
+
+def _write_column(series, target):
+    """Write one column as `.npy` file(s); returns its kind for the manifest."""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        np.save(target + ".npy", series.to_numpy(dtype="datetime64[ns]").view("int64"))
+        return "datetime"
+    if pd.api.types.is_bool_dtype(series) or pd.api.types.is_numeric_dtype(series):
+        np.save(target + ".npy", series.to_numpy())
+        return "numeric"
+    categorical = pd.Categorical(series)
+    np.save(target + ".npy", categorical.codes)
+    np.save(target + ".values.npy", np.asarray(categorical.categories, dtype=str))
+    return "text"
+
+
+def _write_manifest(directory, manifest):
+    # Written last (and atomically): the manifest marks the columns as usable
+    path = os.path.join(directory, "manifest.json")
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(path + ".tmp", path)
+
+
+def save_frame(df, directory, parsed=None, report=None):
+    """Write every column of `df` to `directory` and a manifest last.
+
+    `parsed` lists the source columns the frame was read with, None when every
+    column was read. Columns outside that list can be added later with
+    `add_columns`. `report` (JSON-serializable) is kept in the manifest.
+    """
+    os.makedirs(directory, exist_ok=True)
+    columns = {col: _write_column(df[col], os.path.join(directory, col)) for col in df.columns}
+    _write_manifest(directory, {
+        'rows': int(len(df)),
+        'columns': columns,
+        'parsed': None if parsed is None else sorted(parsed),
+        'report': report,
+    })
+
+
+def add_columns(df, directory, parsed):
+    """Add the columns of `df` (same rows as the cached frame) to the cache.
+
+    `parsed` lists the source columns that were read for them, including
+    those the source turned out not to have.
+    """
+    manifest = read_manifest(directory)
+    if manifest is None or len(df) != manifest['rows']:
+        raise ValueError(f"{directory!r} does not hold a cached frame of {len(df)} rows")
+    for col in df.columns:
+        manifest['columns'][col] = _write_column(df[col], os.path.join(directory, col))
+    if manifest['parsed'] is not None:
+        manifest['parsed'] = sorted(set(manifest['parsed']) | set(parsed))
+    _write_manifest(directory, manifest)
+
+
+def read_manifest(directory):
+    """The cache manifest (rows, column kinds, parsed columns); None when there is no cache."""
+    manifest_path = os.path.join(directory, "manifest.json")
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def covers(manifest, columns=None):
+    """True when the cached frame can serve `columns` (None: every column)."""
+    if manifest['parsed'] is None:
+        return True
+    return columns is not None and set(columns) <= set(manifest['parsed'])
+
+
+def open_columns(directory, columns=None, mmap=True):
+    """Raw cached columns as `(rows, {name: (kind, values, dictionary)})`.
+
+    With `mmap=True` the arrays are memory-mapped, so slicing a few rows only
+    reads those rows from disk. Returns None when there is no cache.
+    """
+    manifest = read_manifest(directory)
+    if manifest is None:
+        return None
+
+    stored = manifest['columns']
+    wanted = list(stored) if columns is None else [col for col in columns if col in stored]
+    mmap_mode = "r" if mmap else None
+    opened = {}
+    for col in wanted:
+        target = os.path.join(directory, col)
+        dictionary = np.load(target + ".values.npy") if stored[col] == "text" else None
+        opened[col] = (stored[col], np.load(target + ".npy", mmap_mode=mmap_mode), dictionary)
+    return manifest['rows'], opened
+
+
+def decode(column, rows=slice(None)):
+    """Turn one opened column (or the selected `rows` of it) into pandas values."""
+    kind, values, dictionary = column
+    values = np.asarray(values[rows])
+    if kind == "datetime":
+        return values.view("datetime64[ns]")
+    if kind == "text":
+        return pd.Categorical.from_codes(values, dictionary)
+    return values
+
+
+def load_frame(directory, columns=None):
+    """Load the cached frame (or just `columns`); None when there is no cache."""
+    opened = open_columns(directory, columns, mmap=False)
+    if opened is None:
+        return None
+    rows, stored = opened
+    return pd.DataFrame(
+        {col: decode(column) for col, column in stored.items()},
+        index=pd.RangeIndex(rows)
+    )
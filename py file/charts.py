@@ -0,0 +1,490 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# # Charts
+#
+# One function per dashboard figure. Each takes the already aggregated chart
+# table(s) and returns a plotly figure. plotly is imported inside the
+# functions, so runs that never draw a figure (e.g. a KPI-only cron job) do
+# not pay for importing it.
+
+import math
+
+
+def _graph_objects():
+    import plotly.graph_objects as go
+    return go
+
+
+def _express():
+    import plotly.express as px
+    return px
+
+
+def _dropdown(buttons, y):
+    return dict(
+        buttons=buttons,
+        direction="down",
+        showactive=True,
+        x=1,
+        xanchor="right",
+        y=y,
+        yanchor="top"
+    )
+
+
+# ## 1. Revenue and Financial Performance
+
+KPI_CARDS = [
+    ('total_revenue', "Total Revenue", {'prefix': "$", 'valueformat': ',.0f'}),
+    ('aov', "Average Order Value (AOV)", {'prefix': "$", 'valueformat': ',.2f'}),
+    ('total_orders', "Total Orders", {'valueformat': ',.0f'}),
+    ('total_customers', "Total Customers", {'valueformat': ',.0f'}),
+    ('total_quantity', "Total Quantity Sold", {'valueformat': ',.0f'}),
+    ('total_discount', "Total Discount Given", {'prefix': "$", 'valueformat': ',.0f'}),
+]
+
+
+def kpi_cards(kpis):
+    """2-row, 3-column grid of KPI indicator cards."""
+    go = _graph_objects()
+    from plotly.subplots import make_subplots
+
+    fig = make_subplots(
+        rows=2, cols=3,
+        specs=[[{"type": "indicator"}, {"type": "indicator"}, {"type": "indicator"}],
+               [{"type": "indicator"}, {"type": "indicator"}, {"type": "indicator"}]]
+    )
+
+    for i, (key, title, number) in enumerate(KPI_CARDS):
+        fig.add_trace(go.Indicator(
+            mode="number",
+            value=kpis[key],
+            number=number,
+            title={"text": title}
+        ), row=i // 3 + 1, col=i % 3 + 1)
+
+    fig.update_layout(
+        template='plotly_white',
+        height=500,
+        title_text="Key Performance Indicators (KPIs)",
+        title_x=0.5
+    )
+    return fig
+
+
+def kpi_deltas(deltas, window=28):
+    """KPI cards of the last `window` days with their change vs 4 weeks earlier (and YoY)."""
+    go = _graph_objects()
+    from plotly.subplots import make_subplots
+
+    fig = make_subplots(rows=2, cols=3, specs=[[{"type": "indicator"}] * 3] * 2)
+    for i, (key, title, number) in enumerate(KPI_CARDS):
+        card = deltas[key]
+        yoy = "YoY n/a" if math.isnan(card['yoy']) else f"YoY {card['yoy']:+.1%}"
+        indicator = dict(
+            mode="number",
+            value=card['value'],
+            number=number,
+            title={"text": f"{title.replace('Total ', '')}<br><span style='font-size:0.7em'>{yoy}</span>"}
+        )
+        if not math.isnan(card['mom']):
+            indicator.update(
+                mode="number+delta",
+                delta={'reference': card['value'] / (1 + card['mom']), 'relative': True, 'valueformat': '.1%'}
+            )
+        fig.add_trace(go.Indicator(**indicator), row=i // 3 + 1, col=i % 3 + 1)
+
+    fig.update_layout(
+        template='plotly_white',
+        height=500,
+        title_text=f"Last {window} Days vs Previous {window} Days",
+        title_x=0.5
+    )
+    return fig
+
+
+def revenue_trend(df_monthly, df_yearly):
+    """Monthly / yearly revenue lines with a dropdown and COVID markers."""
+    go = _graph_objects()
+    fig = go.Figure()
+
+    fig.add_trace(
+        go.Scatter(
+            x=df_monthly['month'],
+            y=df_monthly['total_amount'],
+            mode='lines+markers',
+            name='Monthly Revenue',
+            visible=True,
+            line=dict(shape='spline')  # Smooth line
+        )
+    )
+    fig.add_trace(
+        go.Scatter(
+            x=df_yearly['year'],
+            y=df_yearly['total_amount'],
+            mode='lines+markers',
+            name='Yearly Revenue',
+            visible=False,
+            line=dict(shape='spline')
+        )
+    )
+
+    # --- COVID Vertical Lines (Initially Hidden) ---
+    fig.update_layout(
+        shapes=[
+            dict(type="line", x0=2020, x1=2020, y0=0, y1=1, xref="x", yref="paper", line=dict(dash="dash", width=2), visible=False),  # COVID start
+            dict(type="line", x0=2022, x1=2022, y0=0, y1=1, xref="x", yref="paper", line=dict(dash="dash", width=2), visible=False)   # Post-COVID recovery
+        ]
+    )
+
+    fig.update_layout(
+        updatemenus=[_dropdown([
+            dict(
+                label="Monthly Revenue",
+                method="update",
+                args=[
+                    {"visible": [True, False]},  # Show monthly, hide yearly
+                    {"title": "Monthly Revenue Trend",
+                     "shapes[0].visible": False,
+                     "shapes[1].visible": False}
+                ],
+            ),
+            dict(
+                label="Yearly Revenue",
+                method="update",
+                args=[
+                    {"visible": [False, True]},  # Show yearly, hide monthly
+                    {"title": "Yearly Revenue Trend (COVID Impact Highlighted)",
+                     "shapes[0].visible": True,
+                     "shapes[1].visible": True}
+                ],
+            ),
+        ], y=1.25)],
+        title="Monthly Revenue Trend",
+        title_x=0.5,
+        template="plotly_white",
+        margin=dict(t=120)
+    )
+    fig.update_xaxes(rangeslider_visible=True)  # Enable range slider
+    return fig
+
+
+def rolling_metrics(rolling, windows=(7, 28, 90)):
+    """Trailing-window revenue, AOV, orders and active customers with a metric dropdown."""
+    go = _graph_objects()
+    metrics = [
+        ('total_amount', "Rolling Revenue"),
+        ('aov', "Rolling AOV"),
+        ('orders', "Rolling Orders"),
+        ('customers', "Rolling Active Customers"),
+    ]
+    fig = go.Figure()
+    for i, (name, _) in enumerate(metrics):
+        for window in windows:
+            fig.add_trace(go.Scatter(
+                x=rolling['day'],
+                y=rolling[f'{name}_{window}d'],
+                mode='lines',
+                name=f'{window}-day',
+                visible=i == 0,
+            ))
+
+    buttons = []
+    for i, (name, title) in enumerate(metrics):
+        visible = [j // len(windows) == i for j in range(len(metrics) * len(windows))]
+        buttons.append(dict(label=title, method="update", args=[{"visible": visible}, {"title": title}]))
+
+    fig.update_layout(
+        updatemenus=[_dropdown(buttons, y=1.25)],
+        title=metrics[0][1],
+        title_x=0.5,
+        template="plotly_white",
+        margin=dict(t=120)
+    )
+    fig.update_xaxes(rangeslider_visible=True)
+    return fig
+
+
+def revenue_by_dimension(tables, total_rev):
+    """Top-15 revenue bars per dimension; `tables` maps dimension -> table."""
+    go = _graph_objects()
+    fig = go.Figure()
+    dimensions = list(tables)
+
+    for i, dim in enumerate(dimensions):
+        grouped = tables[dim].set_index(dim)['total_amount']
+
+        # Shorten long labels
+        x_labels = [str(x)[:30] + ("..." if len(str(x)) > 30 else "") for x in grouped.index]
+
+        fig.add_trace(
+            go.Bar(
+                x=x_labels,
+                y=grouped.values,
+                visible=True if i == 0 else False,  # Show first dimension by default
+                customdata=(grouped.values / total_rev) * 100,  # % of total revenue
+                hovertemplate='%{x}<br>Revenue: $%{y:,.0f}<br>Percent of Total: %{customdata:.2f}%'
+            )
+        )
+
+    buttons = []
+    for i, dim in enumerate(dimensions):
+        visibility = [False] * len(dimensions)
+        visibility[i] = True
+        buttons.append(
+            dict(
+                label=dim.replace('_', ' ').title(),
+                method="update",
+                args=[
+                    {"visible": visibility},
+                    {"title": f"Revenue by {dim.replace('_',' ').title()}"}
+                ]
+            )
+        )
+
+    fig.update_layout(
+        updatemenus=[_dropdown(buttons, y=1.2)],
+        title=f"Revenue by {dimensions[0].replace('_',' ').title()}",
+        title_x=0.5,
+        template="plotly_white",
+        margin=dict(t=120),
+        xaxis=dict(tickangle=45),
+        yaxis=dict(title="Revenue")
+    )
+    return fig
+
+
+def cost_comparison(metrics):
+    """Revenue vs tax, shipping cost and discount; `metrics` maps label -> amount."""
+    import pandas as pd
+    px = _express()
+
+    metrics_df = pd.DataFrame({
+        'Metric': list(metrics.keys()),
+        'Amount': list(metrics.values())
+    })
+
+    fig = px.bar(
+        metrics_df,
+        x='Metric',
+        y='Amount',
+        text='Amount',
+        title="Revenue vs Tax, Shipping Cost, and Discount",
+        labels={'Amount': 'Amount ($)'}
+    )
+    fig.update_traces(texttemplate='$%{y:,.0f}', textposition='outside')
+    fig.update_layout(
+        yaxis=dict(range=[0, max(metrics_df['Amount'])*1.1]),  # Add 10% space above bars
+        title_x=0.5,
+        template='plotly_white'
+    )
+    return fig
+
+
+# ## 2. Sales Performance
+
+def top_quantity_treemap(tables):
+    """Top-10 treemap per dimension; `tables` maps dimension -> table."""
+    go = _graph_objects()
+    fig = go.Figure()
+    dimensions = list(tables)
+
+    for i, dim in enumerate(dimensions):
+        grouped = tables[dim]
+        fig.add_trace(
+            go.Treemap(
+                labels=grouped[dim],
+                parents=[""] * len(grouped),
+                values=grouped['quantity'],
+                marker=dict(
+                    colors=grouped['quantity'],
+                    colorscale="Blues",
+                    colorbar=dict(title="Quantity")
+                ),
+                visible=True if i == 0 else False  # Show first dimension by default
+            )
+        )
+
+    buttons = []
+    for i, dim in enumerate(dimensions):
+        visibility = [False] * len(dimensions)
+        visibility[i] = True
+        buttons.append(
+            dict(
+                label=dim.replace('_', ' ').title(),
+                method="update",
+                args=[
+                    {"visible": visibility},
+                    {"title": f"Top 10 {dim.replace('_',' ').title()} by Quantity Sold"}
+                ]
+            )
+        )
+
+    fig.update_layout(
+        updatemenus=[_dropdown(buttons, y=1.15)],
+        title=f"Top 10 {dimensions[0].replace('_',' ').title()} by Quantity Sold",
+        title_x=0.5,
+        template="plotly_white",
+        margin=dict(t=100)
+    )
+    return fig
+
+
+def price_sensitivity(grouped):
+    """Average quantity sold per price bin midpoint."""
+    px = _express()
+    fig = px.line(
+        grouped,
+        x='price_mid',
+        y='quantity',
+        markers=True,
+        title="Price Sensitivity Analysis"
+    )
+    fig.update_layout(
+        title_x=0.5,
+        xaxis_title="Price",
+        yaxis_title="Average Quantity Sold",
+        template="plotly_white"
+    )
+    return fig
+
+
+def sales_by_location(country_table):
+    """Choropleth of quantity by country (ISO-3 codes)."""
+    px = _express()
+    fig = px.choropleth(
+        country_table,
+        locations="country_code",
+        locationmode='ISO-3',
+        color="quantity",
+        hover_name="country",
+        color_continuous_scale='Plasma',
+        title='Global Revenue Heatmap'
+    )
+    fig.update_layout(title_x=0.5)
+    return fig
+
+
+def seller_scorecard(top_sellers):
+    """Top sellers by revenue, coloured by repeat-customer share."""
+    px = _express()
+    fig = px.bar(
+        top_sellers,
+        x='seller_id',
+        y='revenue',
+        color='repeat_share',
+        hover_data=['orders', 'units', 'aov', 'discount_rate', 'customers'],
+        title='Seller Scorecard: Top Sellers by Revenue',
+        labels={'seller_id': 'Seller', 'revenue': 'Revenue', 'repeat_share': 'Repeat Share'}
+    )
+    fig.update_layout(template="plotly_white", title_x=0.5)
+    return fig
+
+
+# ## 3. Customer Behavior
+
+def revenue_concentration(curves):
+    """Cumulative revenue % by rank %, one line per dimension; `curves` maps a label -> Pareto table."""
+    go = _graph_objects()
+    fig = go.Figure()
+    for label, curve in curves.items():
+        fig.add_trace(go.Scatter(
+            x=curve['rank_percent'],
+            y=curve['cumulative_percent'],
+            mode='lines',
+            name=label,
+        ))
+    fig.update_layout(
+        title='Revenue Concentration',
+        xaxis_title='Entity % (Top to Bottom)',
+        yaxis_title='Cumulative Revenue %',
+        title_x=0.5,
+        template='plotly_white'
+    )
+    return fig
+
+
+def purchase_frequency(orders_per_customer):
+    """Histogram of orders per customer."""
+    px = _express()
+    fig = px.histogram(
+        orders_per_customer,
+        x='order_count',
+        nbins=20,
+        title='Customer Purchase Frequency Distribution',
+        labels={'order_count': 'Number of Orders per Customer'}
+    )
+    fig.update_layout(
+        title_x=0.5,
+        template='plotly_white'
+    )
+    return fig
+
+
+def customer_types(monthly_customers):
+    """New vs returning customers per month."""
+    px = _express()
+    fig = px.line(
+        monthly_customers,
+        x='order_date',
+        y='customer_id',
+        color='customer_type',
+        title='New vs Returning Customers Over Time',
+        labels={'customer_id': 'Number of Customers'}
+    )
+    fig.update_layout(
+        title_x=0.5,
+        template='plotly_white'
+    )
+    return fig
+
+
+# ## 4. Discount & Pricing Strategy
+
+def discount_vs_revenue(discount_revenue):
+    """Scatter of discount vs revenue per order."""
+    px = _express()
+    return px.scatter(
+        discount_revenue,
+        x='discount',
+        y='total_amount',
+        title='Discount vs Revenue per Order',
+        labels={'discount': 'Total Discount', 'total_amount': 'Order Revenue'}
+    )
+
+
+def revenue_by_discount(revenue_by_discount):
+    """Revenue of discounted vs non-discounted orders."""
+    px = _express()
+    return px.bar(
+        revenue_by_discount,
+        x='has_discount',
+        y='total_amount',
+        title='Revenue: Discounted vs Non-Discounted Orders',
+        labels={'has_discount': 'Discount Applied', 'total_amount': 'Revenue'}
+    )
+
+
+def average_discount_by_category(avg_discount_category):
+    """Average discount per category."""
+    px = _express()
+    return px.bar(
+        avg_discount_category,
+        x='category',
+        y='discount',
+        title='Average Discount by Category'
+    )
+
+
+def revenue_by_discount_depth(depth):
+    """Revenue and line count per discount-depth bucket."""
+    px = _express()
+    return px.bar(
+        depth,
+        x='depth',
+        y='total_amount',
+        hover_data=['lines', 'quantity', 'discount_amount', 'revenue_share'],
+        title='Revenue by Discount Depth',
+        labels={'depth': 'Discount Depth', 'total_amount': 'Revenue'}
+    )
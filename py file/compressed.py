@@ -0,0 +1,219 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# # Compressed Inputs
+#
+# gzip, bz2 and zstd exports are read as a stream: a background thread
+# decompresses fixed-size blocks into a bounded queue while the CSV parser
+# consumes the previous ones, so nothing is written to disk and
+# decompression overlaps with parsing. Readers that need a plain file (polars'
+# scan_csv) get the stream copied into a temporary file instead.
+#
+# zstd files written as independent frames with size-prefixed skippable
+# frames (the `pzstd` layout) are decompressed frame by frame on several
+# threads. `zstandard` is optional and only needed for .zst inputs.
+
+import bz2
+import gzip
+import io
+import os
+import queue
+import shutil
+import struct
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+
+# File suffix -> compression name
+COMPRESSIONS = {'.gz': 'gzip', '.bz2': 'bz2', '.zst': 'zstd'}
+
+BLOCK_SIZE = 4 * 1024 * 1024   # decompressed bytes handed to the parser at a time
+QUEUE_BLOCKS = 8               # blocks decompressed ahead of the parser
+
+# pzstd prefixes each frame with a skippable frame holding its compressed size
+SKIPPABLE_MAGIC = 0x184D2A50
+SKIPPABLE_MASK = 0xFFFFFFF0
+
+
+def compression_of(path):
+    """'gzip', 'bz2', 'zstd' or None, from the file suffix."""
+    return COMPRESSIONS.get(os.path.splitext(path)[1].lower())
+
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError as exc:
+        raise ImportError(
+            "Reading .zst files needs the 'zstandard' package: pip install zstandard"
+        ) from exc
+    return zstandard
+
+
+def pzstd_frames(path):
+    """(offset, size) of every frame of a pzstd-layout file, or None for other layouts."""
+    frames = []
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        offset = 0
+        while offset < size:
+            header = f.read(12)
+            if len(header) < 12:
+                return None
+            magic, length, frame_size = struct.unpack("<III", header)
+            if magic & SKIPPABLE_MASK != SKIPPABLE_MAGIC or length != 4:
+                return None
+            offset += 12
+            frames.append((offset, frame_size))
+            offset += frame_size
+            f.seek(offset)
+    return frames or None
+
+
+def _stream_blocks(path, compression):
+    """Decompressed blocks of a file, one serial stream."""
+    if compression == "zstd":
+        raw = open(path, "rb")
+        stream = _zstandard().ZstdDecompressor().stream_reader(raw, read_across_frames=True, closefd=True)
+    elif compression == "gzip":
+        stream = gzip.open(path, "rb")
+    else:
+        stream = bz2.open(path, "rb")
+    with stream:
+        while True:
+            block = stream.read(BLOCK_SIZE)
+            if not block:
+                return
+            yield block
+
+
+def _parallel_zstd_blocks(path, frames, workers):
+    """Decompressed frames of a pzstd file, several frames in flight at once."""
+    zstandard = _zstandard()
+
+    def decompress(frame):
+        offset, size = frame
+        with open(path, "rb") as f:
+            f.seek(offset)
+            data = f.read(size)
+        # decompressobj does not need the content size in the frame header
+        return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = []
+        for frame in frames:
+            pending.append(executor.submit(decompress, frame))
+            if len(pending) > 2 * workers:
+                yield pending.pop(0).result()
+        for future in pending:
+            yield future.result()
+
+
+class ReadAheadReader(io.RawIOBase):
+    """Binary file object fed by a producer thread through a bounded queue."""
+
+    _DONE = object()
+
+    def __init__(self, blocks, depth=QUEUE_BLOCKS):
+        self._queue = queue.Queue(maxsize=depth)
+        self._stop = threading.Event()
+        self._buffer = memoryview(b"")
+        self._finished = False
+        self._thread = threading.Thread(target=self._produce, args=(blocks,), daemon=True)
+        self._thread.start()
+
+    def _put(self, item):
+        """Queue `item` unless the reader is closed first; True when queued."""
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _produce(self, blocks):
+        try:
+            for block in blocks:
+                if not self._put(block):
+                    blocks.close()
+                    return
+            self._put(self._DONE)
+        except BaseException as exc:  # re-raised in the reading thread
+            self._put(exc)
+
+    def readable(self):
+        return True
+
+    def readinto(self, target):
+        while not self._buffer and not self._finished:
+            item = self._queue.get()
+            if item is self._DONE:
+                self._finished = True
+            elif isinstance(item, BaseException):
+                self._finished = True
+                raise item
+            else:
+                self._buffer = memoryview(item)
+        n = min(len(target), len(self._buffer))
+        target[:n] = self._buffer[:n]
+        self._buffer = self._buffer[n:]
+        return n
+
+    def close(self):
+        self._stop.set()
+        # Unblock a producer waiting on a full queue
+        while not self._queue.empty():
+            self._queue.get_nowait()
+        super().close()
+
+
+def open_compressed(path, workers=None):
+    """Buffered binary stream of the decompressed contents of `path`."""
+    compression = compression_of(path)
+    if compression is None:
+        raise ValueError(f"{path!r} is not a gzip, bz2 or zstd file")
+
+    frames = pzstd_frames(path) if compression == "zstd" else None
+    if frames and len(frames) > 1:
+        workers = workers or os.cpu_count() or 1
+        blocks = _parallel_zstd_blocks(path, frames, workers)
+    else:
+        blocks = _stream_blocks(path, compression)
+    return io.BufferedReader(ReadAheadReader(blocks), buffer_size=BLOCK_SIZE)
+
+
+# Decompressed copies made by spooled_copy: {(path, size, mtime): copy}
+_SPOOLED = {}
+_SPOOL_DIR = None
+
+
+def spooled_copy(path, workers=None):
+    """Path of a plain copy of compressed `path`, decompressed once per file version.
+
+    The copies live in a temporary directory removed when the process exits.
+    """
+    global _SPOOL_DIR
+    key = (os.path.abspath(path), os.path.getsize(path), os.path.getmtime(path))
+    if key not in _SPOOLED:
+        if _SPOOL_DIR is None:
+            _SPOOL_DIR = tempfile.TemporaryDirectory(prefix="amazon-")
+        fd, target = tempfile.mkstemp(suffix=".csv", dir=_SPOOL_DIR.name)
+        with os.fdopen(fd, "wb") as out, open_compressed(path, workers) as stream:
+            shutil.copyfileobj(stream, out, BLOCK_SIZE)
+        _SPOOLED[key] = target
+    return _SPOOLED[key]
+
+
+def read_csv(path, **kwargs):
+    """pd.read_csv that streams compressed files instead of decompressing to disk.
+
+    `path` may also be an open binary buffer, which is parsed as plain CSV.
+    """
+    if not isinstance(path, (str, os.PathLike)) or compression_of(path) is None:
+        return pd.read_csv(path, **kwargs)
+    with open_compressed(path) as stream:
+        return pd.read_csv(stream, **kwargs)
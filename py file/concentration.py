@@ -0,0 +1,202 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# # Revenue Concentration
+#
+# Lorenz curve, Gini coefficient and top-X% shares ("top 10% of customers =
+# N% of revenue") of any dimension, from one value per entity (revenue per
+# customer, product, seller, ...). Two modes:
+#
+# - `exact`     - one sort of the value array
+# - `histogram` - one O(n) pass into log-spaced bins whose edges are ~1%
+#   apart (no sort). The Lorenz curve is exact at every bin edge, since all
+#   values of a lower bin are smaller than those of a higher one; inside a bin
+#   values are taken as equal, so Gini and top shares are off by well under
+#   a percent. Histograms of batches or partitions can be merged.
+#
+# `auto` sorts up to EXACT_LIMIT entities and uses the histogram beyond.
+
+import numpy as np
+import pandas as pd
+
+
+# Top shares reported by default (percent of entities, largest first)
+TOP_PERCENTS = (1, 10, 20, 50)
+
+LORENZ_POINTS = 1001          # points of the returned curve
+EXACT_LIMIT = 5_000_000       # `auto` mode sorts up to this many entities
+RELATIVE_ACCURACY = 0.01      # histogram bin half-width, relative to the value
+
+MODES = ("auto", "exact", "histogram")
+
+
+class Concentration:
+    """Lorenz curve, Gini and top-X% shares of one dimension."""
+
+    def __init__(self, lorenz, gini, top_shares, entities, mode):
+        self.lorenz = lorenz          # population_share -> value_share, both 0..1, ascending
+        self.gini = gini
+        self.top_shares = top_shares  # percent of entities -> share of the total (0..1)
+        self.entities = entities
+        self.mode = mode
+
+    def pareto(self):
+        """The curve from the largest entity down, in percent (chart input)."""
+        return pd.DataFrame({
+            'rank_percent': 100 * (1 - self.lorenz['population_share'].to_numpy()[::-1]),
+            'cumulative_percent': 100 * (1 - self.lorenz['value_share'].to_numpy()[::-1]),
+        })
+
+    def summary(self):
+        """Flat numbers: gini, top_<X>_share for every X, entities."""
+        return {
+            'gini': self.gini,
+            **{f'top_{percent}_share': share for percent, share in self.top_shares.items()},
+            'entities': self.entities,
+        }
+
+
+def _lorenz_on_grid(population, value, points):
+    grid = np.linspace(0.0, 1.0, points)
+    return pd.DataFrame({'population_share': grid, 'value_share': np.interp(grid, population, value)})
+
+
+def _gini(population, value):
+    """1 - 2 * area under the (piecewise linear) Lorenz curve."""
+    return float(1 - np.sum(np.diff(population) * (value[1:] + value[:-1])))
+
+
+def _empty(percents, points, mode):
+    grid = np.linspace(0.0, 1.0, points)
+    return Concentration(
+        pd.DataFrame({'population_share': grid, 'value_share': grid}),
+        np.nan, {percent: np.nan for percent in percents}, 0, mode,
+    )
+
+
+def exact_concentration(values, percents=TOP_PERCENTS, points=LORENZ_POINTS):
+    """Concentration from a full sort of the values."""
+    ordered = np.sort(values)
+    if len(ordered) and ordered[0] < 0:
+        raise ValueError("Concentration needs non-negative values")
+    n = len(ordered)
+    cumulative = np.concatenate([[0.0], np.cumsum(ordered)])
+    total = cumulative[-1]
+    if n == 0 or total <= 0:
+        return _empty(percents, points, "exact")
+
+    population = np.arange(n + 1) / n
+    value = cumulative / total
+    top_shares = {}
+    for percent in percents:
+        k = int(np.ceil(percent / 100 * n))
+        top_shares[percent] = float((total - cumulative[n - k]) / total)
+    return Concentration(_lorenz_on_grid(population, value, points), _gini(population, value),
+                         top_shares, n, "exact")
+
+
+class ValueHistogram:
+    """Counts and sums of non-negative values in log-spaced bins (mergeable).
+
+    Bin i holds values in (gamma**(i-1), gamma**i] with
+    gamma = (1 + alpha) / (1 - alpha); zeros are counted apart.
+    """
+
+    def __init__(self, counts, sums, offset=0, zeros=0, alpha=RELATIVE_ACCURACY):
+        self.counts = counts  # int64 per bin, bins offset .. offset + len - 1
+        self.sums = sums      # float64 per bin
+        self.offset = offset
+        self.zeros = zeros
+        self.alpha = alpha
+
+    @property
+    def gamma(self):
+        return (1 + self.alpha) / (1 - self.alpha)
+
+    @classmethod
+    def from_values(cls, values, alpha=RELATIVE_ACCURACY):
+        values = np.asarray(values, dtype="float64")
+        if (values < 0).any():
+            raise ValueError("Concentration needs non-negative values")
+        positive = values[values > 0]
+        if not len(positive):
+            return cls(np.zeros(0, np.int64), np.zeros(0), 0, len(values), alpha)
+
+        gamma = (1 + alpha) / (1 - alpha)
+        bins = np.ceil(np.log(positive) / np.log(gamma)).astype(np.int64)
+        offset = int(bins.min())
+        bins -= offset
+        return cls(
+            np.bincount(bins).astype(np.int64),
+            np.bincount(bins, weights=positive),
+            offset, len(values) - len(positive), alpha,
+        )
+
+    def merge(self, other):
+        """Histogram of both value sets (same accuracy required)."""
+        if other.alpha != self.alpha:
+            raise ValueError("Cannot merge histograms with different accuracy")
+        if not len(other.counts) or not len(self.counts):
+            base = self if len(self.counts) else other
+            return ValueHistogram(base.counts.copy(), base.sums.copy(), base.offset,
+                                  self.zeros + other.zeros, self.alpha)
+
+        offset = min(self.offset, other.offset)
+        size = max(self.offset + len(self.counts), other.offset + len(other.counts)) - offset
+        counts = np.zeros(size, np.int64)
+        sums = np.zeros(size)
+        for part in (self, other):
+            start = part.offset - offset
+            counts[start:start + len(part.counts)] += part.counts
+            sums[start:start + len(part.sums)] += part.sums
+        return ValueHistogram(counts, sums, offset, self.zeros + other.zeros, self.alpha)
+
+    def to_dict(self):
+        """JSON-ready state (bins with no values are dropped)."""
+        used = np.flatnonzero(self.counts)
+        return {
+            'alpha': self.alpha, 'zeros': int(self.zeros), 'offset': int(self.offset),
+            'bins': used.tolist(), 'counts': self.counts[used].tolist(), 'sums': self.sums[used].tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        size = state['bins'][-1] + 1 if state['bins'] else 0
+        counts = np.zeros(size, np.int64)
+        sums = np.zeros(size)
+        counts[state['bins']] = state['counts']
+        sums[state['bins']] = state['sums']
+        return cls(counts, sums, state['offset'], state['zeros'], state['alpha'])
+
+    def concentration(self, percents=TOP_PERCENTS, points=LORENZ_POINTS):
+        n = int(self.counts.sum()) + self.zeros
+        total = float(self.sums.sum())
+        if n == 0 or total <= 0:
+            return _empty(percents, points, "histogram")
+
+        # Lorenz points at every bin edge (zeros form the first bin)
+        counts = np.concatenate([[0, self.zeros], self.counts])
+        sums = np.concatenate([[0.0, 0.0], self.sums])
+        population = np.cumsum(counts) / n
+        value = np.cumsum(sums) / total
+
+        top_shares = {}
+        for percent in percents:
+            # Share held by the largest `percent`% = 1 - Lorenz at the rest
+            top_shares[percent] = float(1 - np.interp(1 - np.ceil(percent / 100 * n) / n, population, value))
+        return Concentration(_lorenz_on_grid(population, value, points), _gini(population, value),
+                             top_shares, n, "histogram")
+
+
+def concentration(values, mode="auto", percents=TOP_PERCENTS, points=LORENZ_POINTS,
+                  alpha=RELATIVE_ACCURACY):
+    """Concentration of one value per entity (NaN values are ignored)."""
+    if mode not in MODES:
+        raise ValueError(f"Unknown mode {mode!r}; choose one of {', '.join(MODES)}")
+    values = np.asarray(values, dtype="float64")
+    values = values[~np.isnan(values)]
+    if mode == "auto":
+        mode = "exact" if len(values) <= EXACT_LIMIT else "histogram"
+    if mode == "exact":
+        return exact_concentration(values, percents, points)
+    return ValueHistogram.from_values(values, alpha).concentration(percents, points)
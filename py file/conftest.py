@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# # Test Fixtures
+#
+# Small synthetic exports in the Kaggle layout (CamelCase headers, dollar
+# amounts), written to a temporary folder.
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backends import get_backend
+
+
+ROWS = 240
+
+
+def synthetic_export(rows=ROWS, seed=7):
+    """Raw export rows whose TotalAmount satisfies the amount identity."""
+    rng = np.random.default_rng(seed)
+    quantity = rng.integers(1, 5, rows)
+    unit_price = rng.choice([9.99, 24.5, 129.0, 349.95], rows)
+    discount = rng.choice([0.0, 0.0, 0.05, 0.1, 0.2], rows)
+    tax = np.round(quantity * unit_price * 0.08, 2)
+    shipping = rng.choice([0.0, 4.99, 12.5], rows)
+    return pd.DataFrame({
+        'OrderID': [f"ORD{i:07d}" for i in rng.integers(0, rows // 2, rows)],
+        'OrderDate': pd.Timestamp("2022-01-01") + pd.to_timedelta(rng.integers(0, 730, rows), unit="D"),
+        'CustomerID': [f"CUST{i:06d}" for i in rng.integers(0, 60, rows)],
+        'CustomerName': rng.choice(["  Ana Diaz ", "Li Wei", "Sam Okoro"], rows),
+        'ProductID': [f"P{i:04d}" for i in rng.integers(0, 12, rows)],
+        'ProductName': rng.choice(["Desk Lamp", "Mechanical Keyboard", "Yoga Mat", "Water Bottle"], rows),
+        'Category': rng.choice(["Electronics", "Home & Kitchen", "Sports & Outdoors"], rows),
+        'Brand': rng.choice(["Acme", "Nova", "Zenith"], rows),
+        'Quantity': quantity,
+        'UnitPrice': unit_price,
+        'Discount': discount,
+        'Tax': tax,
+        'ShippingCost': shipping,
+        'TotalAmount': np.round(quantity * unit_price * (1 - discount) + tax + shipping, 2),
+        'PaymentMethod': rng.choice(["UPI", "Credit Card", "Cash on Delivery"], rows),
+        'OrderStatus': rng.choice(["Delivered", "Shipped", "Returned"], rows),
+        'City': rng.choice(["Toronto", "Mumbai", "Austin"], rows),
+        'State': rng.choice(["ON", "MH", "TX"], rows),
+        'Country': rng.choice(["Canada", "India", "United States"], rows),
+        'SellerID': [f"SELL{i:04d}" for i in rng.integers(0, 8, rows)],
+    })
+
+
+def dirty_export(raw, repeats=5):
+    """`raw` with one failing row per validation check below and `repeats` rows delivered twice."""
+    raw = raw.copy()
+    faults = {
+        'CustomerID': None,            # null_customer_id
+        'TotalAmount': None,           # null_amount
+        'Quantity': 0,                 # quantity_range (and amount_mismatch)
+        'UnitPrice': -1.0,             # unit_price_range (and amount_mismatch)
+        'Discount': 1.5,               # discount_range (and amount_mismatch)
+        'Tax': -2.0,                   # tax_range (and amount_mismatch)
+        'ShippingCost': -3.0,          # shipping_range (and amount_mismatch)
+        'OrderDate': pd.Timestamp("1999-06-30"),  # date_range
+    }
+    for row, (col, value) in enumerate(faults.items()):
+        raw[col] = raw[col].astype(object)
+        raw.loc[row, col] = value
+    raw.loc[len(faults), 'TotalAmount'] = -5.0  # total_range (and amount_mismatch)
+    raw.loc[len(faults) + 1, 'TotalAmount'] += 5.0  # amount_mismatch
+    return pd.concat([raw, raw.tail(repeats)], ignore_index=True)
+
+
+def write_export(path, raw):
+    raw.to_csv(path, index=False, date_format="%Y-%m-%d")
+    return str(path)
+
+
+@pytest.fixture(scope="module")
+def export_path(tmp_path_factory):
+    """A raw CSV export of ROWS lines."""
+    return write_export(tmp_path_factory.mktemp("raw") / "Amazon.csv", synthetic_export())
+
+
+@pytest.fixture(scope="module")
+def loaded(export_path):
+    """The export cleaned by the pandas backend (money in cents)."""
+    backend = get_backend("pandas")
+    return backend.to_pandas(backend.load(export_path))
+
+
+@pytest.fixture(params=["pandas", "polars"])
+def backend(request):
+    """Each dataframe backend (polars tests are skipped when it is not installed)."""
+    if request.param == "polars":
+        pytest.importorskip("polars")
+    return get_backend(request.param)
+
+
+@pytest.fixture(scope="module")
+def dirty_dir(tmp_path_factory):
+    """Two partitions: the second repeats the last rows of the first; both have bad and repeated rows."""
+    folder = tmp_path_factory.mktemp("dirty")
+    raw = dirty_export(synthetic_export())
+    second = dirty_export(synthetic_export(seed=11))
+    write_export(folder / "a.csv", raw)
+    write_export(folder / "b.csv", pd.concat([raw.tail(20), second], ignore_index=True))
+    return str(folder)
+
+
+@pytest.fixture
+def run_dir(tmp_path, monkeypatch):
+    """Work from an empty directory so ../file and ../visuals stay under tmp_path."""
+    folder = tmp_path / "run"
+    folder.mkdir()
+    monkeypatch.chdir(folder)
+    return tmp_path
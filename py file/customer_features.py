@@ -0,0 +1,184 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# # Customer Feature Table (RFM)
+#
+# One row per customer_id with first/last purchase date, order and line
+# counts, revenue (monetary), quantity and discount totals. The table is
+# built in one grouped pass, stored column by column (cache.py), and updated
+# by folding in only the newly arrived transactions. Pareto, purchase
+# frequency, new vs returning customers and RFM segments all read from it.
+#
+# Next to it the distinct (customer_id, order_id, order_date) triples are
+# kept, so order counts stay distinct when an order's lines arrive in two batches
+# (a watched file growing mid-order) and monthly active customers are exact.
+# Money (monetary, discount_amount) is kept in cents and reported in dollars.
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from cache import CACHE_DIR, load_frame, save_frame
+from money import to_dollars
+
+
+FEATURES_DIR = os.path.join(CACHE_DIR, "customers")
+
+# Sub-directory of the feature table holding the customer orders
+ORDERS_DIR = "customer_orders"
+
+# How each stored column combines when two tables are merged; order_count
+# is recounted from the customer orders instead
+MERGE_RULES = {
+    'first_purchase': 'min',
+    'last_purchase': 'max',
+    'lines': 'sum',
+    'monetary': 'sum',
+    'quantity': 'sum',
+    'discount_amount': 'sum',
+    'discounted_lines': 'sum',
+}
+
+
+def customer_features(df):
+    """One grouped pass over the transactions -> one row per customer."""
+    frame = pd.DataFrame({
+        'customer_id': df['customer_id'],
+        'order_id': df['order_id'],
+        'order_date': df['order_date'],
+        'total_amount': df['total_amount'],
+        'quantity': df['quantity'],
+        'discount_amount': df['quantity'] * df['unit_price'] * df['discount'],
+        'discounted': df['discount'] > 0,
+    })
+    return (
+        frame.groupby('customer_id', observed=True, sort=True)
+        .agg(
+            first_purchase=('order_date', 'min'),
+            last_purchase=('order_date', 'max'),
+            order_count=('order_id', 'nunique'),
+            lines=('order_id', 'size'),
+            monetary=('total_amount', 'sum'),
+            quantity=('quantity', 'sum'),
+            discount_amount=('discount_amount', 'sum'),
+            discounted_lines=('discounted', 'sum'),
+        )
+        .reset_index()
+    )
+
+
+def customer_orders(df):
+    """Distinct (customer_id, order_id, order_date) rows, sorted."""
+    frame = pd.DataFrame({
+        'customer_id': df['customer_id'].astype(str),
+        'order_id': df['order_id'].astype(str),
+        'order_date': df['order_date'],
+    })
+    return frame.drop_duplicates().sort_values(list(frame.columns)).reset_index(drop=True)
+
+
+class CustomerFeatures:
+    """Persistent, incrementally updated customer feature table."""
+
+    def __init__(self, table, orders):
+        self.table = table
+        self.orders = orders
+
+    @classmethod
+    def build(cls, df):
+        return cls(customer_features(df), customer_orders(df))
+
+    @classmethod
+    def load(cls, path=FEATURES_DIR):
+        table = load_frame(path)
+        orders = load_frame(os.path.join(path, ORDERS_DIR))
+        return None if table is None or orders is None else cls(table, orders)
+
+    def save(self, path=FEATURES_DIR):
+        save_frame(self.table, path)
+        save_frame(self.orders, os.path.join(path, ORDERS_DIR))
+
+    def update(self, new_rows):
+        """Fold a batch of new transactions into the table."""
+        self.orders = customer_orders(pd.concat([self.orders, new_rows], ignore_index=True))
+
+        combined = pd.concat(
+            [self.table, customer_features(new_rows)], ignore_index=True
+        )
+        combined['customer_id'] = combined['customer_id'].astype(str)
+        table = (
+            combined.groupby('customer_id', sort=True)
+            .agg(MERGE_RULES)
+            .reset_index()
+        )
+        # An order whose lines arrive in two batches is still one order
+        order_count = self.orders.groupby('customer_id')['order_id'].nunique()
+        table['order_count'] = table['customer_id'].map(order_count)
+        self.table = table[list(self.table.columns)]
+        return self
+
+    # --- Views used by the customer charts ---
+
+    def revenue_ranking(self):
+        """Customers by revenue, high to low (the Pareto chart input)."""
+        ranked = self.table[['customer_id', 'monetary']].rename(columns={'monetary': 'total_amount'})
+        ranked = (
+            ranked.sort_values(['total_amount', 'customer_id'], ascending=[False, True])
+            .reset_index(drop=True)
+        )
+        ranked['total_amount'] = to_dollars(ranked['total_amount'])
+        return ranked
+
+    def orders_per_customer(self):
+        return self.table[['customer_id', 'order_count']].reset_index(drop=True)
+
+    def new_customers_monthly(self):
+        """Customers whose first purchase falls in each month."""
+        months = self.table['first_purchase'].dt.to_period('M').dt.to_timestamp()
+        return months.value_counts().sort_index().rename_axis('order_date').reset_index(name='customer_id')
+
+    def rfm(self, as_of=None, scores=5):
+        """Recency / frequency / monetary values with 1..`scores` quantile scores."""
+        table = self.table
+        as_of = pd.Timestamp(as_of) if as_of is not None else table['last_purchase'].max()
+
+        rfm = pd.DataFrame({
+            'customer_id': table['customer_id'],
+            'recency_days': (as_of - table['last_purchase']).dt.days,
+            'frequency': table['order_count'],
+            'monetary': to_dollars(table['monetary']),
+        })
+        # Rank first so ties never produce duplicate quantile edges
+        for col, ascending in (('recency_days', False), ('frequency', True), ('monetary', True)):
+            ranks = rfm[col].rank(method='first', ascending=ascending)
+            rfm[col[0] + '_score'] = np.ceil(ranks * scores / len(rfm)).astype('int64')
+        rfm['segment'] = (
+            rfm['r_score'].astype(str) + rfm['f_score'].astype(str) + rfm['m_score'].astype(str)
+        )
+        return rfm
+
+
+def new_vs_returning_monthly(features):
+    """New vs returning customers per month from the feature table.
+
+    New customers come from first-purchase months; returning customers are the
+    month's other active customers, counted exactly from the customer orders.
+    """
+    orders = features.orders
+    months = orders['order_date'].dt.to_period('M').dt.to_timestamp()
+    active = (
+        pd.DataFrame({'order_date': months, 'customer_id': orders['customer_id']})
+        .drop_duplicates()
+        .groupby('order_date')
+        .size()
+    )
+    new = features.new_customers_monthly().set_index('order_date')['customer_id']
+    new = new.reindex(active.index, fill_value=0)
+    returning = active - new
+
+    frame = pd.concat([
+        pd.DataFrame({'order_date': active.index, 'customer_type': 'New', 'customer_id': new.to_numpy()}),
+        pd.DataFrame({'order_date': active.index, 'customer_type': 'Returning', 'customer_id': returning.to_numpy()}),
+    ], ignore_index=True)
+    return frame.sort_values(['order_date', 'customer_type']).reset_index(drop=True)
@@ -0,0 +1,230 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# # Incremental Deduplication
+#
+# Feeds redeliver overlapping days, so the same order lines show up in several
+# files. Every row gets a 64-bit fingerprint (vectorized hash of its key
+# columns). The fingerprints of every source ingested so far are kept on disk
+# as one sorted array, so a new file is checked against all history with a
+# binary search - the earlier files are never reloaded.
+#
+# A row is a duplicate when it repeats within its file or some source
+# ingested before (in this run or an earlier one) delivered it; a file
+# ingested again unchanged is dropped whole. A source is a file path plus the
+# content hash of its rows: a file rewritten with other content replaces what
+# it delivered before. An index opened with `path=None` lives in memory only,
+# so history is limited to the current input.
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+
+DEDUP_DIR = "../file/cache/dedup"
+
+# Columns added by the pipeline itself; they never take part in the key
+LINEAGE_COLUMNS = ('source_partition', 'source_row')
+
+# Columns identifying one order line. A fixed key means a run that loads only
+# some columns (see pipeline.stage_columns) fingerprints rows like a full run.
+LINE_KEY = (
+    'order_id', 'order_date', 'customer_id', 'product_id', 'quantity',
+    'unit_price', 'discount', 'tax', 'shipping_cost', 'total_amount',
+)
+
+
+def fingerprints(df, key=None):
+    """64-bit fingerprint per row of the `key` columns.
+
+    The default key is the LINE_KEY columns present in the frame, or every
+    non-lineage column when none of them is. Values are hashed in one form
+    whatever their dtype (numbers as float64, dates in ns, text as objects), so
+    both backends, a fresh parse and the cache agree on every fingerprint.
+    """
+    if key is None:
+        key = [col for col in LINE_KEY if col in df.columns]
+        key = key or [col for col in df.columns if col not in LINEAGE_COLUMNS]
+    frame = pd.DataFrame({col: _hashable(df[col]) for col in key})
+    return pd.util.hash_pandas_object(frame, index=False).to_numpy()
+
+
+def _hashable(series):
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series.astype('datetime64[ns]').reset_index(drop=True)
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        return pd.Series(series.to_numpy(dtype='float64', na_value=np.nan))
+    return pd.Series(series.to_numpy(dtype=object, na_value=None))
+
+
+def content_hash(fps):
+    """Order-independent hash of a set of rows: the sum of their fingerprints mod 2**64.
+
+    Sums add up, so the hash of a file equals the hash of its first rows plus
+    the hash of the rows appended later.
+    """
+    return int(np.sum(fps, dtype=np.uint64))
+
+
+class FingerprintIndex:
+    """Sorted fingerprints of the rows of every source ingested so far.
+
+    Each (fingerprint, source) pair is stored once, so a row delivered by two
+    files is held for both. Files on disk:
+    - `fingerprints.npy` - sorted uint64 fingerprints
+    - `sources.npy`      - id of the source each fingerprint belongs to
+    - `files.json`       - per-source id, content (row count, hash) and duplicate report
+
+    With `path=None` the index lives in memory only and `save` does nothing.
+    """
+
+    def __init__(self, path=DEDUP_DIR):
+        self.path = path
+        self.fingerprints = np.empty(0, dtype=np.uint64)
+        self.sources = np.empty(0, dtype=np.int32)
+        self.files = {}
+
+        if path is not None and os.path.exists(self._file("files.json")):
+            with open(self._file("files.json"), encoding="utf-8") as f:
+                self.files = json.load(f)
+            self.fingerprints = np.load(self._file("fingerprints.npy"), mmap_mode="r")
+            self.sources = np.load(self._file("sources.npy"), mmap_mode="r")
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    def register(self, source, fps, append=False):
+        """`(source id, already indexed)` for the rows `fps` read from `source`.
+
+        A source that comes back with other content is a new delivery: its old
+        fingerprints are dropped. With `append` the rows extend what the source
+        delivered before instead.
+        """
+        content = [len(fps), content_hash(fps)]
+        entry = self.files.get(source)
+        if entry is None:
+            next_id = max((item['id'] for item in self.files.values()), default=-1) + 1
+            self.files[source] = {'id': next_id, 'content': content}
+            return next_id, False
+        if append:
+            entry['content'] = [entry['content'][0] + content[0], (entry['content'][1] + content[1]) % 2**64]
+            return entry['id'], False
+        if entry.get('content') == content:
+            return entry['id'], True
+        self.remove(entry['id'])
+        entry['content'] = content
+        return entry['id'], False
+
+    def ids(self, sources):
+        """Ids of the registered sources among `sources`."""
+        return [self.files[source]['id'] for source in sources if source in self.files]
+
+    def lookup(self, fps, scope=None):
+        """True for each fingerprint held by a source id in `scope` (default: by any source)."""
+        left = np.searchsorted(self.fingerprints, fps, side="left")
+        right = np.searchsorted(self.fingerprints, fps, side="right")
+        if scope is None:
+            return right > left
+
+        allowed = np.zeros(max((item['id'] for item in self.files.values()), default=-1) + 1, dtype=bool)
+        allowed[list(scope)] = True
+
+        # Every stored (fingerprint, source) pair matching a fingerprint
+        counts = right - left
+        owners = np.repeat(np.arange(len(fps)), counts)
+        positions = np.repeat(left - (np.cumsum(counts) - counts), counts) + np.arange(counts.sum())
+        hits = allowed[self.sources[positions]]
+        return np.bincount(owners[hits], minlength=len(fps)) > 0
+
+    def add(self, fps, source_id):
+        """Insert the distinct fingerprints into the sorted arrays (one merge, no re-sort)."""
+        fps = np.unique(fps)
+        positions = np.searchsorted(self.fingerprints, fps)
+        self.fingerprints = np.insert(self.fingerprints, positions, fps)
+        self.sources = np.insert(self.sources, positions, np.int32(source_id))
+
+    def remove(self, source_id):
+        """Drop every fingerprint of one source."""
+        keep = np.asarray(self.sources) != source_id
+        self.fingerprints = self.fingerprints[keep]
+        self.sources = self.sources[keep]
+
+    def save(self):
+        if self.path is None:
+            return
+        os.makedirs(self.path, exist_ok=True)
+        # Write to temporary files first so an interrupted run keeps the old index
+        for name, values in (("fingerprints", self.fingerprints), ("sources", self.sources)):
+            np.save(self._file(f"{name}.tmp.npy"), values)
+            os.replace(self._file(f"{name}.tmp.npy"), self._file(f"{name}.npy"))
+        with open(self._file("files.json.tmp"), "w", encoding="utf-8") as f:
+            json.dump(self.files, f, indent=1)
+        os.replace(self._file("files.json.tmp"), self._file("files.json"))
+
+
+def duplicate_mask(fps, index, source, append=False):
+    """`(keep mask, report)` for the rows `fps` read from `source`; the index learns them.
+
+    A row is kept when it is the first of its fingerprint in the file and no
+    source in the index holds it yet. With `append`, the rows were added to
+    `source` since it was last ingested.
+    """
+    source_id, indexed = index.register(source, fps, append)
+
+    # Keep the first occurrence of each fingerprint within the file
+    _, first = np.unique(fps, return_index=True)
+    first_in_file = np.zeros(len(fps), dtype=bool)
+    first_in_file[first] = True
+
+    # Rows already delivered: by earlier sources, or by this one when it comes back unchanged
+    seen = index.lookup(fps)
+    keep = first_in_file & ~seen
+    if append:
+        index.add(fps[~index.lookup(fps, [source_id])], source_id)
+    elif not indexed:
+        index.add(fps, source_id)
+
+    report = {
+        'id': source_id,
+        'rows': int(len(fps)),
+        'duplicates_in_file': int((~first_in_file).sum()),
+        'duplicates_of_sources': int((first_in_file & seen).sum()),
+        'kept': int(keep.sum()),
+    }
+    index.files[source].update(report)
+    return keep, report
+
+
+def drop_duplicates(df, index, source, key=None, save=True, append=False):
+    """Drop rows repeated within this file or delivered by any source ingested before.
+
+    `source` is the file the rows were read from. With `append`, `df` holds
+    rows added to `source` since it was last ingested.
+    Returns `(deduplicated frame, report)`; the report is also stored in the
+    index under the source name.
+    """
+    keep, report = duplicate_mask(fingerprints(df, key), index, source, append)
+    if save:
+        index.save()
+    return df[keep].reset_index(drop=True), report
+
+
+def drop_partition_duplicates(df, index, sources=None, column=LINEAGE_COLUMNS[0], save=True):
+    """`drop_duplicates` for a multi-file frame, one source per partition.
+
+    Partitions are checked in order, so a row repeated in a later partition is
+    dropped as a duplicate of the earlier one. `sources` maps a partition name
+    to its source (default: the name). Returns `(frame, {partition: report})`.
+    """
+    kept, reports = [], {}
+    for name, part in df.groupby(column, observed=True, sort=False):
+        source = sources.get(name, str(name)) if sources else str(name)
+        part, reports[name] = drop_duplicates(part, index, source=source, save=False)
+        kept.append(part)
+    if save:
+        index.save()
+    if not kept:
+        return df.iloc[:0], reports
+    return pd.concat(kept, ignore_index=True), reports
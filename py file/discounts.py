@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# # Discount Analytics
+#
+# Every discount table of the dashboard comes out of one scan: the discount,
+# quantity, price and revenue columns are read into arrays once, each line
+# gets a discount-depth bucket and a group code, and all tables are
+# accumulated with np.bincount. The input frame is never modified (no
+# `has_discount` column is added to it). The per-order pairs are read from the
+# order table (orders.py), so order_id is not grouped again here.
+#
+# Discount is a rate between 0 and 1; the discount amount of a line is
+# quantity * unit_price * discount. Money is summed in cents and reported
+# in dollars.
+
+import numpy as np
+import pandas as pd
+
+from money import to_dollars
+
+
+# Upper edges of the discount-depth buckets (rates); 0 is its own bucket
+DEPTH_EDGES = (0.05, 0.10, 0.20, 0.30, 1.0)
+DEPTH_LABELS = ("none", "0-5%", "5-10%", "10-20%", "20-30%", "30%+")
+
+# Dimensions with a discounted vs full-price uplift table
+UPLIFT_DIMENSIONS = ("category", "brand")
+
+
+def depth_buckets(discount):
+    """Bucket code per line: 0 = no discount, then one per DEPTH_EDGES interval."""
+    codes = np.searchsorted(DEPTH_EDGES, discount, side="left") + 1
+    codes[~(discount > 0)] = 0
+    return np.minimum(codes, len(DEPTH_LABELS) - 1)
+
+
+def _sums(codes, n, **weights):
+    return {name: np.bincount(codes, weights=values, minlength=n) for name, values in weights.items()}
+
+
+def _ratio(numerator, denominator):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(denominator > 0, numerator / denominator, np.nan)
+
+
+class DiscountAnalytics:
+    """All discount tables of one dataset, built in a single scan."""
+
+    def __init__(self, tables, totals):
+        self.tables = tables  # name -> DataFrame
+        self.totals = totals  # name -> scalar
+
+    @classmethod
+    def build(cls, df, orders, dimensions=UPLIFT_DIMENSIONS):
+        """Every table of `df`; `orders` is the OrderTable of the same rows."""
+        discount = df['discount'].to_numpy(dtype="float64", na_value=0.0)
+        quantity = df['quantity'].to_numpy(dtype="float64", na_value=0.0)
+        revenue = df['total_amount'].to_numpy(dtype="float64", na_value=0.0)
+        gross = quantity * df['unit_price'].to_numpy(dtype="float64", na_value=0.0)
+        amount = gross * discount
+        discounted = (discount > 0).astype(np.intp)
+        ones = np.ones(len(df))
+
+        tables = {}
+
+        # --- Discounted vs full-price lines ---
+        flag = _sums(discounted, 2, total_amount=revenue, lines=ones)
+        tables['revenue_by_discount_flag'] = pd.DataFrame({
+            'has_discount': [False, True],
+            'total_amount': to_dollars(flag['total_amount']),
+            'lines': flag['lines'].astype('int64'),
+        })
+
+        # --- Discount depth ---
+        depth = depth_buckets(discount)
+        n = len(DEPTH_LABELS)
+        sums = _sums(depth, n, lines=ones, quantity=quantity, total_amount=revenue, discount_amount=amount)
+        tables['depth'] = pd.DataFrame({
+            'depth': pd.Categorical(DEPTH_LABELS, categories=DEPTH_LABELS, ordered=True),
+            'lines': sums['lines'].astype('int64'),
+            'quantity': sums['quantity'].astype('int64'),
+            'total_amount': to_dollars(sums['total_amount']),
+            'discount_amount': to_dollars(sums['discount_amount']),
+            'revenue_share': _ratio(sums['total_amount'], revenue.sum()),
+        })
+
+        # --- Per-group average discount and uplift ---
+        for dim in dimensions:
+            codes, values = pd.factorize(df[dim], sort=True)
+            k = len(values)
+            codes = np.where(codes < 0, k, codes)  # nulls -> dropped trailing slot
+            cell = codes * 2 + discounted
+            sums = _sums(cell, 2 * (k + 1), lines=ones, quantity=quantity, total_amount=revenue, discount=discount)
+            full = {name: v[0:2 * k:2] for name, v in sums.items()}
+            sale = {name: v[1:2 * k:2] for name, v in sums.items()}
+            lines = full['lines'] + sale['lines']
+
+            if dim == 'category':
+                tables['avg_discount_by_category'] = pd.DataFrame({
+                    'category': np.asarray(values),
+                    'discount': _ratio(full['discount'] + sale['discount'], lines),
+                })
+
+            sale_quantity = _ratio(sale['quantity'], sale['lines'])
+            full_quantity = _ratio(full['quantity'], full['lines'])
+            sale_revenue = _ratio(sale['total_amount'], sale['lines'])
+            full_revenue = _ratio(full['total_amount'], full['lines'])
+            tables[f'uplift_by_{dim}'] = pd.DataFrame({
+                dim: np.asarray(values),
+                'discounted_lines': sale['lines'].astype('int64'),
+                'full_price_lines': full['lines'].astype('int64'),
+                'avg_quantity_discounted': sale_quantity,
+                'avg_quantity_full_price': full_quantity,
+                'quantity_uplift': sale_quantity / full_quantity - 1,
+                'avg_revenue_discounted': to_dollars(sale_revenue),
+                'avg_revenue_full_price': to_dollars(full_revenue),
+                'revenue_uplift': sale_revenue / full_revenue - 1,
+            })
+
+        # --- Per-order (discount, revenue) pairs ---
+        pairs = orders.table[['order_id', 'discount', 'total_amount']].copy()
+        pairs['total_amount'] = to_dollars(pairs['total_amount'])
+        tables['discount_per_order'] = pairs
+
+        totals = {
+            'total_discount': discount.sum(),
+            'discount_amount': to_dollars(amount.sum()),
+            'gross_sales': to_dollars(gross.sum()),
+            'discount_share': _ratio(amount.sum(), gross.sum()).item(),
+            'discounted_revenue_share': _ratio(flag['total_amount'][1], revenue.sum()).item(),
+        }
+        return cls(tables, totals)
+
+    def __getitem__(self, name):
+        return self.tables[name]
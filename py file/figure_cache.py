@@ -0,0 +1,179 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# # Figure Cache
+#
+# Building a plotly figure and serializing it to HTML costs more than most
+# of the aggregations behind it. Each figure is keyed by a fingerprint of
+# its builder (the charts.py function, including its layout code, the module
+# constants it reads and the charts.py helpers it calls) and of the aggregate
+# tables passed to it. Figure JSON and HTML are stored under that key, so an
+# unchanged chart is reused - and an HTML file already holding that key is
+# not rewritten at all. Only charts whose data moved are rebuilt.
+
+import hashlib
+import inspect
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from cache import CACHE_DIR
+
+
+FIGURE_CACHE_DIR = os.path.join(CACHE_DIR, "figures")
+
+# Bump when the HTML export options change
+FIGURE_CACHE_VERSION = 1
+
+
+def _hash_code(h, code, namespace=None, seen=None):
+    """Bytecode and constants of a function, nested functions included.
+
+    With `namespace` (the function's module globals), every global it reads is
+    hashed too: functions of the same module are followed recursively,
+    constants (KPI_CARDS) by value, and imported modules or functions by name.
+    """
+    seen = set() if seen is None else seen
+    h.update(code.co_code)
+    for const in code.co_consts:
+        if hasattr(const, "co_code"):
+            _hash_code(h, const, namespace, seen)
+        else:
+            h.update(repr(const).encode("utf-8"))
+    h.update(repr(code.co_names).encode("utf-8"))
+    if namespace is None:
+        return
+
+    for name in code.co_names:
+        if name not in namespace or name in seen:
+            continue
+        seen.add(name)
+        value = namespace[name]
+        h.update(name.encode("utf-8"))
+        if inspect.isfunction(value) and value.__module__ == namespace.get("__name__"):
+            _hash_code(h, value.__code__, namespace, seen)
+        elif inspect.ismodule(value) or callable(value):
+            label = getattr(value, "__qualname__", getattr(value, "__name__", type(value).__name__))
+            h.update(f"{getattr(value, '__module__', '')}.{label}".encode("utf-8"))
+        else:
+            _hash_value(h, value)
+
+
+def _dtype_name(dtype):
+    # Text hashes the same whether it is str, object or categorical (the
+    # cached frame comes back categorical, a fresh parse does not)
+    if isinstance(dtype, pd.CategoricalDtype) or pd.api.types.is_string_dtype(dtype):
+        return "text"
+    return str(dtype)
+
+
+def _hash_value(h, value):
+    if isinstance(value, pd.DataFrame):
+        h.update(repr([(str(col), _dtype_name(dtype)) for col, dtype in value.dtypes.items()]).encode("utf-8"))
+        h.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+    elif isinstance(value, pd.Series):
+        h.update(repr((value.name, _dtype_name(value.dtype))).encode("utf-8"))
+        h.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+    elif isinstance(value, np.ndarray):
+        h.update(repr((value.dtype.str, value.shape)).encode("utf-8"))
+        h.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, dict):
+        # Insertion order matters (dropdown and card order follow it)
+        for key, item in value.items():
+            h.update(repr(key).encode("utf-8"))
+            _hash_value(h, item)
+    elif isinstance(value, (list, tuple)):
+        h.update(f"{type(value).__name__}:{len(value)}".encode("utf-8"))
+        for item in value:
+            _hash_value(h, item)
+    else:
+        h.update(repr(value).encode("utf-8"))
+
+
+def fingerprint(builder, inputs):
+    """Hex key of one figure: builder code (and what it reads from its module) + every input table / value."""
+    h = hashlib.sha1(f"{FIGURE_CACHE_VERSION}|{builder.__module__}.{builder.__qualname__}".encode("utf-8"))
+    _hash_code(h, builder.__code__, builder.__globals__)
+    for value in inputs:
+        _hash_value(h, value)
+    return h.hexdigest()[:20]
+
+
+def _write_atomic(path, text):
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(path + ".tmp", path)
+
+
+class FigureCache:
+    """Figure JSON / HTML by fingerprint, plus which key each HTML file holds."""
+
+    def __init__(self, path=FIGURE_CACHE_DIR):
+        self.path = path
+        self.outputs = {}  # absolute HTML path -> key written there
+        if os.path.exists(self._file("outputs.json")):
+            with open(self._file("outputs.json"), encoding="utf-8") as f:
+                self.outputs = json.load(f)
+        self.built = 0
+        self.reused = 0
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    def figure(self, builder, *inputs):
+        """The plotly figure, from the cached JSON when the inputs are unchanged."""
+        return self._figure(fingerprint(builder, inputs), builder, inputs)
+
+    def _figure(self, key, builder, inputs):
+        import plotly.io as pio
+
+        json_path = self._file(key + ".json")
+        if os.path.exists(json_path):
+            self.reused += 1
+            with open(json_path, encoding="utf-8") as f:
+                return pio.from_json(f.read())
+
+        self.built += 1
+        fig = builder(*inputs)
+        os.makedirs(self.path, exist_ok=True)
+        _write_atomic(json_path, fig.to_json())
+        return fig
+
+    def write_html(self, filename, builder, inputs, directory):
+        """Write `directory/filename` unless it already holds this figure.
+
+        Returns True when the file was (re)written.
+        """
+        key = fingerprint(builder, inputs)
+        target = os.path.abspath(os.path.join(directory, filename))
+        if self.outputs.get(target) == key and os.path.exists(target):
+            self.reused += 1
+            return False
+
+        html_path = self._file(key + ".html")
+        if os.path.exists(html_path):
+            self.reused += 1
+        else:
+            fig = self._figure(key, builder, inputs)
+            _write_atomic(html_path, fig.to_html(full_html=True, include_plotlyjs="cdn"))
+
+        os.makedirs(directory, exist_ok=True)
+        shutil.copyfile(html_path, target)
+        previous = self.outputs.get(target)
+        self.outputs[target] = key
+        if previous and previous not in self.outputs.values():
+            self._drop(previous)
+        self.save()
+        return True
+
+    def _drop(self, key):
+        for ext in (".json", ".html"):
+            if os.path.exists(self._file(key + ext)):
+                os.remove(self._file(key + ext))
+
+    def save(self):
+        os.makedirs(self.path, exist_ok=True)
+        _write_atomic(self._file("outputs.json"), json.dumps(self.outputs, indent=1, sort_keys=True))
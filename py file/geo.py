@@ -0,0 +1,198 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# # Geographic Drill-Down
+#
+# Country / state / city values are normalized to canonical codes once (the
+# country-name -> ISO-3 mapping is cached on disk), then a single grouped pass
+# builds a country -> state -> city rollup tree holding revenue, quantity and
+# orders. Maps and drill-down tables read from the tree instead of regrouping
+# the raw transactions at every level.
+
+import json
+import os
+
+import pandas as pd
+
+from money import to_dollars
+
+
+# Where resolved country codes are remembered between runs
+GEO_CACHE_PATH = "../file/cache/geo_codes.json"
+
+# Countries of the dataset plus common aliases (names are lowercased by the
+# cleaning step). pycountry is used for anything not listed, when installed.
+COUNTRY_ISO3 = {
+    "united states": "USA", "united states of america": "USA", "usa": "USA", "us": "USA",
+    "india": "IND",
+    "canada": "CAN",
+    "united kingdom": "GBR", "uk": "GBR", "great britain": "GBR", "england": "GBR",
+    "australia": "AUS",
+    "germany": "DEU",
+    "france": "FRA",
+    "japan": "JPN",
+    "brazil": "BRA",
+    "mexico": "MEX",
+    "china": "CHN",
+    "italy": "ITA",
+    "spain": "ESP",
+    "netherlands": "NLD",
+    "united arab emirates": "ARE", "uae": "ARE",
+    "singapore": "SGP",
+    "south africa": "ZAF",
+    "nigeria": "NGA",
+    "ethiopia": "ETH",
+    "kenya": "KEN",
+}
+
+UNKNOWN_CODE = "UNK"
+UNKNOWN = "unknown"
+
+LEVELS = ("country", "state", "city")
+METRICS = ("revenue", "quantity", "orders")
+
+
+def _lookup_country(name):
+    if name in COUNTRY_ISO3:
+        return COUNTRY_ISO3[name]
+    try:
+        import pycountry
+    except ImportError:
+        return UNKNOWN_CODE
+    try:
+        return pycountry.countries.lookup(name).alpha_3
+    except LookupError:
+        try:
+            return pycountry.countries.search_fuzzy(name)[0].alpha_3
+        except LookupError:
+            return UNKNOWN_CODE
+
+
+class CountryCodes:
+    """Country name -> ISO-3 resolver backed by a JSON cache file."""
+
+    def __init__(self, path=GEO_CACHE_PATH):
+        self.path = path
+        self.codes = {}
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.codes = json.load(f)
+
+    def resolve(self, names):
+        """Map an array of country names to ISO-3 codes.
+
+        Only the distinct names are resolved, and only names never seen
+        before are looked up; new resolutions are written back to the cache.
+        """
+        codes, uniques = pd.factorize(pd.Series(names, dtype="string").str.strip().str.lower())
+        missing = [name for name in uniques if name not in self.codes]
+        for name in missing:
+            self.codes[name] = _lookup_country(name)
+        if missing:
+            self.save()
+
+        resolved = pd.Index([self.codes[name] for name in uniques] + [UNKNOWN_CODE])
+        # factorize marks nulls with -1, which picks the trailing UNKNOWN_CODE
+        return resolved.take(codes).to_numpy()
+
+    def save(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(self.codes, f, indent=1, sort_keys=True)
+
+
+class GeoRollup:
+    """Country -> state -> city rollup of revenue, quantity and orders.
+
+    `city` is the base level (one grouped pass over the transactions);
+    `state` and `country` are sums of their children. Every level is keyed
+    by codes only, so spellings that resolve to the same country ("usa",
+    "united states") share one row under one canonical name. Missing or
+    unresolved locations roll up under the explicit UNKNOWN_CODE / "unknown".
+    Order counts are additive because every order ships to a single
+    location. Revenue is summed in integer cents and reported in dollars.
+    """
+
+    def __init__(self, city):
+        self.city = city
+        self.state = self._rollup(city, ['country_code', 'state_code'], ['country', 'state'])
+        self.country = self._rollup(self.state, ['country_code'], ['country'])
+
+    @staticmethod
+    def _rollup(table, keys, names):
+        totals = table.groupby(keys, sort=True)[list(METRICS)].sum()
+        # names are constant within a code at the finer level
+        labels = table.groupby(keys, sort=True)[names].first()
+        columns = [column for pair in zip(keys, names) for column in pair]
+        return labels.join(totals).reset_index()[columns + list(METRICS)]
+
+    @staticmethod
+    def _canonical(codes, names):
+        """One display name per code: its most frequent spelling, "unknown" for UNKNOWN_CODE."""
+        counts = pd.DataFrame({'code': codes, 'name': names}).value_counts().reset_index(name='rows')
+        counts = counts.sort_values(['code', 'rows', 'name'], ascending=[True, False, True])
+        canonical = counts.drop_duplicates('code').set_index('code')['name']
+        canonical[UNKNOWN_CODE] = UNKNOWN
+        return canonical
+
+    @staticmethod
+    def _names(values):
+        """Lowercased, stripped location names; missing values become "unknown"."""
+        names = values.astype("string").str.strip().str.lower()
+        return names.mask(names.isna() | (names == ""), UNKNOWN).astype(object)
+
+    @classmethod
+    def build(cls, df, codes=None):
+        codes = codes or CountryCodes()
+        raw_country = df['country'].astype("string").str.strip().str.lower()
+        raw_country = raw_country.mask(raw_country == "")
+        country_code = pd.Series(codes.resolve(raw_country), index=df.index)
+        canonical = cls._canonical(country_code, raw_country.fillna(UNKNOWN))
+        state = cls._names(df['state'])
+        city = cls._names(df['city'])
+
+        keyed = pd.DataFrame({
+            'country_code': country_code,
+            'country': country_code.map(canonical),
+            'state_code': country_code + "-" + state,
+            'state': state,
+            'city_code': country_code + "-" + state + "-" + city,
+            'city': city,
+            'revenue': df['total_amount'],
+            'quantity': df['quantity'],
+            'order_id': df['order_id'],
+        })
+        base = (
+            keyed.groupby(['country_code', 'state_code', 'city_code'], sort=True)
+            .agg(country=('country', 'first'), state=('state', 'first'), city=('city', 'first'),
+                 revenue=('revenue', 'sum'), quantity=('quantity', 'sum'), orders=('order_id', 'nunique'))
+            .reset_index()
+        )
+        return cls(base[['country_code', 'country', 'state_code', 'state', 'city_code', 'city', *METRICS]])
+
+    @staticmethod
+    def _view(table):
+        return table.assign(revenue=to_dollars(table['revenue'])).reset_index(drop=True)
+
+    def level(self, name):
+        """Whole table for one level: 'country', 'state' or 'city'."""
+        if name not in LEVELS:
+            raise ValueError(f"Unknown level {name!r}; choose one of {LEVELS}")
+        return self._view(getattr(self, name))
+
+    def children(self, country_code=None, state_code=None):
+        """Drill down: countries, the states of a country, or the cities of a state."""
+        if state_code is not None:
+            return self._view(self.city[self.city['state_code'] == state_code])
+        if country_code is not None:
+            return self._view(self.state[self.state['country_code'] == country_code])
+        return self._view(self.country)
+
+    def top(self, level, metric="revenue", n=15):
+        if metric not in METRICS:
+            raise ValueError(f"Unknown metric {metric!r}; choose one of {METRICS}")
+        if level not in LEVELS:
+            raise ValueError(f"Unknown level {level!r}; choose one of {LEVELS}")
+        return self._view(getattr(self, level).nlargest(n, metric))
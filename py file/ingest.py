@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# # Partitioned Ingestion
+#
+# Exports arrive as many daily or per-marketplace CSV files. A source can be a
+# single file, a directory of partitions or a glob pattern. Partitions are read
+# and cleaned concurrently (thread pool by default, process pool on request),
+# then combined into one frame:
+#
+# - columns are the union of all partitions, in first-seen order
+# - text columns become one categorical with a shared dictionary
+# - numeric columns take the common type; integer columns are downcast again
+# - every row is tagged with its partition name in `source_partition`
+
+import glob
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from compressed import COMPRESSIONS
+from money import COUNT_COLUMNS, MONEY_COLUMNS, downcast
+
+
+# Lineage column added to partitioned sources (dedup.py leaves it out of the key)
+PARTITION_COLUMN = 'source_partition'
+
+# Files picked up when the source is a directory (plain or compressed CSV)
+PARTITION_PATTERNS = ("*.csv", *(f"*.csv{suffix}" for suffix in COMPRESSIONS))
+
+
+def is_partitioned(source):
+    """True for a directory or glob pattern, False for a single file."""
+    return os.path.isdir(source) or glob.has_magic(source)
+
+
+def partition_paths(source):
+    """Sorted partition files of a source (a file, directory or glob)."""
+    if os.path.isdir(source):
+        paths = [path for pattern in PARTITION_PATTERNS for path in glob.glob(os.path.join(source, pattern))]
+    elif glob.has_magic(source):
+        paths = glob.glob(source)
+    else:
+        paths = [source] if os.path.exists(source) else []
+    paths = sorted(path for path in paths if os.path.isfile(path))
+    if not paths:
+        raise FileNotFoundError(f"No input files match {source!r}")
+    return paths
+
+
+def partition_names(paths):
+    """Partition labels for the lineage column: paths relative to their common folder."""
+    root = os.path.commonpath([os.path.dirname(os.path.abspath(path)) for path in paths])
+    return [os.path.relpath(os.path.abspath(path), root) for path in paths]
+
+
+def _is_text(series):
+    return (
+        isinstance(series.dtype, pd.CategoricalDtype)
+        or series.dtype == "object"
+        or pd.api.types.is_string_dtype(series)
+    )
+
+
+def _missing(like, n):
+    """All-null column of length `n` with the dtype of `like` (ints become float)."""
+    return like.iloc[:0].reindex(pd.RangeIndex(n))
+
+
+def _text_column(parts):
+    """One categorical over all partitions with a shared, sorted dictionary."""
+    categoricals = [
+        pd.Categorical(part.astype(str).where(part.notna()) if not _is_text(part) else part)
+        for part in parts
+    ]
+    return union_categoricals(categoricals, sort_categories=True, ignore_order=True)
+
+
+def unify_frames(frames, names):
+    """Concatenate cleaned partitions with unified schemas and dictionaries."""
+    columns = list(dict.fromkeys(col for frame in frames for col in frame.columns))
+    lengths = [len(frame) for frame in frames]
+
+    combined = {}
+    for col in columns:
+        present = [frame[col] for frame in frames if col in frame.columns]
+        parts = [frame[col] if col in frame.columns else _missing(present[0], n)
+                 for frame, n in zip(frames, lengths)]
+        if any(_is_text(part) for part in present):
+            combined[col] = _text_column(parts)
+        else:
+            values = pd.concat(parts, ignore_index=True)
+            if col in MONEY_COLUMNS or col in COUNT_COLUMNS:
+                values = downcast(values)
+            combined[col] = values
+
+    combined[PARTITION_COLUMN] = pd.Categorical.from_codes(
+        np.repeat(np.arange(len(names)), lengths), categories=names
+    )
+    return pd.DataFrame(combined, index=pd.RangeIndex(sum(lengths)))
+
+
+def read_partitions(paths, read, workers=None, processes=False):
+    """Run `read(path)` over every partition concurrently and unify the results.
+
+    `read` must return a cleaned pandas frame. With `processes=True` the
+    partitions are parsed in worker processes, so `read` has to be picklable
+    (a module-level function or a method of a module-level class).
+    """
+    workers = workers or min(len(paths), os.cpu_count() or 1)
+    pool = ProcessPoolExecutor if processes else ThreadPoolExecutor
+    with pool(max_workers=workers) as executor:
+        frames = list(executor.map(read, paths))
+    return unify_frames(frames, partition_names(paths))
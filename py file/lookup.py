@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# # Customer & Order Lookup
+#
+# Point queries for support tooling ("everything about customer X"). The
+# cleaned rows are stored sorted by customer_id (then order_date) in the
+# columnar cache layout, next to two offset indexes:
+#
+# - customers: sorted customer keys + [start, end) row range of each customer
+# - orders:    sorted order keys + [start, end) range into a row-position list
+#
+# A query is a binary search on the keys followed by a slice of the
+# memory-mapped columns, so only the matching rows are read from disk.
+#
+#     python lookup.py customer cust000123
+#     python lookup.py order ord0004567
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from cache import decode, open_columns, save_frame
+from money import in_dollars
+
+
+def _group_offsets(sorted_keys):
+    """Distinct keys of a sorted key array and the [start, end) of each."""
+    starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]]) if len(sorted_keys) else np.empty(0, dtype=np.int64)
+    ends = np.r_[starts[1:], len(sorted_keys)].astype(np.int64)
+    return sorted_keys[starts], starts.astype(np.int64), ends
+
+
+def build_lookup(df, path):
+    """Sort the cleaned rows by customer and write rows plus both indexes."""
+    customer_keys = df['customer_id'].to_numpy(dtype=str)
+    order = np.lexsort((df['order_date'].to_numpy(), customer_keys))
+    rows = df.iloc[order].reset_index(drop=True)
+    save_frame(rows, os.path.join(path, "rows"))
+
+    keys, starts, ends = _group_offsets(customer_keys[order])
+    np.save(os.path.join(path, "customer_keys.npy"), keys)
+    np.save(os.path.join(path, "customer_offsets.npy"), np.column_stack([starts, ends]))
+
+    order_keys = rows['order_id'].to_numpy(dtype=str)
+    positions = np.argsort(order_keys, kind="stable")
+    keys, starts, ends = _group_offsets(order_keys[positions])
+    np.save(os.path.join(path, "order_keys.npy"), keys)
+    np.save(os.path.join(path, "order_offsets.npy"), np.column_stack([starts, ends]))
+    np.save(os.path.join(path, "order_positions.npy"), positions.astype(np.int64))
+
+
+class Lookup:
+    """Binary-searchable customer / order index over the sorted rows."""
+
+    def __init__(self, path):
+        opened = open_columns(os.path.join(path, "rows"))
+        if opened is None:
+            raise FileNotFoundError(f"No lookup index in {path}; run build_lookup first")
+        _, self.columns = opened
+
+        def load(name):
+            return np.load(os.path.join(path, name), mmap_mode="r")
+
+        self.customer_keys = load("customer_keys.npy")
+        self.customer_offsets = load("customer_offsets.npy")
+        self.order_keys = load("order_keys.npy")
+        self.order_offsets = load("order_offsets.npy")
+        self.order_positions = load("order_positions.npy")
+
+    @classmethod
+    def open_or_build(cls, df, path):
+        if not os.path.exists(os.path.join(path, "rows", "manifest.json")):
+            build_lookup(df, path)
+        return cls(path)
+
+    @staticmethod
+    def _find(keys, key):
+        i = np.searchsorted(keys, key)
+        return i if i < len(keys) and keys[i] == key else None
+
+    def _rows(self, rows):
+        """Selected rows with money in dollars."""
+        return in_dollars(pd.DataFrame({col: decode(column, rows) for col, column in self.columns.items()}))
+
+    def transactions(self, customer_id):
+        """All rows of one customer, oldest first (empty frame when unknown)."""
+        i = self._find(self.customer_keys, str(customer_id))
+        if i is None:
+            return self._rows(slice(0, 0))
+        start, end = self.customer_offsets[i]
+        return self._rows(slice(int(start), int(end)))
+
+    def order(self, order_id):
+        """All line items of one order."""
+        i = self._find(self.order_keys, str(order_id))
+        if i is None:
+            return self._rows(slice(0, 0))
+        start, end = self.order_offsets[i]
+        return self._rows(np.sort(self.order_positions[int(start):int(end)]))
+
+    def customer(self, customer_id):
+        """Transactions, lifetime totals and first purchase of one customer."""
+        rows = self.transactions(customer_id)
+        if rows.empty:
+            return None
+
+        first = rows.iloc[0]
+        return {
+            'customer_id': str(customer_id),
+            'transactions': rows,
+            'lifetime': {
+                'revenue': rows['total_amount'].sum(),
+                'orders': rows['order_id'].nunique(),
+                'lines': len(rows),
+                'quantity': rows['quantity'].sum(),
+                'last_purchase': rows['order_date'].max(),
+            },
+            'first_purchase': {
+                'order_date': first['order_date'],
+                'order_id': first['order_id'],
+                'total_amount': rows.loc[rows['order_id'] == first['order_id'], 'total_amount'].sum(),
+            },
+        }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from backends import get_backend
+    from cache import frame_dir
+    from pipeline import DATA_PATH, load_clean
+
+    parser = argparse.ArgumentParser(description="Look up a customer or an order")
+    parser.add_argument("kind", choices=["customer", "order"])
+    parser.add_argument("key")
+    parser.add_argument("--data", default=DATA_PATH, help="raw Amazon.csv export")
+    args = parser.parse_args()
+
+    path = os.path.join(frame_dir(args.data), "lookup")
+    if os.path.exists(os.path.join(path, "rows", "manifest.json")):
+        index = Lookup(path)
+    else:
+        index = Lookup.open_or_build(load_clean(args.data, get_backend("pandas"))[0], path)
+
+    if args.kind == "order":
+        print(index.order(args.key).to_string())
+    else:
+        info = index.customer(args.key)
+        if info is None:
+            raise SystemExit(f"Unknown customer {args.key!r}")
+        for key, value in info['lifetime'].items():
+            print(f"{key}: {value}")
+        print("first purchase:", info['first_purchase'])
+        print(info['transactions'].to_string())
@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# # Money & Numeric Types
+#
+# The cleaning stage stores money as integer cents, so totals are exact
+# integer sums with no float drift, and shrinks every integer column
+# (cents, quantity, year, month) to the smallest width that holds its range.
+# Aggregates are converted back to dollars only when they leave a module
+# (chart tables, KPI values).
+#
+# Discount is a rate (0 - 1), not an amount, so it stays a float.
+
+import numpy as np
+import pandas as pd
+
+
+CENTS = 100
+
+# Money columns of the cleaned data, stored as integer cents
+MONEY_COLUMNS = ['unit_price', 'tax', 'shipping_cost', 'total_amount']
+
+# Integer columns downcast to the smallest safe width
+COUNT_COLUMNS = ['quantity', 'year', 'month']
+
+INT_TYPES = [np.int8, np.int16, np.int32, np.int64]
+
+# 2**63 as an exact float: rounded cents must stay strictly below it
+INT64_LIMIT = 2.0 ** 63
+
+
+def smallest_int(low, high):
+    """Smallest signed integer type holding [low, high]."""
+    for dtype in INT_TYPES:
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return dtype
+    raise OverflowError(f"Values in [{low}, {high}] do not fit in int64")
+
+
+def downcast(series):
+    """Integer series in its smallest safe width (nullable when it has nulls)."""
+    values = series.to_numpy(dtype="float64", na_value=np.nan)
+    present = values[~np.isnan(values)]
+    if not len(present):
+        return series.astype("Int8")
+    if not np.array_equal(present, np.trunc(present)):
+        raise ValueError(f"{series.name!r} has non-integer values")
+
+    dtype = smallest_int(present.min(), present.max())
+    if len(present) < len(values):
+        return series.astype(pd.api.types.pandas_dtype(np.dtype(dtype).name.capitalize()))
+    return series.astype(dtype)
+
+
+def to_cents(series):
+    """Dollar amounts -> integer cents in the smallest safe width."""
+    dollars = pd.to_numeric(series).astype("float64")
+    cents = np.rint(dollars * CENTS)
+    values = cents.to_numpy()
+    values = values[~np.isnan(values)]
+    if not (np.isfinite(values) & (np.abs(values) < INT64_LIMIT)).all():
+        raise OverflowError(f"{series.name!r} does not fit in int64 cents")
+    return downcast(cents)
+
+
+def to_dollars(cents):
+    """Integer cents (scalar, array or series) -> float dollars."""
+    return cents / CENTS
+
+
+def in_dollars(table):
+    """Convert the cent-valued money columns of a result table to dollars."""
+    for col in MONEY_COLUMNS:
+        if col in table.columns:
+            table[col] = to_dollars(table[col])
+    return table
+
+
+def format_dollars(cents, decimals=2):
+    """Exact '$1,234.56' string from integer cents."""
+    cents = int(cents)
+    sign = "-" if cents < 0 else ""
+    whole, rest = divmod(abs(cents), CENTS)
+    if decimals == 0:
+        whole += rest >= CENTS // 2
+        return f"{sign}${whole:,}"
+    return f"{sign}${whole:,}.{rest:02d}"
+
+
+def compact_numbers(df):
+    """Money to cents and counts / date parts downcast, in place of the originals."""
+    df = df.copy()
+    for col in MONEY_COLUMNS:
+        if col in df.columns:
+            df[col] = to_cents(df[col])
+    for col in COUNT_COLUMNS:
+        if col in df.columns:
+            df[col] = downcast(df[col])
+    return df
+
+
+def settle_dtypes(df):
+    """Turn nullable integer columns without nulls back into NumPy integers."""
+    for col in df.columns:
+        dtype = df[col].dtype
+        if isinstance(dtype, pd.api.extensions.ExtensionDtype) and pd.api.types.is_integer_dtype(dtype) \
+                and not df[col].isna().any():
+            df[col] = df[col].astype(dtype.numpy_dtype)
+    return df
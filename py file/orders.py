@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# # Order-Level Table
+#
+# The line-item frame is grouped by order_id once; the result (sorted by
+# order_id) holds order date, customer, totals, discount, tax, shipping and
+# line count. AOV, order counts, per-order discount pairs and other
+# order-grain metrics are computed from this much smaller table, so the
+# high-cardinality order_id groupby runs once per dataset. Money stays in
+# integer cents in the table and is reported in dollars.
+
+import numpy as np
+import pandas as pd
+
+from cache import load_frame, save_frame
+from money import to_dollars
+
+
+# How each order column combines when the same order_id arrives twice
+MERGE_RULES = {
+    'order_date': 'min',
+    'customer_id': 'first',
+    'total_amount': 'sum',
+    'quantity': 'sum',
+    'discount': 'sum',
+    'discount_amount': 'sum',
+    'tax': 'sum',
+    'shipping_cost': 'sum',
+    'lines': 'sum',
+}
+
+
+def order_table(df):
+    """One row per order_id, sorted by order_id."""
+    frame = pd.DataFrame({
+        'order_id': df['order_id'].astype(str),
+        'order_date': df['order_date'],
+        'customer_id': df['customer_id'],
+        'total_amount': df['total_amount'],
+        'quantity': df['quantity'],
+        'discount': df['discount'],
+        'discount_amount': df['quantity'] * df['unit_price'] * df['discount'],
+        'tax': df['tax'],
+        'shipping_cost': df['shipping_cost'],
+    })
+    return (
+        frame.groupby('order_id', sort=True)
+        .agg(
+            order_date=('order_date', 'min'),
+            customer_id=('customer_id', 'first'),
+            total_amount=('total_amount', 'sum'),
+            quantity=('quantity', 'sum'),
+            discount=('discount', 'sum'),
+            discount_amount=('discount_amount', 'sum'),
+            tax=('tax', 'sum'),
+            shipping_cost=('shipping_cost', 'sum'),
+            lines=('total_amount', 'size'),
+        )
+        .reset_index()
+    )
+
+
+class OrderTable:
+    """Orders sorted by order_id with a binary-search lookup."""
+
+    def __init__(self, table):
+        self.table = table
+        self.keys = table['order_id'].to_numpy(dtype=str)
+
+    @classmethod
+    def build(cls, df):
+        return cls(order_table(df))
+
+    @classmethod
+    def load(cls, path):
+        table = load_frame(path)
+        if table is None:
+            return None
+        table['order_id'] = table['order_id'].astype(str)
+        return cls(table)
+
+    def save(self, path):
+        save_frame(self.table, path)
+
+    def update(self, new_rows):
+        """Fold a batch of new line items into the table (kept sorted by order_id)."""
+        combined = pd.concat([self.table, order_table(new_rows)], ignore_index=True)
+        combined['order_id'] = combined['order_id'].astype(str)
+        combined['customer_id'] = combined['customer_id'].astype(str)
+        if combined['order_id'].duplicated().any():
+            combined = combined.groupby('order_id', sort=True).agg(MERGE_RULES).reset_index()
+        else:
+            combined = combined.sort_values('order_id', kind='stable').reset_index(drop=True)
+        self.table = combined
+        self.keys = combined['order_id'].to_numpy(dtype=str)
+        return self
+
+    def __len__(self):
+        return len(self.table)
+
+    def get(self, order_ids):
+        """Rows for the given order ids (unknown ids are skipped)."""
+        order_ids = np.atleast_1d(np.asarray(order_ids, dtype=str))
+        if not len(self.keys):
+            return self.table.iloc[:0]
+        positions = np.minimum(np.searchsorted(self.keys, order_ids), len(self.keys) - 1)
+        found = positions[self.keys[positions] == order_ids]
+        return self.table.iloc[found].reset_index(drop=True)
+
+    # --- Order-grain metrics ---
+
+    def kpis(self):
+        """The six KPI cards, computed from orders instead of line items."""
+        table = self.table
+        return {
+            'total_revenue': to_dollars(table['total_amount'].sum()),
+            'aov': to_dollars(table['total_amount'].mean()),
+            'total_orders': len(table),
+            'total_customers': table['customer_id'].nunique(),
+            'total_quantity': table['quantity'].sum(),
+            'total_discount': table['discount'].sum(),
+        }
+
+    def orders_per_customer(self):
+        return (
+            self.table.groupby('customer_id', observed=True)
+            .size()
+            .reset_index(name='order_count')
+        )
@@ -0,0 +1,500 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# # Analysis Pipeline (command line)
+#
+# Runs selected analysis stages of the dashboard without the notebook:
+#
+#     python pipeline.py --only kpis                 # KPI numbers only (cron alerts)
+#     python pipeline.py --only kpis,trends --save   # also write the HTML figures
+#     python pipeline.py --explore                   # print info / describe / nulls
+#     python pipeline.py --data "../file/raw_data/*.csv" --workers 8   # partitioned export
+#
+# Only the columns the selected stages read are parsed and cleaned (see
+# STAGE_COLUMNS). The cleaned data is cached column by column (see cache.py),
+# so warm runs skip CSV parsing and cleaning. Figures whose input tables did not change are
+# reused from the figure cache (see figure_cache.py). plotly is only imported
+# when a figure is actually built (--save / --show).
+
+import argparse
+import json
+import math
+import numbers
+import os
+import sys
+
+from backends import QUANTITY_DIMENSIONS, REVENUE_DIMENSIONS, get_backend
+from cache import CACHE_DIR, ROW_COLUMN, add_columns, covers, frame_dir, load_frame, read_manifest, save_frame
+from dedup import LINE_KEY, FingerprintIndex
+from discounts import UPLIFT_DIMENSIONS
+from figure_cache import FigureCache
+from money import CENTS, format_dollars, to_dollars
+from snapshots import SNAPSHOT_DIMENSIONS
+from validation import REQUIRED_COLUMNS
+import charts
+
+
+DATA_PATH = "../file/raw_data/Amazon.csv"
+VISUALS_DIR = "../visuals"
+
+
+# ## Load
+
+def load_clean(path, backend, use_cache=True, cache_dir=CACHE_DIR, workers=None, processes=False,
+               columns=None):
+    """Cleaned, deduplicated and validated pandas frame for `path`.
+
+    `path` may be a single CSV, a directory of partitions or a glob. With
+    `columns` (see `stage_columns`) only those columns are parsed, cleaned and
+    returned; columns the cache does not hold yet are parsed and added to it.
+    Each file is checked against the on-disk fingerprint index of every file
+    ingested before (`cache_dir/dedup`); without the cache, against the
+    other files of this input only.
+
+    Returns `(df, report)`; `report['duplicates']` holds the duplicate counts
+    per file, `report['validation']` the rows quarantined per reason and the
+    quarantine files. A cached frame comes with the report of the run that
+    cached it.
+    """
+    directory = frame_dir(path, cache_dir)
+    manifest = read_manifest(directory) if use_cache else None
+    if manifest is not None:
+        report = manifest.get('report')
+        if covers(manifest, columns):
+            return load_frame(directory, columns).drop(columns=ROW_COLUMN, errors="ignore"), report
+        if columns is not None:
+            return _extend_cache(path, backend, directory, manifest, columns, workers, processes), report
+
+    # Duplicates and invalid rows are dropped by the backend itself: in the
+    # polars plan they are fused with the scan
+    data = backend.load(path, workers=workers, processes=processes, columns=columns)
+    index = FingerprintIndex(os.path.join(cache_dir, "dedup")) if use_cache else None
+    data, duplicates, checked = backend.screen(data, source=path, row_column=ROW_COLUMN if use_cache else None,
+                                               index=index)
+    report = {'duplicates': {str(name): counts for name, counts in duplicates.items()}, 'validation': checked}
+    df = backend.to_pandas(data)
+    if use_cache:
+        save_frame(df, directory, parsed=columns, report=report)
+        df = df.drop(columns=ROW_COLUMN)
+    return df, report
+
+
+def print_report(report, file=sys.stderr):
+    """Duplicate counts per file and quarantined rows per reason of a `load_clean` report."""
+    report = report or {}
+    for name, counts in report.get('duplicates', {}).items():
+        print(f"{name}: {counts['rows']:,} rows, {counts['duplicates_in_file']:,} repeated in the file, "
+              f"{counts['duplicates_of_sources']:,} delivered by earlier files, {counts['kept']:,} kept", file=file)
+    checked = report.get('validation')
+    if checked and checked['quarantined']:
+        reasons = ", ".join(f"{reason} {count:,}" for reason, count in checked['reasons'].items() if count)
+        print(f"quarantined {checked['quarantined']:,} of {checked['rows']:,} rows ({reasons}): "
+              f"{', '.join(checked['files'])}", file=file)
+
+
+def _extend_cache(path, backend, directory, manifest, columns, workers, processes):
+    """Parse the columns the cache lacks, keep the cached rows, add them to the cache."""
+    missing = [col for col in columns if col not in manifest['parsed']]
+    extra = backend.to_pandas(backend.load(path, workers=workers, processes=processes, columns=missing))
+    rows = load_frame(directory, [ROW_COLUMN])[ROW_COLUMN].to_numpy()
+    found = [col for col in missing if col in extra.columns and col not in manifest['columns']]
+    add_columns(extra[found].iloc[rows].reset_index(drop=True), directory, parsed=missing)
+    return load_frame(directory, columns)
+
+
+def stage_columns(stages):
+    """Columns read by the given stages: BASE_COLUMNS first, then each stage's own."""
+    return list(dict.fromkeys([*BASE_COLUMNS, *(col for name in stages for col in STAGE_COLUMNS[name])]))
+
+
+def explore(df):
+    """Exploratory summaries from the notebook's first cells."""
+    print(df.columns)
+    print("Dataset Shape:", df.shape)
+    df.info()
+    print(df.isnull().any())
+    print(df.describe())
+
+
+# ## Stages
+#
+# Each stage takes the run context and returns `(result, figures)`, where
+# `figures` maps an HTML file name to `(builder, *inputs)`: the charts.py
+# function and the aggregate tables it draws. The figure cache fingerprints
+# the inputs to decide whether a figure has to be rebuilt.
+
+class Context:
+    def __init__(self, df, backend, cache_dir=None, timeline=None, orders=None, customers=None):
+        self.df = df
+        self.backend = backend
+        self._data = None
+        self.cache_dir = cache_dir  # cleaned-data cache of this source, if any
+        # Tables kept up to date elsewhere (watch mode) can be handed in
+        self._timeline = timeline
+        self._customers = customers
+        self._orders = orders
+        self._discounts = None
+        self._sellers = None
+
+    @property
+    def data(self):
+        """The frame in the backend's own form, converted on first use."""
+        if self._data is None:
+            self._data = self.backend.from_pandas(self.df)
+        return self._data
+
+    @property
+    def timeline(self):
+        """Day -> month/year rollup, built once per run."""
+        if self._timeline is None:
+            from time_rollups import TimeRollup
+            self._timeline = TimeRollup.build(self.df)
+        return self._timeline
+
+    @property
+    def orders(self):
+        """Order-level table (one order_id groupby per dataset)."""
+        if self._orders is None:
+            from orders import OrderTable
+
+            path = os.path.join(self.cache_dir, "orders") if self.cache_dir else None
+            self._orders = OrderTable.load(path) if path else None
+            if self._orders is None:
+                self._orders = OrderTable.build(self.df)
+                if path:
+                    self._orders.save(path)
+        return self._orders
+
+    @property
+    def discounts(self):
+        """Every discount table, from one scan of the transactions."""
+        if self._discounts is None:
+            from discounts import DiscountAnalytics
+            self._discounts = DiscountAnalytics.build(self.df, self.orders)
+        return self._discounts
+
+    @property
+    def sellers(self):
+        """Seller scorecard, read from the cache when present."""
+        if self._sellers is None:
+            from sellers import SellerScorecard
+
+            path = os.path.join(self.cache_dir, "sellers") if self.cache_dir else None
+            self._sellers = SellerScorecard.load(path) if path else None
+            if self._sellers is None:
+                self._sellers = SellerScorecard.build(self.df)
+                if path:
+                    self._sellers.save(path)
+        return self._sellers
+
+    @property
+    def customers(self):
+        """Customer feature table, read from the cache when present."""
+        if self._customers is None:
+            from customer_features import CustomerFeatures
+
+            path = os.path.join(self.cache_dir, "customers") if self.cache_dir else None
+            self._customers = CustomerFeatures.load(path) if path else None
+            if self._customers is None:
+                self._customers = CustomerFeatures.build(self.df)
+                if path:
+                    self._customers.save(path)
+        return self._customers
+
+
+def stage_kpis(ctx):
+    kpis = ctx.orders.kpis()
+    return kpis, {"Calculate_KPIs.html": (charts.kpi_cards, kpis)}
+
+
+def stage_trends(ctx):
+    df_monthly = ctx.backend.monthly_revenue(ctx.data)
+    df_yearly = ctx.timeline.level('year')
+    df_yearly['year'] = df_yearly['period'].dt.year
+    return (
+        {'monthly': df_monthly, 'yearly': df_yearly},
+        {"yearly_And_monthly_Revenue_Trend.html": (charts.revenue_trend, df_monthly, df_yearly)},
+    )
+
+
+def stage_rolling(ctx):
+    from windows import RollingWindows
+
+    rolling = RollingWindows.build(ctx.timeline)
+    deltas = rolling.deltas()
+    # Flat numbers so cron runs print them: total_revenue_mom, aov_yoy, ...
+    changes = {f'{kpi}_{change}': values[change]
+               for kpi, values in deltas.items() for change in ('mom', 'yoy')}
+    return changes, {
+        "Rolling_Metrics.html": (charts.rolling_metrics, rolling.table),
+        "KPI_Deltas.html": (charts.kpi_deltas, deltas),
+    }
+
+
+def stage_dimensions(ctx):
+    tables = {dim: ctx.backend.top_by_dimension(ctx.data, dim, 'total_amount', 15)
+              for dim in REVENUE_DIMENSIONS}
+    total_rev = to_dollars(ctx.orders.table['total_amount'].sum())
+    return tables, {"top_revenue.html": (charts.revenue_by_dimension, tables, total_rev)}
+
+
+def stage_sellers(ctx):
+    sellers = ctx.sellers
+    top = sellers.top('revenue', 20)
+    return (
+        {'top_revenue': top, 'top_decile': sellers.band('revenue', 90)},
+        {"Seller_Scorecard.html": (charts.seller_scorecard, top)},
+    )
+
+
+def stage_costs(ctx):
+    metrics = ctx.backend.cost_totals(ctx.data)
+    return metrics, {"revenue_comparision.html": (charts.cost_comparison, metrics)}
+
+
+def stage_products(ctx):
+    tables = {dim: ctx.backend.top_by_dimension(ctx.data, dim, 'quantity', 10)
+              for dim in QUANTITY_DIMENSIONS}
+    return tables, {"Top_10_Product.html": (charts.top_quantity_treemap, tables)}
+
+
+def stage_price(ctx):
+    from price_analysis import analyze_prices
+
+    grouped, elasticity = analyze_prices(ctx.df, bins=12, strategy="width")
+    return (
+        {'sensitivity': grouped, 'elasticity': elasticity},
+        {"Price_Sensitivity_Analysis.html": (charts.price_sensitivity, grouped)},
+    )
+
+
+def stage_geo(ctx):
+    from geo import CountryCodes, GeoRollup
+
+    geo = GeoRollup.build(ctx.df, CountryCodes())
+    country = geo.level('country')
+    return geo, {"sales_by_location.html": (charts.sales_by_location, country)}
+
+
+# Dimensions measured by the concentration stage besides customers
+CONCENTRATION_DIMENSIONS = ('product_name', 'seller_id')
+
+
+def stage_concentration(ctx):
+    from concentration import concentration
+
+    results = {'customer_id': concentration(ctx.customers.table['monetary'])}
+    for dim in CONCENTRATION_DIMENSIONS:
+        results[dim] = concentration(ctx.backend.dimension_totals(ctx.data, dim)['total_amount'])
+    # Flat numbers: customer_id_gini, seller_id_top_10_share, ...
+    summary = {f'{dim}_{key}': value for dim, result in results.items() for key, value in result.summary().items()}
+    curves = {dim.replace('_id', '').replace('_', ' ').title(): result.pareto() for dim, result in results.items()}
+    return summary, {"revenue_per_customer.html": (charts.revenue_concentration, curves)}
+
+
+def stage_snapshots(ctx):
+    import tempfile
+    from datetime import datetime
+    from snapshots import SnapshotStore, kpi_changes
+
+    run = datetime.now().strftime("%Y%m%dT%H%M%S")
+    if ctx.cache_dir is None:
+        # --no-cache: this run's KPIs only, recorded in a throwaway store
+        with tempfile.TemporaryDirectory() as path:
+            current = SnapshotStore(path).record(ctx.timeline, ctx.df, run=run)
+        previous = None
+    else:
+        store = SnapshotStore()
+        _, previous = store.latest_run()
+        current = store.record(ctx.timeline, ctx.df, run=run)
+    if current is None:
+        return {}, {}
+    kpis = current.kpis()
+    # Change of every KPI since the previous run: total_revenue_change, ...
+    if previous is not None:
+        kpis.update({f'{kpi}_change': change for kpi, change in kpi_changes(current, previous).items()})
+    return kpis, {}
+
+
+def stage_loyalty(ctx):
+    orders = ctx.customers.orders_per_customer()
+    return orders, {"Orders_per_customer.html": (charts.purchase_frequency, orders)}
+
+
+def stage_customers(ctx):
+    from customer_features import new_vs_returning_monthly
+
+    monthly = new_vs_returning_monthly(ctx.customers)
+    return monthly, {"New_vs_Returning_Customers_Over_Time.html": (charts.customer_types, monthly)}
+
+
+def stage_segments(ctx):
+    return ctx.customers.rfm(), {}
+
+
+def stage_discounts(ctx):
+    discounts = ctx.discounts
+    return (
+        {**discounts.tables, 'totals': discounts.totals},
+        {
+            "Discount_vs_Revenue_per_Order.html":
+                (charts.discount_vs_revenue, discounts['discount_per_order']),
+            "Discounted_vs_Non-Discounted_Orders.html":
+                (charts.revenue_by_discount, discounts['revenue_by_discount_flag']),
+            "Average_Discount_by_Category.html":
+                (charts.average_discount_by_category, discounts['avg_discount_by_category']),
+            "Revenue_by_Discount_Depth.html":
+                (charts.revenue_by_discount_depth, discounts['depth']),
+        },
+    )
+
+
+# Columns every run loads: validation and deduplication read them, and so do
+# the order, customer and time tables most stages are built from
+BASE_COLUMNS = list(dict.fromkeys([*REQUIRED_COLUMNS, *LINE_KEY]))
+
+# Further columns each stage reads
+STAGE_COLUMNS = {
+    'kpis': [],
+    'trends': ['month'],
+    'rolling': [],
+    'dimensions': REVENUE_DIMENSIONS,
+    'sellers': ['seller_id'],
+    'costs': [],
+    'products': QUANTITY_DIMENSIONS,
+    'price': ['category'],
+    'geo': ['country', 'state', 'city'],
+    'concentration': list(CONCENTRATION_DIMENSIONS),
+    'snapshots': list(SNAPSHOT_DIMENSIONS),
+    'loyalty': [],
+    'customers': [],
+    'segments': [],
+    'discounts': list(UPLIFT_DIMENSIONS),
+}
+
+STAGES = {
+    'kpis': stage_kpis,
+    'trends': stage_trends,
+    'rolling': stage_rolling,
+    'dimensions': stage_dimensions,
+    'sellers': stage_sellers,
+    'costs': stage_costs,
+    'products': stage_products,
+    'price': stage_price,
+    'geo': stage_geo,
+    'concentration': stage_concentration,
+    'snapshots': stage_snapshots,
+    'loyalty': stage_loyalty,
+    'customers': stage_customers,
+    'segments': stage_segments,
+    'discounts': stage_discounts,
+}
+
+
+# ## Command line
+
+# Scalar results printed as dollars
+MONEY_RESULTS = {'total_revenue', 'aov', 'Revenue', 'Tax', 'Shipping Cost'}
+# Relative changes and shares, printed as percentages
+CHANGE_SUFFIXES = ('_mom', '_yoy', '_change')
+SHARE_SUFFIXES = ('_share',)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Amazon sales analysis pipeline")
+    parser.add_argument("--data", default=DATA_PATH,
+                        help="raw Amazon.csv export, a directory of partitions or a glob")
+    parser.add_argument("--workers", type=int, help="partitions read in parallel (default: CPUs)")
+    parser.add_argument("--processes", action="store_true",
+                        help="parse partitions in worker processes instead of threads")
+    parser.add_argument("--backend", default=os.environ.get("AMAZON_BACKEND", "pandas"),
+                        help="dataframe backend: pandas (default) or polars")
+    parser.add_argument("--only", help=f"comma-separated stages: {','.join(STAGES)}")
+    parser.add_argument("--explore", action="store_true", help="print exploratory summaries")
+    parser.add_argument("--save", action="store_true", help="write the HTML figures")
+    parser.add_argument("--show", action="store_true", help="open the figures")
+    parser.add_argument("--visuals-dir", default=VISUALS_DIR, help="where --save writes HTML")
+    parser.add_argument("--no-cache", action="store_true", help="ignore the cleaned-data and figure caches")
+    parser.add_argument("--json", action="store_true", help="print scalar results as JSON")
+    return parser.parse_args(argv)
+
+
+def selected_stages(only):
+    if not only:
+        return list(STAGES)
+    names = [name.strip() for name in only.split(",") if name.strip()]
+    unknown = [name for name in names if name not in STAGES]
+    if unknown:
+        raise SystemExit(f"Unknown stage(s): {', '.join(unknown)}; choose from {', '.join(STAGES)}")
+    return names
+
+
+def render(figures, figure_cache=None, visuals_dir=VISUALS_DIR, save=True, show=False):
+    """Write and/or show the figures of one stage; returns the HTML files written."""
+    written = []
+    for filename, (builder, *inputs) in figures.items():
+        if save:
+            if figure_cache is None:
+                os.makedirs(visuals_dir, exist_ok=True)
+                builder(*inputs).write_html(os.path.join(visuals_dir, filename),
+                                            full_html=True, include_plotlyjs="cdn")
+                written.append(filename)
+            elif figure_cache.write_html(filename, builder, inputs, visuals_dir):
+                written.append(filename)
+        if show:
+            fig = figure_cache.figure(builder, *inputs) if figure_cache is not None else builder(*inputs)
+            fig.show()
+    return written
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    stages = selected_stages(args.only)
+    backend = get_backend(args.backend)
+
+    # --explore looks at every column; otherwise parse only what the stages read
+    columns = None if args.explore else stage_columns(stages)
+    df, report = load_clean(args.data, backend, use_cache=not args.no_cache,
+                            workers=args.workers, processes=args.processes, columns=columns)
+    print_report(report)
+    if args.explore:
+        explore(df)
+
+    ctx = Context(df, backend, None if args.no_cache else frame_dir(args.data))
+    figure_cache = None if args.no_cache else FigureCache()
+    scalars = {}
+    for name in stages:
+        result, figures = STAGES[name](ctx)
+
+        # KPI-style stages return plain numbers: report them
+        if isinstance(result, dict) and all(isinstance(v, numbers.Number) for v in result.values()):
+            scalars[name] = {key: float(value) for key, value in result.items()}
+
+        render(figures, figure_cache, args.visuals_dir, args.save, args.show)
+
+    if figure_cache is not None and (args.save or args.show):
+        print(f"figures: {figure_cache.built} built, {figure_cache.reused} reused", file=sys.stderr)
+
+    if args.json:
+        # JSON has no NaN: undefined values (e.g. the AOV of no orders) are null
+        defined = {name: {key: value if math.isfinite(value) else None for key, value in values.items()}
+                   for name, values in scalars.items()}
+        print(json.dumps(defined, indent=1, allow_nan=False))
+    else:
+        for name, values in scalars.items():
+            for key, value in values.items():
+                if math.isnan(value):
+                    # e.g. the AOV or a change of an empty date range
+                    print(f"{name}.{key}: n/a")
+                elif key in MONEY_RESULTS:
+                    print(f"{name}.{key}: {format_dollars(round(value * CENTS))}")
+                elif key.endswith(CHANGE_SUFFIXES):
+                    print(f"{name}.{key}: {value:+.1%}")
+                elif key.endswith(SHARE_SUFFIXES):
+                    print(f"{name}.{key}: {value:.1%}")
+                else:
+                    print(f"{name}.{key}: {value:,.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
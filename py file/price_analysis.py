@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# # Price Analysis
+#
+# Price sensitivity (quantity and revenue per price bin) and per-category
+# price elasticity, computed with NumPy accumulation over the price, quantity
+# and revenue columns. Nothing is added to the input frame: bins are plain
+# integer arrays that live only inside these functions.
+
+import numpy as np
+import pandas as pd
+
+from money import CENTS
+
+
+BIN_STRATEGIES = ("width", "quantile", "log")
+
+
+def price_bin_edges(prices, bins=12, strategy="width"):
+    """Return sorted bin edges for the price array.
+
+    - `width`    - equal-width bins (same edges as `pd.cut(prices, bins)`)
+    - `quantile` - bins holding roughly the same number of rows
+    - `log`      - equal-width bins on a log scale, for long-tailed prices
+    """
+    prices = np.asarray(prices, dtype="float64")
+    low, high = prices.min(), prices.max()
+
+    if strategy == "width":
+        edges = np.linspace(low, high, bins + 1)
+    elif strategy == "quantile":
+        edges = np.unique(np.quantile(prices, np.linspace(0, 1, bins + 1)))
+    elif strategy == "log":
+        if low <= 0:
+            raise ValueError("log bins need strictly positive prices")
+        edges = np.geomspace(low, high, bins + 1)
+    else:
+        raise ValueError(f"Unknown bin strategy {strategy!r}; choose one of {BIN_STRATEGIES}")
+
+    # Like pd.cut: widen the lowest edge by 0.1% so the minimum falls inside
+    # the first right-closed interval
+    edges = edges.copy()
+    edges[0] -= 0.001 * (high - low) if high > low else 0.001 * max(abs(low), 1.0)
+    return edges
+
+
+def _assign_bins(prices, edges):
+    # Right-closed intervals (a, b], as pd.cut does
+    codes = np.searchsorted(edges, prices, side="left") - 1
+    return np.clip(codes, 0, len(edges) - 2)
+
+
+def analyze_prices(df, bins=12, strategy="width", group="category",
+                   price_col="unit_price", quantity_col="quantity",
+                   revenue_col="total_amount"):
+    """Price sensitivity per bin and price elasticity per group in one pass.
+
+    Returns `(sensitivity, elasticity)`:
+
+    - `sensitivity` - one row per price bin: price range and midpoint, rows,
+      total and average quantity, revenue
+    - `elasticity` - one row per `group` value: log-log slope of quantity on
+      unit price (negative = demand falls as price rises) and the row count
+    """
+    # Money columns are integer cents; bins and revenue are reported in dollars
+    price = df[price_col].to_numpy(dtype="float64", na_value=np.nan) / CENTS
+    quantity = df[quantity_col].to_numpy(dtype="float64", na_value=np.nan)
+    revenue = df[revenue_col].to_numpy(dtype="float64", na_value=np.nan) / CENTS
+    valid = ~(np.isnan(price) | np.isnan(quantity) | np.isnan(revenue))
+    price, quantity, revenue = price[valid], quantity[valid], revenue[valid]
+
+    # --- Price sensitivity: bincount accumulation per price bin ---
+    edges = price_bin_edges(price, bins, strategy)
+    n_bins = len(edges) - 1
+    codes = _assign_bins(price, edges)
+
+    rows = np.bincount(codes, minlength=n_bins)
+    total_quantity = np.bincount(codes, weights=quantity, minlength=n_bins)
+    total_revenue = np.bincount(codes, weights=revenue, minlength=n_bins)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        avg_quantity = total_quantity / rows
+
+    sensitivity = pd.DataFrame({
+        'price_low': edges[:-1],
+        'price_high': edges[1:],
+        'price_mid': (edges[:-1] + edges[1:]) / 2,
+        'rows': rows,
+        'total_quantity': total_quantity,
+        'quantity': avg_quantity,
+        'revenue': total_revenue,
+    })
+
+    # --- Elasticity: per-group least squares of log(quantity) on log(price) ---
+    keys, labels = pd.factorize(df[group].to_numpy()[valid])
+    positive = (price > 0) & (quantity > 0) & (keys >= 0)
+    keys = keys[positive]
+    x = np.log(price[positive])
+    y = np.log(quantity[positive])
+    n_groups = len(labels)
+
+    n = np.bincount(keys, minlength=n_groups).astype("float64")
+    sx = np.bincount(keys, weights=x, minlength=n_groups)
+    sy = np.bincount(keys, weights=y, minlength=n_groups)
+    sxx = np.bincount(keys, weights=x * x, minlength=n_groups)
+    sxy = np.bincount(keys, weights=x * y, minlength=n_groups)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        denominator = n * sxx - sx * sx
+        slope = np.where(denominator > 0, (n * sxy - sx * sy) / denominator, np.nan)
+
+    elasticity = pd.DataFrame({
+        group: labels,
+        'elasticity': slope,
+        'rows': n.astype("int64"),
+    }).sort_values(group).reset_index(drop=True)
+
+    return sensitivity, elasticity
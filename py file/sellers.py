@@ -0,0 +1,189 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# # Seller Scorecard
+#
+# Per-seller revenue, orders, units, AOV, discount rate, customer reach,
+# repeat-customer share and monthly revenue trend. Sellers get integer codes
+# (sorted by seller_id) and every statistic is accumulated into arrays indexed
+# by that code with np.bincount / np.unique over the transactions, once:
+#
+# - `table` - one row per seller with the additive counters
+# - `trend` - (seller code, month, revenue) for the months a seller sold in,
+#   sorted by seller code, so a seller's trend is one contiguous slice
+#
+# Both are stored column by column (cache.py). Ranked and percentile queries
+# sort a metric once and then only index into that order, so no question
+# regroups the transactions. Money is kept in cents and reported in dollars.
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from cache import CACHE_DIR, load_frame, save_frame
+from money import to_dollars
+
+
+SELLERS_DIR = os.path.join(CACHE_DIR, "sellers")
+
+# Metrics of the scorecard (columns of `scorecard()`)
+METRICS = (
+    'revenue', 'orders', 'units', 'aov', 'discount_rate',
+    'customers', 'repeat_share',
+)
+
+
+def _sorted_codes(values):
+    """Integer code per value (-1 for nulls) and the distinct values in sorted order."""
+    codes, uniques = pd.factorize(values)
+    keys = np.asarray(uniques, dtype=str)
+    order = np.argsort(keys, kind="stable")
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    return np.where(codes >= 0, rank[np.maximum(codes, 0)], -1), keys[order]
+
+
+def _ratio(numerator, denominator):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(denominator > 0, numerator / denominator, np.nan)
+
+
+def seller_tables(df):
+    """One pass over the transactions -> (per-seller table, monthly trend)."""
+    sellers, keys = _sorted_codes(df['seller_id'])
+    orders, _ = pd.factorize(df['order_id'])
+    customers, _ = pd.factorize(df['customer_id'])
+    valid = (sellers >= 0) & (orders >= 0) & (customers >= 0)
+    sellers, orders, customers = sellers[valid], orders[valid], customers[valid]
+    n = len(keys)
+
+    amount = df['total_amount'].to_numpy(dtype="float64")[valid]
+    quantity = df['quantity'].to_numpy(dtype="float64")[valid]
+    gross = quantity * df['unit_price'].to_numpy(dtype="float64")[valid]
+    discount = gross * df['discount'].to_numpy(dtype="float64")[valid]
+
+    # Distinct (seller, order) pairs
+    n_orders = int(orders.max()) + 1 if len(orders) else 1
+    pair_sellers = np.unique(sellers * n_orders + orders) // n_orders
+
+    # Distinct (seller, customer) pairs and how many distinct orders each one placed
+    n_customers = int(customers.max()) + 1 if len(customers) else 1
+    reach, reach_of = np.unique(sellers * n_customers + customers, return_inverse=True)
+    reach_sellers = reach // n_customers
+    placed = np.unique(reach_of * n_orders + orders) // n_orders
+    order_counts = np.bincount(placed, minlength=len(reach))
+
+    table = pd.DataFrame({
+        'seller_id': keys,
+        'revenue': np.bincount(sellers, weights=amount, minlength=n).round().astype('int64'),
+        'orders': np.bincount(pair_sellers, minlength=n),
+        'units': np.bincount(sellers, weights=quantity, minlength=n).astype('int64'),
+        'lines': np.bincount(sellers, minlength=n),
+        'gross': np.bincount(sellers, weights=gross, minlength=n),
+        'discount_amount': np.bincount(sellers, weights=discount, minlength=n),
+        'customers': np.bincount(reach_sellers, minlength=n),
+        'repeat_customers': np.bincount(reach_sellers[order_counts > 1], minlength=n),
+    })
+
+    # Revenue per (seller, month) that has sales, sorted by seller then month
+    months = df['order_date'].to_numpy(dtype="datetime64[M]")[valid].astype(np.int64)
+    first_month = int(months.min()) if len(months) else 0
+    n_months = int(months.max()) - first_month + 1 if len(months) else 1
+    cells, inverse = np.unique(sellers * n_months + (months - first_month), return_inverse=True)
+    trend = pd.DataFrame({
+        'seller': cells // n_months,
+        'month': (cells % n_months + first_month).astype("datetime64[M]").astype("datetime64[ns]"),
+        'revenue': np.bincount(inverse, weights=amount, minlength=len(cells)).round().astype('int64'),
+    })
+    return table, trend
+
+
+class SellerScorecard:
+    """Array-backed per-seller statistics with ranked and percentile queries."""
+
+    def __init__(self, table, trend):
+        self.table = table  # one row per seller, sorted by seller_id
+        self.trend = trend  # (seller code, month, revenue), sorted by seller code
+        self.keys = table['seller_id'].to_numpy(dtype=str)
+        self.offsets = np.searchsorted(trend['seller'].to_numpy(), np.arange(len(table) + 1))
+        self._scorecard = None
+        self._rankings = {}  # metric -> seller codes, best first
+
+    @classmethod
+    def build(cls, df):
+        return cls(*seller_tables(df))
+
+    @classmethod
+    def load(cls, path=SELLERS_DIR):
+        table = load_frame(os.path.join(path, "table"))
+        trend = load_frame(os.path.join(path, "trend"))
+        if table is None or trend is None:
+            return None
+        return cls(table, trend)
+
+    def save(self, path=SELLERS_DIR):
+        save_frame(self.table, os.path.join(path, "table"))
+        save_frame(self.trend, os.path.join(path, "trend"))
+
+    def __len__(self):
+        return len(self.table)
+
+    def scorecard(self):
+        """Every metric of every seller (money in dollars, shares 0..1)."""
+        if self._scorecard is None:
+            t = self.table
+            self._scorecard = pd.DataFrame({
+                'seller_id': t['seller_id'].astype(str),
+                'revenue': to_dollars(t['revenue']),
+                'orders': t['orders'],
+                'units': t['units'],
+                'aov': to_dollars(_ratio(t['revenue'].to_numpy(), t['orders'].to_numpy())),
+                'discount_rate': _ratio(t['discount_amount'].to_numpy(), t['gross'].to_numpy()),
+                'customers': t['customers'],
+                'repeat_share': _ratio(t['repeat_customers'].to_numpy(), t['customers'].to_numpy()),
+            })
+        return self._scorecard
+
+    def values(self, metric):
+        """One value per seller code for a scorecard metric."""
+        if metric not in METRICS:
+            raise ValueError(f"Unknown metric {metric!r}; choose one of {', '.join(METRICS)}")
+        return self.scorecard()[metric].to_numpy(dtype="float64")
+
+    def ranking(self, metric):
+        """Seller codes from highest to lowest `metric` (ties by seller_id, NaN last)."""
+        if metric not in self._rankings:
+            self._rankings[metric] = np.argsort(-self.values(metric), kind="stable")
+        return self._rankings[metric]
+
+    def top(self, metric, n=10, ascending=False):
+        """The `n` best (or, with `ascending`, worst) sellers on `metric`."""
+        ranking = self.ranking(metric)
+        ranking = ranking[:np.count_nonzero(~np.isnan(self.values(metric)))]
+        codes = ranking[::-1][:n] if ascending else ranking[:n]
+        return self.scorecard().iloc[codes].reset_index(drop=True)
+
+    def percentile_ranks(self, metric):
+        """Percentile (0-100) of every seller on `metric`: share of sellers at or below it."""
+        values = self.values(metric)
+        ordered = values[self.ranking(metric)][::-1]
+        ordered = ordered[~np.isnan(ordered)]
+        ranks = 100 * np.searchsorted(ordered, values, side="right") / max(len(ordered), 1)
+        return pd.Series(np.where(np.isnan(values), np.nan, ranks), index=self.keys, name=metric)
+
+    def band(self, metric, low, high=100):
+        """Sellers whose percentile on `metric` lies in (`low`, `high`], best first."""
+        ranks = self.percentile_ranks(metric).to_numpy()
+        codes = self.ranking(metric)
+        selected = codes[(ranks[codes] > low) & (ranks[codes] <= high)]
+        return self.scorecard().iloc[selected].reset_index(drop=True)
+
+    def seller(self, seller_id):
+        """(scorecard row, monthly revenue in dollars) of one seller; None when unknown."""
+        code = int(np.searchsorted(self.keys, str(seller_id)))
+        if code >= len(self.keys) or self.keys[code] != str(seller_id):
+            return None
+        part = self.trend.iloc[self.offsets[code]:self.offsets[code + 1]]
+        monthly = pd.Series(to_dollars(part['revenue'].to_numpy()), index=part['month'].to_numpy(), name='revenue')
+        return self.scorecard().iloc[code], monthly.rename_axis('month')
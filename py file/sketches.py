@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# # Mergeable Distinct-Count Sketches
+#
+# HyperLogLog registers for distinct customer / order counts. Two sketches are
+# merged with an element-wise max, so a month's distinct customers come from
+# merging its daily sketches instead of rescanning the raw rows. All helpers
+# work on whole NumPy arrays; `grouped_registers` builds one sketch per group
+# (e.g. per day) in a single pass.
+
+import numpy as np
+import pandas as pd
+
+
+DEFAULT_PRECISION = 12  # 4096 one-byte registers, ~1.6% standard error
+
+
+def hash_values(values):
+    """64-bit hash of every value (strings, ints, ...) as a uint64 array."""
+    if not isinstance(values, (pd.Series, pd.Index)):
+        values = pd.Series(np.asarray(values))
+    return pd.util.hash_pandas_object(values, index=False).to_numpy()
+
+
+def register_updates(hashes, p=DEFAULT_PRECISION):
+    """Split hashes into (register index, rank) pairs."""
+    hashes = np.asarray(hashes, dtype=np.uint64)
+    index = (hashes >> np.uint64(64 - p)).astype(np.int64)
+    rest = hashes & np.uint64((1 << (64 - p)) - 1)
+    # frexp gives the bit length of `rest` (0 for rest == 0)
+    _, bit_length = np.frexp(rest.astype(np.float64))
+    rank = ((64 - p) - bit_length + 1).astype(np.uint8)
+    return index, rank
+
+
+def grouped_registers(group_codes, n_groups, hashes, p=DEFAULT_PRECISION):
+    """One register row per group: shape (n_groups, 2**p), dtype uint8."""
+    registers = np.zeros((n_groups, 1 << p), dtype=np.uint8)
+    index, rank = register_updates(hashes, p)
+    np.maximum.at(registers, (np.asarray(group_codes, dtype=np.int64), index), rank)
+    return registers
+
+
+def estimate(registers):
+    """Distinct-count estimate for one register row or a 2-D stack of rows."""
+    registers = np.atleast_2d(registers)
+    m = registers.shape[1]
+    alpha = 0.7213 / (1 + 1.079 / m)
+
+    raw = alpha * m * m / np.sum(np.exp2(-registers.astype(np.float64)), axis=1)
+    zeros = np.count_nonzero(registers == 0, axis=1)
+
+    # Small-range correction: linear counting while registers are still empty
+    with np.errstate(divide="ignore"):
+        linear = m * np.log(m / np.maximum(zeros, 1))
+    counts = np.where((raw <= 2.5 * m) & (zeros > 0), linear, raw)
+    return np.rint(counts).astype(np.int64)
+
+
+class HyperLogLog:
+    """A single mergeable distinct-count sketch."""
+
+    def __init__(self, p=DEFAULT_PRECISION, registers=None):
+        self.p = p
+        self.registers = (
+            np.zeros(1 << p, dtype=np.uint8) if registers is None
+            else np.asarray(registers, dtype=np.uint8)
+        )
+
+    @classmethod
+    def from_values(cls, values, p=DEFAULT_PRECISION):
+        sketch = cls(p)
+        sketch.add(values)
+        return sketch
+
+    def add(self, values):
+        index, rank = register_updates(hash_values(values), self.p)
+        np.maximum.at(self.registers, index, rank)
+        return self
+
+    def merge(self, other):
+        if other.p != self.p:
+            raise ValueError("Cannot merge sketches with different precision")
+        return HyperLogLog(self.p, np.maximum(self.registers, other.registers))
+
+    __or__ = merge
+
+    def count(self):
+        return int(estimate(self.registers)[0])
+
+    def to_bytes(self):
+        return bytes([self.p]) + self.registers.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data):
+        return cls(data[0], np.frombuffer(data[1:], dtype=np.uint8).copy())
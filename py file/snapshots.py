@@ -0,0 +1,356 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# # KPI Snapshot Store
+#
+# A compact JSON record per day, per month and per pipeline run:
+#
+# - additive KPI state: revenue (cents), order count, quantity, discount, lines
+# - the distinct-customer sketch of the period (sketches.py), compressed
+# - top-k revenue lists per dimension
+#
+# Records merge like the time rollup: sums are added, sketches take the
+# register maximum. A run adds its rows to the day and month records already
+# stored; row fingerprints (dedup.py) kept next to the records make sure a
+# row recorded by an earlier run - the same file again, or an overlapping
+# export - is not counted twice. KPIs "as of" any date range are computed by merging the
+# stored month records that lie inside the range and the day records at its
+# edges, so old transactions are never rescanned. Top-k lists merge
+# approximately: a group that missed a period's list is not counted for that
+# period, so TOP_K_STORED keeps headroom over the lists that are shown.
+#
+#     python snapshots.py --from 2023-01-01 --to 2023-03-31
+#     python snapshots.py --from 2023-01-01 --to 2023-03-31 --vs-from 2022-01-01 --vs-to 2022-03-31
+#     python snapshots.py --runs
+
+import base64
+import json
+import os
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from dedup import FingerprintIndex, fingerprints
+from money import CENTS, format_dollars, to_dollars
+from sketches import DEFAULT_PRECISION, estimate
+from time_rollups import TimeRollup
+
+
+SNAPSHOT_DIR = "../file/snapshots"
+
+# Record kinds: per-period records (time rollup levels) and per-run records
+PERIOD_KINDS = ('day', 'month')
+RUN_KIND = 'run'
+
+SNAPSHOT_DIMENSIONS = ('category', 'brand', 'product_name', 'seller_id')
+TOP_K_STORED = 50   # groups kept per dimension and record
+TOP_K = 10          # groups shown
+
+SUM_COLUMNS = ('total_amount', 'order_count', 'quantity', 'discount', 'lines')
+
+
+def _encode_registers(registers):
+    return base64.b64encode(zlib.compress(np.ascontiguousarray(registers, dtype=np.uint8).tobytes())).decode("ascii")
+
+
+def _decode_registers(text):
+    return np.frombuffer(zlib.decompress(base64.b64decode(text)), dtype=np.uint8).copy()
+
+
+def _merge_top(left, right, k=TOP_K_STORED):
+    """Add two {group: cents} lists and keep the k largest."""
+    combined = dict(left)
+    for group, cents in right.items():
+        combined[group] = combined.get(group, 0) + cents
+    return dict(sorted(combined.items(), key=lambda item: (-item[1], item[0]))[:k])
+
+
+class Snapshot:
+    """Mergeable KPI state of one date range."""
+
+    def __init__(self, start, end, sums, customers, top=None, p=DEFAULT_PRECISION):
+        self.start = pd.Timestamp(start)  # first day covered
+        self.end = pd.Timestamp(end)      # last day covered
+        self.sums = sums                  # {column: number}, total_amount in cents
+        self.customers = customers        # 2**p sketch registers
+        self.top = top or {}              # {dimension: {group: cents}}
+        self.p = p
+
+    def merge(self, other):
+        if other.p != self.p:
+            raise ValueError("Cannot merge snapshots with different sketch precision")
+        return Snapshot(
+            min(self.start, other.start), max(self.end, other.end),
+            {col: self.sums[col] + other.sums[col] for col in SUM_COLUMNS},
+            np.maximum(self.customers, other.customers),
+            {dim: _merge_top(self.top.get(dim, {}), other.top.get(dim, {}))
+             for dim in dict.fromkeys([*self.top, *other.top])},
+            self.p,
+        )
+
+    def kpis(self):
+        """The six KPI cards (customers estimated from the sketch)."""
+        orders = self.sums['order_count']
+        return {
+            'total_revenue': to_dollars(self.sums['total_amount']),
+            'aov': to_dollars(self.sums['total_amount'] / orders) if orders else float('nan'),
+            'total_orders': int(orders),
+            'total_customers': int(estimate(self.customers)[0]),
+            'total_quantity': int(self.sums['quantity']),
+            'total_discount': float(self.sums['discount']),
+        }
+
+    def top_list(self, dim, n=TOP_K):
+        """The n largest groups of a dimension by revenue, in dollars."""
+        groups = list(self.top.get(dim, {}).items())[:n]
+        return pd.DataFrame({
+            dim: [group for group, _ in groups],
+            'total_amount': to_dollars(np.array([cents for _, cents in groups], dtype='float64')),
+        })
+
+    def to_dict(self):
+        return {
+            'start': self.start.strftime("%Y-%m-%d"),
+            'end': self.end.strftime("%Y-%m-%d"),
+            'sums': {col: float(value) for col, value in self.sums.items()},
+            'p': self.p,
+            'customers': _encode_registers(self.customers),
+            'top': {dim: [[group, int(cents)] for group, cents in groups.items()] for dim, groups in self.top.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, record):
+        return cls(
+            record['start'], record['end'], record['sums'],
+            _decode_registers(record['customers']),
+            {dim: {group: cents for group, cents in groups} for dim, groups in record['top'].items()},
+            record['p'],
+        )
+
+
+def kpi_changes(current, previous):
+    """Relative change (0.05 = +5%) of every KPI between two snapshots."""
+    now, before = current.kpis(), previous.kpis()
+    return {kpi: value / before[kpi] - 1 if before[kpi] else float('nan') for kpi, value in now.items()}
+
+
+def top_groups(df, period_codes, n_periods, dims=SNAPSHOT_DIMENSIONS, k=TOP_K_STORED):
+    """[{dimension: {group: cents}} per period]: the k largest revenue groups of each period."""
+    top = [{} for _ in range(n_periods)]
+    amount = df['total_amount'].to_numpy(dtype="float64")
+    for dim in dims:
+        if dim not in df.columns:
+            continue
+        codes, names = pd.factorize(df[dim])
+        valid = codes >= 0
+        n_names = max(len(names), 1)
+        cells, inverse = np.unique(period_codes[valid] * n_names + codes[valid], return_inverse=True)
+        sums = np.bincount(inverse, weights=amount[valid], minlength=len(cells))
+        periods = cells // n_names
+
+        # Largest first within each period, then the first k of every period
+        order = np.lexsort((-sums, periods))
+        ordered_periods = periods[order]
+        rank = np.arange(len(order)) - np.searchsorted(ordered_periods, ordered_periods, side="left")
+        kept = order[rank < k]
+        names = np.asarray(names, dtype=str)
+        for period, name, cents in zip(periods[kept], names[cells[kept] % n_names], sums[kept]):
+            top[period].setdefault(dim, {})[str(name)] = int(round(cents))
+    return top
+
+
+def period_snapshots(timeline, df=None, kind='day', dims=SNAPSHOT_DIMENSIONS):
+    """{period key: Snapshot} for every period of `timeline` at one level.
+
+    Sums and sketches come from the time rollup; top-k lists need the
+    transactions `df` and are left empty without it.
+    """
+    starts, sums, customers, _ = timeline.periods(kind)
+    ends = starts.to_period(kind[0].upper()).end_time.normalize()
+    top = [{} for _ in starts]
+    if df is not None and len(starts):
+        periods = pd.PeriodIndex(df['order_date'], freq=kind[0].upper()).start_time
+        period_codes = np.searchsorted(starts.asi8, periods.asi8)
+        top = top_groups(df, period_codes, len(starts), dims)
+    return {
+        start.strftime("%Y-%m-%d" if kind == 'day' else "%Y-%m"):
+            Snapshot(start, end, {col: sums[col][i] for col in SUM_COLUMNS}, customers[i], top[i], timeline.p)
+        for i, (start, end) in enumerate(zip(starts, ends))
+    }
+
+
+class SnapshotStore:
+    """Snapshot records on disk: `<kind>/<key>.json`."""
+
+    def __init__(self, path=SNAPSHOT_DIR):
+        self.path = path
+
+    def _file(self, kind, key):
+        return os.path.join(self.path, kind, f"{key}.json")
+
+    def write(self, kind, key, snapshot):
+        path = self._file(kind, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(snapshot.to_dict(), f, separators=(",", ":"))
+        os.replace(path + ".tmp", path)
+
+    def read(self, kind, key):
+        path = self._file(kind, key)
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding="utf-8") as f:
+            return Snapshot.from_dict(json.load(f))
+
+    def keys(self, kind):
+        """Sorted record keys of one kind."""
+        folder = os.path.join(self.path, kind)
+        if not os.path.isdir(folder):
+            return []
+        return sorted(name[:-5] for name in os.listdir(folder) if name.endswith(".json"))
+
+    def record(self, timeline, df=None, run=None):
+        """Add `df` to the day and month records; with `run`, also write a run record.
+
+        `timeline` is the time rollup of `df`. Rows of `df` an earlier call
+        already recorded are skipped, so records only grow by rows never seen
+        before. Without `df` the rows cannot be told apart: the records of the
+        periods in `timeline` are replaced instead.
+        Returns the run snapshot (all days merged, top-k lists from `df`) when
+        `run` is given, else None.
+        """
+        if df is None:
+            for kind in PERIOD_KINDS:
+                for key, snapshot in period_snapshots(timeline, None, kind).items():
+                    self.write(kind, key, snapshot)
+        else:
+            self._add_rows(timeline, df)
+        if run is None or not len(timeline.days):
+            return None
+
+        top = top_groups(df, np.zeros(len(df), dtype=np.int64), 1)[0] if df is not None else {}
+        snapshot = Snapshot(timeline.days[0], timeline.days[-1],
+                            {col: timeline.sums[col].sum() for col in SUM_COLUMNS},
+                            timeline.customers.max(axis=0), top, timeline.p)
+        self.write(RUN_KIND, run, snapshot)
+        return snapshot
+
+    def _add_rows(self, timeline, df):
+        """Merge the rows of `df` not recorded yet into the stored period records.
+
+        Order ids are fingerprinted too: an order with lines in two runs is
+        counted by the first one only.
+        """
+        index = FingerprintIndex(os.path.join(self.path, "rows"))
+        fps = fingerprints(df)
+        new = ~index.lookup(fps, index.ids(["rows"]))
+        if not new.any():
+            return
+        if not new.all():
+            df = df[new]
+            timeline = TimeRollup.build(df, timeline.p)
+
+        order_fps = fingerprints(df, key=['order_id'])
+        known = index.lookup(order_fps, index.ids(["orders"]))
+        if known.any():
+            # (day, order) pairs of orders counted before come off the order counts
+            pairs = pd.DataFrame({'day': df['order_date'].dt.normalize(), 'order': order_fps})[known]
+            counted = pairs.drop_duplicates().groupby('day').size()
+            order_count = timeline.sums['order_count'] - counted.reindex(timeline.days, fill_value=0).to_numpy()
+            timeline = TimeRollup(timeline.days, {**timeline.sums, 'order_count': order_count},
+                                  timeline.customers, timeline.orders, timeline.p)
+
+        for kind in PERIOD_KINDS:
+            for key, snapshot in period_snapshots(timeline, df, kind).items():
+                stored = self.read(kind, key)
+                self.write(kind, key, snapshot if stored is None else stored.merge(snapshot))
+
+        for source, values in (("rows", fps[new]), ("orders", order_fps[~known])):
+            source_id, _ = index.register(source, values, append=True)
+            index.add(values, source_id)
+        index.save()
+
+    def latest_run(self):
+        keys = self.keys(RUN_KIND)
+        return (keys[-1], self.read(RUN_KIND, keys[-1])) if keys else (None, None)
+
+    def as_of(self, start, end):
+        """Merged snapshot of [start, end] from stored records; None when nothing is stored there.
+
+        Whole months inside the range use their month record, the remaining
+        days their day record (days without a record had no sales).
+        """
+        start, end = pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize()
+        months = set(self.keys('month'))
+        days = set(self.keys('day'))
+
+        merged = None
+        day = start
+        while day <= end:
+            month = day.to_period('M')
+            if day == month.start_time and month.end_time.normalize() <= end and month.strftime("%Y-%m") in months:
+                part = self.read('month', month.strftime("%Y-%m"))
+                day = month.end_time.normalize() + pd.Timedelta(days=1)
+            else:
+                key = day.strftime("%Y-%m-%d")
+                part = self.read('day', key) if key in days else None
+                day += pd.Timedelta(days=1)
+            if part is not None:
+                merged = part if merged is None else merged.merge(part)
+        if merged is not None:
+            merged.start, merged.end = start, end
+        return merged
+
+
+# Scalar KPIs printed as dollars
+MONEY_KPIS = {'total_revenue', 'aov'}
+
+
+def _print_kpis(snapshot, changes=None):
+    for kpi, value in snapshot.kpis().items():
+        if np.isnan(value):
+            text = "n/a"
+        elif kpi in MONEY_KPIS:
+            text = format_dollars(round(value * CENTS))
+        else:
+            text = f"{value:,.2f}"
+        if changes is not None:
+            text += f"  ({changes[kpi]:+.1%})"
+        print(f"{kpi}: {text}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="KPIs of any date range from stored snapshots")
+    parser.add_argument("--from", dest="start", help="first day of the range")
+    parser.add_argument("--to", dest="end", help="last day of the range")
+    parser.add_argument("--vs-from", help="first day of the range to compare with")
+    parser.add_argument("--vs-to", help="last day of the range to compare with")
+    parser.add_argument("--top", choices=SNAPSHOT_DIMENSIONS, help="also list the top groups of a dimension")
+    parser.add_argument("--runs", action="store_true", help="list the stored run records")
+    parser.add_argument("--path", default=SNAPSHOT_DIR, help="snapshot directory")
+    args = parser.parse_args()
+
+    store = SnapshotStore(args.path)
+    if args.runs:
+        for key in store.keys(RUN_KIND):
+            run = store.read(RUN_KIND, key)
+            print(f"{key}: {run.start:%Y-%m-%d} .. {run.end:%Y-%m-%d}, revenue {format_dollars(run.sums['total_amount'])}")
+        raise SystemExit(0)
+    if not args.start or not args.end:
+        parser.error("--from and --to are required")
+
+    current = store.as_of(args.start, args.end)
+    if current is None:
+        raise SystemExit(f"No snapshots between {args.start} and {args.end}")
+    changes = None
+    if args.vs_from and args.vs_to:
+        previous = store.as_of(args.vs_from, args.vs_to)
+        if previous is None:
+            raise SystemExit(f"No snapshots between {args.vs_from} and {args.vs_to}")
+        changes = kpi_changes(current, previous)
+    _print_kpis(current, changes)
+    if args.top:
+        print(current.top_list(args.top).to_string(index=False))
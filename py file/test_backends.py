@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# # Backend Parity Tests
+#
+# The polars backend must produce the same chart tables, the same screened
+# rows (duplicates, reason masks) and the same KPIs as the pandas reference
+# on small synthetic exports.
+#
+#     cd "py file" && python -m pytest -q
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backends import REVENUE_DIMENSIONS, PandasBackend, _normalize, check_parity, get_backend
+from dedup import LINE_KEY, FingerprintIndex
+from orders import OrderTable
+from validation import REASON_BITS, TOLERANCE, date_bounds, polars_reason_mask, reason_mask
+
+pytest.importorskip("polars")
+
+
+def test_chart_data_matches_pandas(export_path):
+    assert check_parity(export_path, names=["polars"]) == {}
+
+
+@pytest.mark.parametrize("dim", REVENUE_DIMENSIONS)
+def test_dimension_totals_match_pandas(export_path, dim):
+    reference, polars = PandasBackend(), get_backend("polars")
+    want = reference.dimension_totals(reference.load(export_path), dim)
+    got = polars.dimension_totals(polars.load(export_path), dim)
+    pd.testing.assert_frame_equal(_normalize(got), _normalize(want), check_dtype=False, rtol=1e-9)
+
+
+def test_reason_masks_match_pandas(dirty_dir):
+    path = f"{dirty_dir}/a.csv"
+    reference, polars = PandasBackend(), get_backend("polars")
+    bounds = date_bounds()
+    want = reason_mask(reference.load(path), *bounds, TOLERANCE)
+    got = polars.load(path).select(polars_reason_mask(polars.pl, *bounds, TOLERANCE)).collect().to_series().to_numpy()
+    np.testing.assert_array_equal(got, want)
+    for reason, bit in REASON_BITS.items():
+        assert np.count_nonzero(got & bit) == np.count_nonzero(want & bit), reason
+        if not reason.startswith("null_order"):
+            assert np.count_nonzero(want & bit) > 0, reason
+
+
+@pytest.mark.parametrize("persistent", [False, True])
+def test_screen_matches_pandas(dirty_dir, tmp_path, persistent):
+    reference, polars = PandasBackend(), get_backend("polars")
+    results = []
+    for backend in (reference, polars):
+        index = FingerprintIndex(str(tmp_path / backend.name)) if persistent else None
+        data, duplicates, checked = backend.screen(backend.load(dirty_dir), source=dirty_dir, index=index,
+                                                   quarantine_dir=None)
+        results.append((backend.to_pandas(data), duplicates, checked))
+    (want, want_duplicates, want_checked), (got, got_duplicates, got_checked) = results
+
+    counts = ('rows', 'duplicates_in_file', 'duplicates_of_sources', 'kept')
+    assert {name: [report[key] for key in counts] for name, report in got_duplicates.items()} == \
+        {name: [report[key] for key in counts] for name, report in want_duplicates.items()}
+    assert sum(report['duplicates_in_file'] for report in want_duplicates.values()) > 0
+    assert sum(report['duplicates_of_sources'] for report in want_duplicates.values()) > 0
+    assert got_checked == want_checked
+    assert want_checked['quarantined'] > 0
+
+    key = list(LINE_KEY)
+    pd.testing.assert_frame_equal(_normalize(got[key]), _normalize(want[key]), check_dtype=False)
+    assert OrderTable.build(got).kpis() == pytest.approx(OrderTable.build(want).kpis())
@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# # Compressed Input Tests
+#
+# gzip, bz2 and zstd exports load to the same frame as the plain CSV with
+# both backends, pzstd files decompress frame by frame, and the read-ahead
+# thread stops once its reader is closed.
+#
+#     cd "py file" && python -m pytest -q
+
+import bz2
+import gzip
+import shutil
+import struct
+
+import pandas as pd
+import pytest
+
+from backends import PandasBackend, _normalize
+from compressed import SKIPPABLE_MAGIC, ReadAheadReader, open_compressed, pzstd_frames, read_csv, spooled_copy
+
+OPENERS = {'.gz': gzip.open, '.bz2': bz2.open}
+
+
+@pytest.fixture(scope="module", params=sorted(OPENERS))
+def compressed_path(request, export_path, tmp_path_factory):
+    target = tmp_path_factory.mktemp("compressed") / f"Amazon.csv{request.param}"
+    with open(export_path, "rb") as src, OPENERS[request.param](target, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    return str(target)
+
+
+def test_read_csv_streams_compressed(export_path, compressed_path):
+    pd.testing.assert_frame_equal(read_csv(compressed_path), pd.read_csv(export_path))
+
+
+def test_backend_loads_compressed(export_path, compressed_path, backend):
+    want = PandasBackend().load(export_path)
+    got = backend.to_pandas(backend.load(compressed_path))
+    pd.testing.assert_frame_equal(_normalize(got), _normalize(want), check_dtype=False)
+
+
+def test_spooled_copy_is_made_once(export_path, compressed_path):
+    copy = spooled_copy(compressed_path)
+    assert spooled_copy(compressed_path) == copy
+    with open(copy, "rb") as got, open(export_path, "rb") as want:
+        assert got.read() == want.read()
+
+
+def _write_zstd(source, target, frames):
+    """zstd copy of `source`: one frame, or `frames` frames in the pzstd layout."""
+    zstandard = pytest.importorskip("zstandard")
+    with open(source, "rb") as f:
+        data = f.read()
+    with open(target, "wb") as out:
+        if frames == 1:
+            out.write(zstandard.ZstdCompressor().compress(data))
+            return str(target)
+        step = len(data) // frames + 1
+        for start in range(0, len(data), step):
+            frame = zstandard.ZstdCompressor().compress(data[start:start + step])
+            out.write(struct.pack("<III", SKIPPABLE_MAGIC, 4, len(frame)) + frame)
+    return str(target)
+
+
+@pytest.mark.parametrize("frames", [1, 4])
+def test_zstd(export_path, tmp_path, frames):
+    path = _write_zstd(export_path, tmp_path / "Amazon.csv.zst", frames)
+    layout = pzstd_frames(path)
+    assert (layout is None) if frames == 1 else (len(layout) == frames)
+    with open_compressed(path, workers=2) as stream, open(export_path, "rb") as want:
+        assert stream.read() == want.read()
+    pd.testing.assert_frame_equal(read_csv(path), pd.read_csv(export_path))
+
+
+def _blocks(n, fail=False):
+    for _ in range(n):
+        yield b"x" * 16
+    if fail:
+        raise OSError("corrupt input")
+
+
+@pytest.mark.parametrize("fail", [False, True])
+def test_producer_stops_when_closed(fail):
+    # depth 1: the producer is left waiting to queue the end marker or the error
+    reader = ReadAheadReader(_blocks(3, fail), depth=1)
+    reader.close()
+    reader._thread.join(timeout=5)
+    assert not reader._thread.is_alive()
+
+
+def test_producer_error_reaches_reader():
+    reader = ReadAheadReader(_blocks(2, fail=True), depth=1)
+    with pytest.raises(OSError, match="corrupt input"):
+        while reader.read(64):
+            pass
@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# # Revenue Concentration Tests
+#
+# The exact mode matches the textbook Gini and top shares, the histogram
+# mode stays within its accuracy without sorting, and histograms of batches
+# merge to the histogram of all values.
+#
+#     cd "py file" && python -m pytest -q
+
+import numpy as np
+import pytest
+
+from concentration import ValueHistogram, concentration
+
+
+@pytest.fixture(scope="module")
+def revenue():
+    return np.random.default_rng(5).lognormal(4, 1.5, 20_000).round(2)
+
+
+def _gini(values):
+    ordered = np.sort(values)
+    n = len(ordered)
+    return 2 * np.sum(np.arange(1, n + 1) * ordered) / (n * ordered.sum()) - (n + 1) / n
+
+
+def test_exact(revenue):
+    result = concentration(revenue, mode="exact")
+    assert result.gini == pytest.approx(_gini(revenue))
+    largest = np.sort(revenue)[::-1]
+    for percent, share in result.top_shares.items():
+        assert share == pytest.approx(largest[:int(np.ceil(percent / 100 * len(largest)))].sum() / largest.sum())
+
+    assert concentration(np.full(10, 5.0)).summary() == pytest.approx(
+        {'gini': 0.0, 'top_1_share': 0.1, 'top_10_share': 0.1, 'top_20_share': 0.2, 'top_50_share': 0.5,
+         'entities': 10})
+    one_holder = concentration([0, 0, 0, 0, 0, 0, 0, 0, 0, 10.0])
+    assert one_holder.gini == pytest.approx(0.9)
+    assert one_holder.top_shares[10] == pytest.approx(1.0)
+
+
+def test_histogram_within_accuracy(revenue):
+    exact = concentration(revenue, mode="exact")
+    sketch = concentration(revenue, mode="histogram")
+    assert sketch.mode == "histogram" and sketch.entities == len(revenue)
+    assert sketch.gini == pytest.approx(exact.gini, abs=0.01)
+    for percent in exact.top_shares:
+        assert sketch.top_shares[percent] == pytest.approx(exact.top_shares[percent], abs=0.01)
+    np.testing.assert_allclose(sketch.lorenz['value_share'], exact.lorenz['value_share'], atol=0.01)
+
+
+def test_histograms_merge(revenue):
+    whole = ValueHistogram.from_values(np.concatenate([revenue, [0.0, 0.0]]))
+    first = ValueHistogram.from_values(revenue[:500])
+    rest = ValueHistogram.from_values(np.concatenate([revenue[500:], [0.0, 0.0]]))
+    merged = first.merge(rest)
+    assert (merged.offset, merged.zeros) == (whole.offset, 2)
+    np.testing.assert_array_equal(merged.counts, whole.counts)
+    np.testing.assert_allclose(merged.sums, whole.sums)
+
+    back = ValueHistogram.from_dict(merged.to_dict())
+    np.testing.assert_array_equal(back.counts, whole.counts)
+    assert back.concentration().gini == pytest.approx(whole.concentration().gini)
+    assert ValueHistogram.from_values([]).merge(first).counts.sum() == 500
+    with pytest.raises(ValueError, match="different accuracy"):
+        first.merge(ValueHistogram.from_values(revenue, alpha=0.05))
+
+
+def test_pareto_and_edge_cases():
+    pareto = concentration([1.0, 2.0, 3.0, np.nan], points=5).pareto()
+    assert pareto.iloc[0].tolist() == [0.0, 0.0] and pareto.iloc[-1].tolist() == [100.0, 100.0]
+    assert concentration([1.0, 2.0, np.nan]).entities == 2
+
+    for mode in ("exact", "histogram"):
+        empty = concentration([0.0, 0.0], mode=mode)
+        assert np.isnan(empty.gini) and np.isnan(empty.top_shares[10])
+    for mode in ("exact", "histogram"):
+        with pytest.raises(ValueError, match="non-negative"):
+            concentration([1.0, -2.0], mode=mode)
+    with pytest.raises(ValueError, match="Unknown mode"):
+        concentration([1.0], mode="sorted")
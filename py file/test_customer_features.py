@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# # Customer Feature Tests
+#
+# Folding batches into the feature table gives the same table as building it
+# from the whole frame, even when an order's lines arrive in two batches, and
+# new vs returning customers are exact.
+#
+#     cd "py file" && python -m pytest -q
+
+import pandas as pd
+
+from backends import PandasBackend
+from customer_features import CustomerFeatures, new_vs_returning_monthly
+
+
+def _loaded(export_path):
+    backend = PandasBackend()
+    return backend.to_pandas(backend.load(export_path))
+
+
+def _split_mid_order(df):
+    """Two batches; the first line of a customer's largest order goes last."""
+    customer, order = df[['customer_id', 'order_id']].astype(str).value_counts().index[0]
+    lines = df.index[(df['customer_id'].astype(str) == customer) & (df['order_id'] == order)]
+    assert len(lines) > 1
+    return df.drop(lines[0]), df.loc[[lines[0]]]
+
+
+def test_update_counts_split_orders_once(export_path):
+    df = _loaded(export_path)
+    head, tail = _split_mid_order(df)
+    updated = CustomerFeatures.build(head).update(tail)
+    whole = CustomerFeatures.build(df)
+    pd.testing.assert_frame_equal(
+        updated.table.reset_index(drop=True),
+        whole.table.assign(customer_id=whole.table['customer_id'].astype(str)),
+        check_dtype=False, check_categorical=False,
+    )
+
+
+def test_save_load_keeps_orders(export_path, tmp_path):
+    df = _loaded(export_path)
+    head, tail = _split_mid_order(df)
+    CustomerFeatures.build(head).save(str(tmp_path))
+    loaded = CustomerFeatures.load(str(tmp_path)).update(tail)
+    assert loaded.table['order_count'].sum() == df.groupby('customer_id', observed=True)['order_id'].nunique().sum()
+
+
+def test_new_vs_returning_is_exact(export_path):
+    df = _loaded(export_path)
+    monthly = new_vs_returning_monthly(CustomerFeatures.build(df))
+    counts = monthly.pivot(index='order_date', columns='customer_type', values='customer_id')
+
+    month = df['order_date'].dt.to_period('M').dt.to_timestamp()
+    first = month.groupby(df['customer_id'], observed=True).transform('min')
+    active = df['customer_id'].groupby(month, observed=True).nunique()
+    new = df.loc[month == first, 'customer_id'].groupby(month, observed=True).nunique()
+    assert counts['New'].to_dict() == new.reindex(active.index, fill_value=0).to_dict()
+    assert (counts['New'] + counts['Returning']).to_dict() == active.to_dict()
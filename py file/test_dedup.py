@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# # Deduplication Tests
+#
+# Rows repeated within a file or delivered by an earlier source are dropped,
+# across runs through the on-disk index; rewritten and appended sources keep
+# the index in step with their content.
+#
+#     cd "py file" && python -m pytest -q
+
+import numpy as np
+import pandas as pd
+
+from conftest import synthetic_export, write_export
+from dedup import FingerprintIndex, content_hash, drop_duplicates, drop_partition_duplicates, fingerprints
+
+
+def screen(backend, path, index):
+    data, duplicates, _ = backend.screen(backend.load(path), source=path, index=index, quarantine_dir=None)
+    return backend.to_pandas(data), duplicates
+
+
+def test_second_run_drops_every_row(tmp_path, backend):
+    path = write_export(tmp_path / "Amazon.csv", synthetic_export())
+
+    first, reports = screen(backend, path, FingerprintIndex(str(tmp_path / "dedup")))
+    assert len(first) == reports["Amazon.csv"]['kept'] > 0
+
+    # A new run opens the index from disk
+    second, reports = screen(backend, path, FingerprintIndex(str(tmp_path / "dedup")))
+    assert len(second) == 0
+    assert reports["Amazon.csv"]['duplicates_of_sources'] == len(first)
+
+
+def test_fingerprints_ignore_dtype_and_lineage():
+    df = pd.DataFrame({
+        'order_id': ["a", "b"],
+        'order_date': pd.to_datetime(["2023-01-01", "2023-01-02"]),
+        'quantity': np.array([1, 2], dtype="int8"),
+        'source_row': [0, 1],
+    })
+    other = pd.DataFrame({
+        'order_id': pd.Categorical(["a", "b"]),
+        'order_date': df['order_date'].astype("datetime64[s]"),
+        'quantity': [1.0, 2.0],
+        'source_row': [7, 8],
+    })
+    np.testing.assert_array_equal(fingerprints(df), fingerprints(other))
+    assert fingerprints(df)[0] != fingerprints(df)[1]
+
+
+def test_repeats_and_overlap():
+    raw = synthetic_export()
+    index = FingerprintIndex(None)
+    first, report = drop_duplicates(pd.concat([raw, raw.head(10)]), index, "a.csv")
+    assert report['duplicates_in_file'] == 10 + raw.duplicated().sum()
+    pd.testing.assert_frame_equal(first, raw.drop_duplicates().reset_index(drop=True))
+
+    overlap = pd.concat([raw.tail(30), synthetic_export(seed=3)], ignore_index=True)
+    second, report = drop_duplicates(overlap, index, "b.csv")
+    assert report['duplicates_of_sources'] == raw.tail(30).drop_duplicates().shape[0]
+    assert len(second) == report['kept'] == len(overlap) - 30 - report['duplicates_in_file']
+
+
+def test_rewritten_source_replaces_its_rows():
+    raw, other = synthetic_export(), synthetic_export(seed=5)
+    index = FingerprintIndex(None)
+    drop_duplicates(raw, index, "a.csv")
+    # a.csv now holds other rows: its old rows are no longer in the index
+    drop_duplicates(other, index, "a.csv")
+    kept, report = drop_duplicates(raw, index, "b.csv")
+    assert report['duplicates_of_sources'] == 0
+    assert len(kept) == len(raw.drop_duplicates())
+
+
+def test_appended_rows():
+    raw = synthetic_export()
+    index = FingerprintIndex(None)
+    drop_duplicates(raw.head(100), index, "a.csv")
+    tail, report = drop_duplicates(raw.iloc[100:], index, "a.csv", append=True)
+    assert report['kept'] == len(tail) == len(raw.drop_duplicates()) - len(raw.head(100).drop_duplicates())
+    assert index.files["a.csv"]['content'] == [len(raw), content_hash(fingerprints(raw))]
+    # the same rows appended again are all duplicates
+    again, _ = drop_duplicates(raw.iloc[100:], index, "a.csv", append=True)
+    assert again.empty
+
+
+def test_partitions_in_order(tmp_path):
+    raw = synthetic_export()
+    df = pd.concat([raw.assign(source_partition="p1"), raw.head(40).assign(source_partition="p2")],
+                   ignore_index=True)
+    index = FingerprintIndex(str(tmp_path / "dedup"))
+    kept, reports = drop_partition_duplicates(df, index)
+    assert reports["p2"]['kept'] == 0
+    assert len(kept) == reports["p1"]['kept']
+    assert set(FingerprintIndex(str(tmp_path / "dedup")).files) == {"p1", "p2"}
+
+
+def test_memory_index_writes_nothing(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    drop_duplicates(synthetic_export(), FingerprintIndex(None), "a.csv")
+    assert list(tmp_path.iterdir()) == []
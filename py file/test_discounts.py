@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# # Discount Analytics Tests
+#
+# The single-scan tables match direct groupbys, depth buckets follow their
+# edges, and the input frame is left as it was.
+#
+#     cd "py file" && python -m pytest -q
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from discounts import DEPTH_LABELS, DiscountAnalytics, depth_buckets
+from money import to_dollars
+from orders import OrderTable
+
+
+@pytest.fixture(scope="module")
+def analytics(loaded):
+    return DiscountAnalytics.build(loaded, OrderTable.build(loaded))
+
+
+def test_depth_bucket_edges():
+    discount = np.array([0.0, np.nan, 0.01, 0.05, 0.051, 0.1, 0.2, 0.3, 0.31, 1.0])
+    labels = [DEPTH_LABELS[code] for code in depth_buckets(discount)]
+    assert labels == ["none", "none", "0-5%", "0-5%", "5-10%", "5-10%", "10-20%", "20-30%", "30%+", "30%+"]
+
+
+def test_tables_match_groupby(analytics, loaded):
+    discounted = loaded['discount'] > 0
+    flag = analytics['revenue_by_discount_flag'].set_index('has_discount')
+    by_flag = loaded.groupby(discounted)['total_amount']
+    assert flag['lines'].to_dict() == by_flag.size().to_dict()
+    assert flag['total_amount'].tolist() == pytest.approx(to_dollars(by_flag.sum()).tolist())
+
+    depth = analytics['depth']
+    assert depth['lines'].sum() == len(loaded)
+    assert depth['revenue_share'].sum() == pytest.approx(1.0)
+
+    avg = analytics['avg_discount_by_category'].set_index('category')['discount']
+    want = loaded.groupby('category', observed=True)['discount'].mean()
+    assert avg.to_dict() == pytest.approx(want.to_dict())
+
+    uplift = analytics['uplift_by_brand'].set_index('brand')
+    quantity = loaded.groupby(['brand', discounted], observed=True)['quantity'].mean().unstack()
+    assert uplift['avg_quantity_discounted'].tolist() == pytest.approx(quantity[True].tolist())
+    assert uplift['quantity_uplift'].tolist() == pytest.approx((quantity[True] / quantity[False] - 1).tolist())
+
+
+def test_totals(analytics, loaded):
+    gross = loaded['quantity'] * loaded['unit_price']
+    amount = gross * loaded['discount']
+    assert analytics.totals['discount_amount'] == pytest.approx(to_dollars(amount.sum()))
+    assert analytics.totals['discount_share'] == pytest.approx(amount.sum() / gross.sum())
+    assert len(analytics['discount_per_order']) == loaded['order_id'].nunique()
+
+
+def test_input_is_not_mutated(loaded):
+    before = loaded.copy()
+    DiscountAnalytics.build(loaded, OrderTable.build(loaded))
+    pd.testing.assert_frame_equal(loaded, before)
+
+
+def test_empty_groups_have_no_ratio():
+    df = pd.DataFrame({
+        'discount': [0.0, 0.0], 'quantity': [1, 2], 'unit_price': [100, 200], 'total_amount': [100, 400],
+        'category': ["a", None], 'brand': ["x", "x"], 'order_id': ["o1", "o2"],
+        'order_date': pd.to_datetime(["2023-01-01"] * 2), 'customer_id': ["c1", "c2"],
+        'tax': [0, 0], 'shipping_cost': [0, 0],
+    })
+    analytics = DiscountAnalytics.build(df, OrderTable.build(df))
+    uplift = analytics['uplift_by_category']
+    assert uplift['category'].tolist() == ["a"]
+    assert np.isnan(uplift['avg_quantity_discounted'].iloc[0])
+    assert analytics.totals['discounted_revenue_share'] == 0.0
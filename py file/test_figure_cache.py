@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# # Figure Cache Tests
+#
+# Figures are keyed by their builder and input tables: unchanged charts are
+# reused (and their HTML not rewritten), changed ones are rebuilt and their
+# stale files dropped.
+#
+#     cd "py file" && python -m pytest -q
+
+import os
+
+import pandas as pd
+import pytest
+
+from figure_cache import FigureCache, fingerprint
+
+pytest.importorskip("plotly")
+
+TITLE = "Revenue"
+
+
+def bars(table):
+    import plotly.graph_objects as go
+
+    return go.Figure(go.Bar(x=table['category'], y=table['revenue']), layout={'title': TITLE})
+
+
+def lines(table):
+    import plotly.graph_objects as go
+
+    return go.Figure(go.Scatter(x=table['category'], y=table['revenue']))
+
+
+@pytest.fixture
+def table():
+    return pd.DataFrame({'category': ["books", "toys"], 'revenue': [10.0, 20.0]})
+
+
+def test_fingerprint(table):
+    key = fingerprint(bars, [table])
+    assert fingerprint(bars, [table.copy()]) == key
+    # text hashes the same whatever its dtype
+    assert fingerprint(bars, [table.astype({'category': "category"})]) == key
+    assert fingerprint(bars, [table.assign(revenue=[10.0, 21.0])]) != key
+    assert fingerprint(lines, [table]) != key
+
+
+def test_module_constants_are_part_of_the_key(table, monkeypatch):
+    key = fingerprint(bars, [table])
+    monkeypatch.setattr(f"{__name__}.TITLE", "Sales")
+    assert fingerprint(bars, [table]) != key
+
+
+def test_write_html_reuses_and_rebuilds(table, tmp_path):
+    cache_dir, visuals = str(tmp_path / "figures"), str(tmp_path / "visuals")
+    cache = FigureCache(cache_dir)
+    assert cache.write_html("bars.html", bars, [table], visuals)
+    assert not cache.write_html("bars.html", bars, [table], visuals)
+    assert (cache.built, cache.reused) == (1, 1)
+
+    # a new run reads which figure each HTML file holds
+    again = FigureCache(cache_dir)
+    assert not again.write_html("bars.html", bars, [table], visuals)
+
+    old = fingerprint(bars, [table])
+    changed = table.assign(revenue=[5.0, 6.0])
+    assert again.write_html("bars.html", bars, [changed], visuals)
+    assert again.built == 1
+    assert not os.path.exists(os.path.join(cache_dir, old + ".html"))
+    assert again.outputs[os.path.abspath(os.path.join(visuals, "bars.html"))] == fingerprint(bars, [changed])
+
+
+def test_figure_from_json(table, tmp_path):
+    cache = FigureCache(str(tmp_path))
+    first = cache.figure(bars, table)
+    second = cache.figure(bars, table)
+    assert (cache.built, cache.reused) == (1, 1)
+    assert second.to_dict()['data'][0]['y'] == first.to_dict()['data'][0]['y']
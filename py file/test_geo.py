@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# # Geographic Rollup Tests
+#
+# Country aliases collapse to one row per code, missing locations roll up
+# under an explicit "unknown", every level keeps the grand totals, and
+# resolved country codes are cached on disk.
+#
+#     cd "py file" && python -m pytest -q
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from geo import UNKNOWN, UNKNOWN_CODE, CountryCodes, GeoRollup
+
+
+@pytest.fixture
+def geo():
+    df = pd.DataFrame({
+        'country': ["usa", "United States ", "united states", None, "", "india"],
+        'state': ["ca", "ca", "ny", "x", None, "mh"],
+        'city': ["la", "la", "nyc", "c", "d", None],
+        'total_amount': np.array([100, 200, 300, 400, 500, 600], dtype="int64"),
+        'quantity': [1, 2, 3, 4, 5, 6],
+        'order_id': ["o1", "o2", "o3", "o4", "o5", "o6"],
+    })
+    return GeoRollup.build(df, CountryCodes(None))
+
+
+def test_aliases_share_one_row(geo):
+    country = geo.level('country').set_index('country_code')
+    assert country.index.is_unique
+    assert country.loc['USA', 'country'] == "united states"
+    assert country.loc['USA', 'orders'] == 3
+    assert country.loc['USA', 'revenue'] == pytest.approx(6.0)
+    # "usa" and "united states" rows of the same state merge too
+    state = geo.level('state').set_index('state_code')
+    assert state.loc['USA-ca', 'orders'] == 2
+
+
+def test_missing_locations_are_unknown(geo):
+    country = geo.level('country').set_index('country_code')
+    assert "nan" not in set(geo.level('city')[['country', 'state', 'city']].to_numpy().ravel())
+    assert country.loc[UNKNOWN_CODE, 'country'] == UNKNOWN
+    assert country.loc[UNKNOWN_CODE, 'orders'] == 2
+    assert f"{UNKNOWN_CODE}-{UNKNOWN}" in set(geo.level('state')['state_code'])
+    assert geo.level('city').set_index('state_code').loc['IND-mh', 'city'] == UNKNOWN
+
+
+@pytest.mark.parametrize("level", ["country", "state", "city"])
+def test_levels_keep_totals(geo, level):
+    table = geo.level(level)
+    assert table['revenue'].sum() == pytest.approx(21.0)
+    assert table['quantity'].sum() == 21
+    assert table['orders'].sum() == 6
+
+
+def test_country_codes_are_cached(tmp_path, monkeypatch):
+    path = str(tmp_path / "geo_codes.json")
+    codes = CountryCodes(path).resolve(pd.Series([" USA", "uk", None, "india", "usa"]))
+    assert codes.tolist() == ["USA", "GBR", UNKNOWN_CODE, "IND", "USA"]
+
+    # a second resolver reads the cache and looks nothing up again
+    looked_up = []
+    monkeypatch.setattr("geo._lookup_country", lambda name: looked_up.append(name) or UNKNOWN_CODE)
+    again = CountryCodes(path)
+    assert again.resolve(pd.Series(["uk", "usa"])).tolist() == ["GBR", "USA"]
+    assert again.resolve(pd.Series(["atlantis"])).tolist() == [UNKNOWN_CODE]
+    assert looked_up == ["atlantis"]
+    assert "atlantis" in CountryCodes(path).codes
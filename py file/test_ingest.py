@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# # Partitioned Ingestion Tests
+#
+# Directories and globs resolve to sorted partition files, partitions with
+# different columns and types unify into one frame tagged with its lineage,
+# and threads and processes read the same rows.
+#
+#     cd "py file" && python -m pytest -q
+
+import gzip
+import shutil
+
+import pandas as pd
+import pytest
+
+from backends import PandasBackend
+from conftest import synthetic_export, write_export
+from ingest import PARTITION_COLUMN, partition_names, partition_paths, unify_frames
+
+
+@pytest.fixture(scope="module")
+def parts(tmp_path_factory):
+    """Three partitions: one gzip'd, one without Brand and with an extra column."""
+    folder = tmp_path_factory.mktemp("parts")
+    write_export(folder / "day1.csv", synthetic_export(rows=50, seed=1))
+    plain = write_export(folder / "day2.csv", synthetic_export(rows=60, seed=2))
+    with open(plain, "rb") as src, gzip.open(folder / "day2.csv.gz", "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    (folder / "day2.csv").unlink()
+    write_export(folder / "day3.csv", synthetic_export(rows=40, seed=3).drop(columns="Brand").assign(Coupon="SPRING"))
+    (folder / "notes.txt").write_text("not a partition")
+    return folder
+
+
+def test_partition_paths(parts, tmp_path):
+    names = [path.rsplit("/", 1)[1] for path in partition_paths(str(parts))]
+    assert names == ["day1.csv", "day2.csv.gz", "day3.csv"]
+    assert partition_paths(str(parts / "day[13].csv")) == [str(parts / "day1.csv"), str(parts / "day3.csv")]
+    with pytest.raises(FileNotFoundError):
+        partition_paths(str(tmp_path / "*.csv"))
+
+
+def test_partition_names_keep_subfolders(tmp_path):
+    paths = [str(tmp_path / "eu" / "a.csv"), str(tmp_path / "us" / "a.csv")]
+    assert partition_names(paths) == ["eu/a.csv", "us/a.csv"]
+
+
+def test_schemas_unify(parts, backend):
+    df = backend.to_pandas(backend.load(str(parts)))
+    assert len(df) == 150
+    sizes = df[PARTITION_COLUMN].astype(str).value_counts().to_dict()
+    assert sizes == {"day1.csv": 50, "day2.csv.gz": 60, "day3.csv": 40}
+    day3 = df[PARTITION_COLUMN].astype(str) == "day3.csv"
+    assert df.loc[day3, 'brand'].isna().all() and df.loc[~day3, 'brand'].notna().all()
+    assert (df.loc[day3, 'coupon'] == "spring").all() and df.loc[~day3, 'coupon'].isna().all()
+
+
+def test_processes_match_threads(parts):
+    backend = PandasBackend()
+    threads = backend.load(str(parts), workers=2)
+    processes = backend.load(str(parts), workers=2, processes=True)
+    pd.testing.assert_frame_equal(processes, threads)
+
+
+def test_unify_frames():
+    left = pd.DataFrame({'city': ["austin", "mumbai"], 'quantity': [1, 2], 'tax': [100, 200]})
+    right = pd.DataFrame({'city': pd.Categorical(["toronto"]), 'quantity': [3.0], 'seller_id': ["s1"]})
+    df = unify_frames([left, right], ["a.csv", "b.csv"])
+    assert list(df.columns) == ['city', 'quantity', 'tax', 'seller_id', PARTITION_COLUMN]
+    assert list(df['city'].cat.categories) == ["austin", "mumbai", "toronto"]
+    assert df['quantity'].dtype == "int8" and df['quantity'].tolist() == [1, 2, 3]
+    assert df['tax'].isna().tolist() == [False, False, True]
+    assert df[PARTITION_COLUMN].tolist() == ["a.csv", "a.csv", "b.csv"]
@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# # Lookup Tests
+#
+# Customer and order queries return the same rows as filtering the cleaned
+# frame, and unknown keys give empty results.
+#
+#     cd "py file" && python -m pytest -q
+
+import pandas as pd
+import pytest
+
+from lookup import Lookup
+from money import in_dollars
+
+
+@pytest.fixture(scope="module")
+def index(loaded, tmp_path_factory):
+    return Lookup.open_or_build(loaded, str(tmp_path_factory.mktemp("lookup")))
+
+
+def _same_rows(got, want):
+    key = ['order_id', 'product_id', 'order_date', 'total_amount', 'quantity']
+    got = got.sort_values(key).reset_index(drop=True)
+    want = in_dollars(want.copy()).sort_values(key).reset_index(drop=True)
+    pd.testing.assert_frame_equal(got[want.columns], want, check_dtype=False, check_categorical=False)
+
+
+def test_customer(index, loaded):
+    customer_id = str(loaded['customer_id'].iloc[0])
+    want = loaded[loaded['customer_id'].astype(str) == customer_id]
+    info = index.customer(customer_id)
+    _same_rows(info['transactions'], want)
+    assert info['transactions']['order_date'].is_monotonic_increasing
+    assert info['lifetime']['revenue'] == pytest.approx(want['total_amount'].sum() / 100)
+    assert info['lifetime']['orders'] == want['order_id'].nunique()
+    assert info['first_purchase']['order_date'] == want['order_date'].min()
+
+
+def test_order(index, loaded):
+    order_id = str(loaded['order_id'].iloc[-1])
+    _same_rows(index.order(order_id), loaded[loaded['order_id'].astype(str) == order_id])
+
+
+def test_unknown_keys(index, tmp_path):
+    assert index.customer("nobody") is None
+    assert index.transactions("nobody").empty
+    assert index.order("no-such-order").empty
+    with pytest.raises(FileNotFoundError):
+        Lookup(str(tmp_path))
@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# # Money Tests
+#
+# Dollars round to integer cents in the smallest safe width, values that do
+# not fit int64 are rejected, counts are downcast, and cents format back to
+# exact dollar strings.
+#
+#     cd "py file" && python -m pytest -q
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from money import INT64_LIMIT, compact_numbers, downcast, format_dollars, settle_dtypes, smallest_int, to_cents
+
+
+def test_to_cents_rounds_and_narrows():
+    cents = to_cents(pd.Series([0.1, 0.2, 19.99, 1.255, -3.5], name='unit_price'))
+    assert cents.dtype == np.int16
+    # 1.255 is 1.25499... as a float
+    assert cents.tolist() == [10, 20, 1999, 125, -350]
+
+
+def test_to_cents_keeps_nulls():
+    cents = to_cents(pd.Series([1.0, None, 2.5], name='tax'))
+    assert str(cents.dtype) == "Int16"
+    assert cents.isna().tolist() == [False, True, False]
+    assert settle_dtypes(pd.DataFrame({'tax': cents.dropna()}))['tax'].dtype == np.int16
+
+
+def test_to_cents_largest_values():
+    # the largest float below 2**63, in dollars, still fits
+    largest = np.nextafter(INT64_LIMIT, 0)
+    assert to_cents(pd.Series([largest / 100], name='total_amount')).dtype == np.int64
+
+
+@pytest.mark.parametrize("dollars", [INT64_LIMIT / 100, -INT64_LIMIT / 100, np.inf, -np.inf, 1e300])
+def test_to_cents_rejects_overflow(dollars):
+    with pytest.raises(OverflowError, match="total_amount"):
+        to_cents(pd.Series([1.0, dollars], name='total_amount'))
+
+
+def test_smallest_int():
+    assert smallest_int(-128, 127) is np.int8
+    assert smallest_int(0, 128) is np.int16
+    with pytest.raises(OverflowError):
+        smallest_int(0, 2 ** 63)
+
+
+@pytest.mark.parametrize("cents, decimals, text", [
+    (123456, 2, "$1,234.56"),
+    (-5, 2, "-$0.05"),
+    (150, 0, "$2"),
+    (149, 0, "$1"),
+    (0, 2, "$0.00"),
+])
+def test_format_dollars(cents, decimals, text):
+    assert format_dollars(cents, decimals) == text
+
+
+def test_compact_numbers(loaded):
+    raw = pd.DataFrame({
+        'unit_price': [9.99, 299.95], 'total_amount': [1_000_000.0, 2.5],
+        'quantity': [1, 4], 'year': [2023, 2024], 'month': [1, 12], 'customer_id': ["a", "b"],
+    })
+    compact = compact_numbers(raw)
+    assert compact.dtypes.astype(str).to_dict() == {
+        'unit_price': "int16", 'total_amount': "int32",
+        'quantity': "int8", 'year': "int16", 'month': "int8", 'customer_id': raw['customer_id'].dtype.name,
+    }
+    assert raw['unit_price'].dtype == np.float64  # the input keeps its columns
+    # the cleaned frame holds money in cents
+    assert loaded['total_amount'].dtype.kind == "i"
+
+
+def test_downcast():
+    assert downcast(pd.Series([None, None], dtype="float64")).dtype == "Int8"
+    assert downcast(pd.Series([1.0, None, 300.0])).dtype == "Int16"
+    with pytest.raises(ValueError, match="non-integer"):
+        downcast(pd.Series([1.5], name='quantity'))
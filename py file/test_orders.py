@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# # Order Table Tests
+#
+# Order-grain KPIs match the line items, an order split across batches is
+# merged into one row, and point lookups skip unknown ids.
+#
+#     cd "py file" && python -m pytest -q
+
+import pandas as pd
+import pytest
+
+from money import to_dollars
+from orders import OrderTable
+
+
+@pytest.fixture(scope="module")
+def lines(loaded):
+    """Line items whose orders belong to one customer each."""
+    return loaded.assign(order_id=loaded['customer_id'].astype(str) + "-" + loaded['order_id'].astype(str))
+
+
+def test_kpis_match_line_items(lines):
+    kpis = OrderTable.build(lines).kpis()
+    orders = lines['order_id'].nunique()
+    assert kpis['total_revenue'] == pytest.approx(to_dollars(lines['total_amount'].sum()))
+    assert kpis['aov'] == pytest.approx(to_dollars(lines['total_amount'].sum()) / orders)
+    assert kpis['total_orders'] == orders
+    assert kpis['total_customers'] == lines['customer_id'].nunique()
+    assert kpis['total_quantity'] == lines['quantity'].sum()
+    assert kpis['total_discount'] == pytest.approx(lines['discount'].sum())
+
+
+def test_update_merges_split_orders(lines, tmp_path):
+    first, second = lines.iloc[::2], lines.iloc[1::2]
+    assert set(first['order_id']) & set(second['order_id'])
+
+    OrderTable.build(first).save(str(tmp_path))
+    updated = OrderTable.load(str(tmp_path)).update(second)
+    whole = OrderTable.build(lines)
+    pd.testing.assert_frame_equal(updated.table, whole.table.assign(customer_id=whole.table['customer_id'].astype(str)),
+                                  check_dtype=False)
+    assert updated.kpis() == pytest.approx(whole.kpis())
+
+
+def test_get(lines):
+    orders = OrderTable.build(lines)
+    wanted = sorted(lines['order_id'].unique())[:3]
+    found = orders.get(["zzz-unknown", *reversed(wanted), "000-unknown"])
+    assert found['order_id'].tolist() == list(reversed(wanted))
+    assert orders.get("zzz-unknown").empty
+    assert OrderTable.build(lines.iloc[:0]).get(wanted).empty
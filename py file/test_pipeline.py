@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# # Command Line Tests
+#
+# `pipeline.main` runs only the selected stages on an export and prints the
+# scalar results, as text or as strict JSON; `load_clean` serves warm runs
+# from the cache with the report of the run that filled it.
+#
+#     cd "py file" && python -m pytest -q
+
+import io
+import json
+
+import pandas as pd
+import pytest
+
+import pipeline
+from backends import PandasBackend
+from orders import OrderTable
+
+
+def test_json_kpis(export_path, run_dir, capsys):
+    assert pipeline.main(["--data", export_path, "--only", "kpis", "--json", "--no-cache"]) == 0
+    printed = json.loads(capsys.readouterr().out)
+
+    backend = PandasBackend()
+    want = OrderTable.build(backend.to_pandas(backend.load(export_path))).kpis()
+    assert printed['kpis'] == pytest.approx({key: float(value) for key, value in want.items()})
+
+
+def test_json_undefined_values_are_null(export_path, run_dir, capsys, monkeypatch):
+    monkeypatch.setitem(pipeline.STAGES, 'kpis', lambda ctx: ({'aov': float("nan"), 'orders': 0}, {}))
+    pipeline.main(["--data", export_path, "--only", "kpis", "--json", "--no-cache"])
+    out = capsys.readouterr().out
+    assert "NaN" not in out
+    assert json.loads(out) == {'kpis': {'aov': None, 'orders': 0.0}}
+
+
+def test_text_undefined_values_are_na(export_path, run_dir, capsys, monkeypatch):
+    monkeypatch.setitem(pipeline.STAGES, 'kpis', lambda ctx: ({'aov': float("nan")}, {}))
+    pipeline.main(["--data", export_path, "--only", "kpis", "--no-cache"])
+    assert capsys.readouterr().out.strip() == "kpis.aov: n/a"
+
+
+def test_unknown_stage_is_rejected():
+    with pytest.raises(SystemExit, match="Unknown stage"):
+        pipeline.selected_stages("kpis,nope")
+
+
+def test_save_writes_selected_stages_only(export_path, run_dir):
+    pytest.importorskip("plotly")
+    visuals = run_dir / "visuals"
+    pipeline.main(["--data", export_path, "--only", "kpis,loyalty", "--save", "--no-cache",
+                   "--visuals-dir", str(visuals)])
+    assert sorted(path.name for path in visuals.iterdir()) == ["Calculate_KPIs.html", "Orders_per_customer.html"]
+
+
+def test_warm_cache_returns_same_frame_and_report(dirty_dir, tmp_path, run_dir):
+    backend = PandasBackend()
+    cache_dir = str(tmp_path / "cache")
+    cold, cold_report = pipeline.load_clean(dirty_dir, backend, cache_dir=cache_dir)
+    warm, warm_report = pipeline.load_clean(dirty_dir, backend, cache_dir=cache_dir)
+    pd.testing.assert_frame_equal(warm, cold, check_dtype=False)
+    assert warm_report == json.loads(json.dumps(cold_report))
+
+
+def test_print_report(dirty_dir, run_dir):
+    _, report = pipeline.load_clean(dirty_dir, PandasBackend(), use_cache=False)
+    out = io.StringIO()
+    pipeline.print_report(report, file=out)
+    lines = out.getvalue().splitlines()
+    assert lines[0].startswith("a.csv: ") and lines[1].startswith("b.csv: ")
+    assert "delivered by earlier files" in lines[1]
+    quarantined = report['validation']['quarantined']
+    assert lines[2].startswith(f"quarantined {quarantined:,} of ")
+    assert all(path in lines[2] for path in report['validation']['files'])
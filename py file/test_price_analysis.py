@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# # Price Analysis Tests
+#
+# Price bins match pd.cut, elasticity recovers a known log-log slope, and the
+# input frame is left as it was.
+#
+#     cd "py file" && python -m pytest -q
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from money import to_dollars
+from price_analysis import analyze_prices, price_bin_edges
+
+
+def test_width_bins_match_pd_cut(loaded):
+    sensitivity, _ = analyze_prices(loaded, bins=6)
+    price = to_dollars(loaded['unit_price'])
+    grouped = loaded.groupby(pd.cut(price, 6), observed=False)
+    assert sensitivity['rows'].tolist() == grouped.size().tolist()
+    assert sensitivity['total_quantity'].tolist() == pytest.approx(grouped['quantity'].sum().tolist())
+    assert sensitivity['revenue'].sum() == pytest.approx(to_dollars(loaded['total_amount']).sum())
+    np.testing.assert_allclose(sensitivity['price_high'], [interval.right for interval in grouped.size().index])
+
+
+def test_input_is_not_mutated(loaded):
+    before = loaded.copy()
+    analyze_prices(loaded, strategy="quantile")
+    pd.testing.assert_frame_equal(loaded, before)
+
+
+def test_elasticity_recovers_slope():
+    price = np.tile([1.0, 2.0, 4.0, 8.0], 3)
+    df = pd.DataFrame({
+        'category': np.repeat(["a", "b", "c"], 4),
+        'unit_price': price * 100,
+        'quantity': np.concatenate([64 * price[:4] ** -1.5, 10 * price[4:8] ** 0.5, np.full(4, 3.0)]),
+        'total_amount': np.full(12, 100),
+    })
+    _, elasticity = analyze_prices(df, bins=2)
+    assert elasticity['category'].tolist() == ["a", "b", "c"]
+    assert elasticity['elasticity'].tolist() == pytest.approx([-1.5, 0.5, 0.0])
+    assert elasticity['rows'].tolist() == [4, 4, 4]
+
+
+def test_single_price_has_no_slope():
+    df = pd.DataFrame({'category': ["a", "a"], 'unit_price': [500, 500], 'quantity': [1, 3], 'total_amount': [500, 1500]})
+    sensitivity, elasticity = analyze_prices(df, bins=3)
+    assert sensitivity['rows'].sum() == 2
+    assert np.isnan(elasticity['elasticity'].iloc[0])
+
+
+def test_quantile_bins_balance_rows():
+    prices = np.arange(1, 101, dtype="float64")
+    edges = price_bin_edges(prices, bins=4, strategy="quantile")
+    assert np.histogram(prices, edges)[0].tolist() == [25, 25, 25, 25]
+
+
+@pytest.mark.parametrize("prices, strategy", [([0.0, 5.0], "log"), ([1.0, 5.0], "median")])
+def test_bad_bin_strategy(prices, strategy):
+    with pytest.raises(ValueError):
+        price_bin_edges(prices, strategy=strategy)
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# # Column Projection Tests
+#
+# A run parses only the columns its stages read, the column cache serves
+# later runs and grows by the columns they add, and cached columns come back
+# as they were stored.
+#
+#     cd "py file" && python -m pytest -q
+
+import pandas as pd
+import pytest
+
+import pipeline
+from backends import PandasBackend, _normalize
+from cache import covers, load_frame, read_manifest, save_frame
+
+
+def test_projected_load(export_path, backend):
+    columns = ['order_id', 'brand', 'month', 'total_amount']
+    projected = backend.to_pandas(backend.load(export_path, columns=columns))
+    # the order date is always parsed
+    assert set(projected.columns) == {*columns, 'order_date'}
+    full = backend.to_pandas(backend.load(export_path))
+    pd.testing.assert_frame_equal(_normalize(projected), _normalize(full[list(projected.columns)]), check_dtype=False)
+
+
+def test_stage_columns():
+    kpis = pipeline.stage_columns(['kpis'])
+    assert kpis == pipeline.BASE_COLUMNS and 'brand' not in kpis
+    dimensions = pipeline.stage_columns(['kpis', 'dimensions'])
+    assert dimensions[:len(kpis)] == kpis and 'brand' in dimensions
+    assert len(dimensions) == len(set(dimensions))
+
+
+def test_cache_grows_by_added_columns(dirty_dir, tmp_path, run_dir, monkeypatch):
+    backend = PandasBackend()
+    cache_dir = str(tmp_path / "cache")
+    kpis = pipeline.stage_columns(['kpis'])
+    first, _ = pipeline.load_clean(dirty_dir, backend, cache_dir=cache_dir, columns=kpis)
+    directory = pipeline.frame_dir(dirty_dir, cache_dir)
+    assert covers(read_manifest(directory), kpis)
+    assert not covers(read_manifest(directory), kpis + ['brand'])
+
+    parsed = []
+    load = backend.load
+    monkeypatch.setattr(backend, "load", lambda path, **kwargs: parsed.append(kwargs['columns']) or load(path, **kwargs))
+    # 'coupon' is not in the export: it is remembered as parsed, not read again
+    wider, _ = pipeline.load_clean(dirty_dir, backend, cache_dir=cache_dir, columns=kpis + ['brand', 'coupon'])
+    assert parsed == [['brand', 'coupon']]
+    assert covers(read_manifest(directory), kpis + ['brand', 'coupon'])
+    pipeline.load_clean(dirty_dir, backend, cache_dir=cache_dir, columns=['brand', 'coupon'])
+    assert len(parsed) == 1
+
+    # the added column lines up with the cached rows
+    full, _ = pipeline.load_clean(dirty_dir, backend, use_cache=False)
+    pd.testing.assert_frame_equal(_normalize(wider), _normalize(full[list(wider.columns)]), check_dtype=False)
+    pd.testing.assert_frame_equal(_normalize(wider[kpis]), _normalize(first[kpis]))
+
+
+def test_column_round_trip(tmp_path):
+    df = pd.DataFrame({
+        'order_date': pd.to_datetime(["2023-01-01", "2023-02-01", None]),
+        'total_amount': pd.array([100, None, 300], dtype="Int32"),
+        'quantity': pd.array([1, 2, 3], dtype="int8"),
+        'brand': pd.Categorical(["acme", None, "nova"]),
+        'city': ["austin", "mumbai", "austin"],
+        'discounted': [True, False, True],
+    })
+    save_frame(df, str(tmp_path))
+    back = load_frame(str(tmp_path))
+    assert back['quantity'].dtype == "int8" and back['discounted'].dtype == bool
+    pd.testing.assert_frame_equal(back, df.astype({'order_date': "datetime64[ns]"}), check_dtype=False,
+                                  check_categorical=False)
+    assert load_frame(str(tmp_path), ['city'])['city'].tolist() == df['city'].tolist()
+    assert load_frame(str(tmp_path / "missing")) is None
@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# # Seller Scorecard Tests
+#
+# The one-pass arrays match a groupby of the transactions, an order with
+# several lines counts once, and ranked, percentile and per-seller queries
+# answer from the stored arrays.
+#
+#     cd "py file" && python -m pytest -q
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from sellers import SellerScorecard
+
+
+def test_scorecard_matches_groupby(loaded):
+    card = SellerScorecard.build(loaded).scorecard().set_index('seller_id')
+    groups = loaded.groupby(loaded['seller_id'].astype(str))
+    want = pd.DataFrame({
+        'revenue': groups['total_amount'].sum() / 100,
+        'orders': groups['order_id'].nunique(),
+        'units': groups['quantity'].sum(),
+        'customers': groups['customer_id'].nunique(),
+    })
+    repeat = loaded.groupby([loaded['seller_id'].astype(str), 'customer_id'])['order_id'].nunique() > 1
+    want['repeat_share'] = repeat.groupby(level=0).mean()
+    want['aov'] = want['revenue'] / want['orders']
+
+    assert list(card.index) == sorted(want.index)
+    pd.testing.assert_frame_equal(card[want.columns], want.loc[card.index], check_dtype=False, check_names=False)
+
+
+@pytest.fixture
+def small():
+    return pd.DataFrame({
+        'seller_id': ["s2", "s1", "s1", "s1", "s3", None],
+        'order_id': ["o1", "o2", "o2", "o3", "o4", "o5"],
+        'customer_id': ["c1", "c2", "c2", "c2", "c3", "c1"],
+        'order_date': pd.to_datetime(["2023-01-05", "2023-01-10", "2023-01-10", "2023-03-02", "2023-02-01",
+                                      "2023-02-01"]),
+        'total_amount': [1000, 500, 700, 300, 2500, 9900],
+        'quantity': [1, 1, 2, 1, 5, 1],
+        'unit_price': [10.0, 5.0, 3.5, 3.0, 5.0, 99.0],
+        'discount': [0.0, 0.1, 0.0, 0.0, 0.0, 0.0],
+    })
+
+
+def test_orders_and_repeat_customers(small):
+    card = SellerScorecard.build(small).scorecard().set_index('seller_id')
+    # rows without a seller are left out
+    assert list(card.index) == ["s1", "s2", "s3"]
+    # o2 has two lines; c2 ordered from s1 twice
+    assert card.loc["s1", ['orders', 'units', 'customers', 'repeat_share']].tolist() == [2, 4, 1, 1.0]
+    assert card.loc["s1", 'revenue'] == pytest.approx(15.0)
+    assert card.loc["s1", 'aov'] == pytest.approx(7.5)
+    assert card.loc["s1", 'discount_rate'] == pytest.approx(0.5 / 15.0)
+    assert card.loc["s2", 'repeat_share'] == 0
+
+
+def test_ranked_queries(small):
+    scorecard = SellerScorecard.build(small)
+    assert scorecard.top('revenue', 2)['seller_id'].tolist() == ["s3", "s1"]
+    assert scorecard.top('revenue', 1, ascending=True)['seller_id'].tolist() == ["s2"]
+    assert scorecard.percentile_ranks('revenue').round(1).to_dict() == {"s1": 66.7, "s2": 33.3, "s3": 100.0}
+    assert scorecard.band('revenue', 50)['seller_id'].tolist() == ["s3", "s1"]
+    with pytest.raises(ValueError, match="Unknown metric"):
+        scorecard.top('profit')
+
+
+def test_seller_trend_and_round_trip(small, tmp_path):
+    SellerScorecard.build(small).save(str(tmp_path))
+    scorecard = SellerScorecard.load(str(tmp_path))
+    row, monthly = scorecard.seller("s1")
+    assert row['revenue'] == pytest.approx(15.0)
+    assert monthly.to_dict() == {pd.Timestamp("2023-01-01"): 12.0, pd.Timestamp("2023-03-01"): 3.0}
+    assert scorecard.seller("s9") is None
+    assert SellerScorecard.load(str(tmp_path / "missing")) is None
+
+
+def test_nan_metrics_rank_last():
+    df = pd.DataFrame({
+        'seller_id': ["a", "b"], 'order_id': ["o1", "o2"], 'customer_id': ["c1", "c2"],
+        'order_date': pd.to_datetime(["2023-01-01", "2023-01-02"]),
+        'total_amount': [100, 200], 'quantity': [0, 1], 'unit_price': [0.0, 2.0], 'discount': [0.0, 0.5],
+    })
+    scorecard = SellerScorecard.build(df)
+    # seller a has no gross sales, so no discount rate
+    assert scorecard.top('discount_rate', 5)['seller_id'].tolist() == ["b"]
+    assert np.isnan(scorecard.percentile_ranks('discount_rate')["a"])
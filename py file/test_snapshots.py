@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# # KPI Snapshot Tests
+#
+# Period records merge into KPIs "as of" any date range, rows recorded by an
+# earlier run are not counted again, and the snapshots stage records runs in
+# the snapshot store only when caching is on.
+#
+#     cd "py file" && python -m pytest -q
+
+import os
+
+import pandas as pd
+import pytest
+
+import pipeline
+from snapshots import SUM_COLUMNS, Snapshot, SnapshotStore, kpi_changes, period_snapshots
+from time_rollups import TimeRollup
+
+
+def test_no_cache_leaves_no_snapshots(export_path, run_dir, capsys):
+    pipeline.main(["--data", export_path, "--only", "snapshots", "--no-cache"])
+    assert "snapshots.total_revenue" in capsys.readouterr().out
+    assert not os.path.exists(run_dir / "file" / "snapshots")
+
+
+def test_cached_runs_record_changes(export_path, run_dir, capsys):
+    for _ in range(2):
+        pipeline.main(["--data", export_path, "--only", "snapshots", "--json"])
+    assert os.path.isdir(run_dir / "file" / "snapshots" / "run")
+    printed = capsys.readouterr().out
+    # the second run compares with the first
+    assert '"total_revenue_change"' in printed
+
+
+def _sums(timeline, start, end):
+    inside = (timeline.days >= start) & (timeline.days <= end)
+    return {col: timeline.sums[col][inside].sum() for col in SUM_COLUMNS}
+
+
+def test_as_of_merges_month_and_day_records(loaded, tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    timeline = TimeRollup.build(loaded)
+    store.record(timeline, loaded)
+    # a range starting and ending mid-month reads day records at both edges
+    start = timeline.days[0] + pd.Timedelta(days=10)
+    end = timeline.days[-1] - pd.Timedelta(days=10)
+    assert start.day != 1 and end != end + pd.offsets.MonthEnd(0)
+
+    merged = store.as_of(start, end)
+    assert (merged.start, merged.end) == (start, end)
+    assert merged.sums == pytest.approx(_sums(timeline, start, end))
+    inside = loaded[loaded['order_date'].dt.normalize().between(start, end)]
+    assert merged.kpis()['total_customers'] == pytest.approx(inside['customer_id'].nunique(), rel=0.05)
+    brands = inside.groupby('brand')['total_amount'].sum().sort_values(ascending=False)
+    assert merged.top_list('brand', 3)['brand'].tolist() == list(brands.index[:3])
+
+    assert store.as_of("1990-01-01", "1990-12-31") is None
+
+
+def test_overlapping_records_count_once(loaded, tmp_path):
+    # synthetic order ids span days; give every order a single day as real orders have
+    loaded = loaded.assign(order_id=loaded['order_id'].astype(str) + loaded['order_date'].dt.strftime("-%Y%m%d"))
+    store = SnapshotStore(str(tmp_path))
+    first, rest = loaded.iloc[:150], loaded.iloc[100:]
+    store.record(TimeRollup.build(first), first)
+    store.record(TimeRollup.build(rest), rest)
+    store.record(TimeRollup.build(rest), rest)
+
+    timeline = TimeRollup.build(loaded)
+    merged = store.as_of(timeline.days[0], timeline.days[-1])
+    assert merged.sums == pytest.approx(_sums(timeline, timeline.days[0], timeline.days[-1]))
+    assert merged.sums['order_count'] == loaded['order_id'].nunique()
+
+
+def test_split_order_counts_once(tmp_path):
+    lines = pd.DataFrame({
+        'order_id': ["o1", "o1", "o2"], 'customer_id': ["c1", "c1", "c2"],
+        'order_date': pd.to_datetime(["2023-01-05", "2023-01-05", "2023-01-06"]),
+        'total_amount': [100, 200, 300], 'quantity': [1, 2, 3], 'discount': [0.0, 0.0, 0.1],
+        'product_id': ["p1", "p2", "p1"],
+    })
+    store = SnapshotStore(str(tmp_path))
+    # the second line of o1 arrives with a later run
+    for part in (lines.iloc[[0, 2]], lines.iloc[[1]]):
+        store.record(TimeRollup.build(part), part)
+    snapshot = store.as_of("2023-01-01", "2023-01-31")
+    assert snapshot.kpis()['total_orders'] == 2
+    assert snapshot.kpis()['total_revenue'] == pytest.approx(6.0)
+
+
+def test_snapshot_merge_and_round_trip(loaded, tmp_path):
+    timeline = TimeRollup.build(loaded)
+    months = list(period_snapshots(timeline, loaded, 'month').values())
+    merged = months[0].merge(months[1])
+    assert merged.sums['total_amount'] == months[0].sums['total_amount'] + months[1].sums['total_amount']
+    assert (merged.start, merged.end) == (months[0].start, months[1].end)
+    brand = next(iter(months[0].top['brand']))
+    assert merged.top['brand'][brand] == months[0].top['brand'][brand] + months[1].top['brand'].get(brand, 0)
+
+    store = SnapshotStore(str(tmp_path))
+    store.write('run', "r1", merged)
+    back = store.read('run', "r1")
+    assert back.kpis() == pytest.approx(merged.kpis())
+    assert back.top == merged.top
+    assert kpi_changes(back, merged) == pytest.approx({kpi: 0.0 for kpi in merged.kpis()})
+    with pytest.raises(ValueError, match="precision"):
+        merged.merge(Snapshot(merged.start, merged.end, merged.sums, merged.customers[:16], p=4))
@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# # Time Rollup and Sketch Tests
+#
+# Rollup levels match a direct groupby, merging the rollups of two batches
+# equals rolling up both at once, and HyperLogLog sketches merge losslessly
+# and stay within their error bound.
+#
+#     cd "py file" && python -m pytest -q
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from money import to_dollars
+from sketches import HyperLogLog, estimate
+from time_rollups import LEVELS, TimeRollup
+
+
+@pytest.mark.parametrize("name", sorted(LEVELS))
+def test_levels_match_groupby(loaded, name):
+    table = TimeRollup.build(loaded).level(name)
+    period = loaded['order_date'].dt.to_period(LEVELS[name]).dt.start_time
+    grouped = loaded.groupby(period)
+    pd.testing.assert_index_equal(pd.Index(table['period']), grouped.size().index, check_names=False)
+    assert table['total_amount'].tolist() == pytest.approx(to_dollars(grouped['total_amount'].sum()).tolist())
+    assert table['quantity'].tolist() == grouped['quantity'].sum().tolist()
+    assert table['lines'].tolist() == grouped.size().tolist()
+    # order_count counts each (day, order) pair once
+    days = loaded.assign(day=loaded['order_date'].dt.normalize()).drop_duplicates(['day', 'order_id'])
+    assert table['order_count'].tolist() == days.groupby(period.loc[days.index]).size().tolist()
+    exact = grouped['customer_id'].nunique()
+    np.testing.assert_allclose(table['customers'], exact, rtol=0.05)
+
+
+def test_merge_equals_single_build(loaded):
+    first, second = loaded.iloc[::2], loaded.iloc[1::2]
+    merged = TimeRollup.build(first).merge(TimeRollup.build(second))
+    whole = TimeRollup.build(loaded)
+    pd.testing.assert_index_equal(merged.days, whole.days)
+    for col in ('total_amount', 'quantity', 'lines', 'discount'):
+        np.testing.assert_allclose(merged.sums[col], whole.sums[col])
+    np.testing.assert_array_equal(merged.customers, whole.customers)
+    np.testing.assert_array_equal(merged.orders, whole.orders)
+
+
+def test_empty_and_unknown_levels(loaded):
+    empty = TimeRollup.build(loaded.iloc[:0])
+    assert empty.level('month').empty
+    with pytest.raises(ValueError, match="Unknown level"):
+        empty.level('fortnight')
+    with pytest.raises(ValueError, match="precision"):
+        TimeRollup.build(loaded, p=10).merge(TimeRollup.build(loaded))
+
+
+def test_sketch_error_bound():
+    values = np.arange(50_000)
+    count = HyperLogLog.from_values(values).count()
+    # three standard errors at the default precision
+    assert abs(count - len(values)) < 3 * 0.016 * len(values)
+    assert HyperLogLog.from_values(values[:100]).count() == pytest.approx(100, abs=2)
+    assert HyperLogLog().count() == 0
+
+
+def test_sketch_merge_and_bytes():
+    values = pd.Series([f"cust{i}" for i in range(5_000)])
+    left, right = HyperLogLog.from_values(values[:3_000]), HyperLogLog.from_values(values[2_000:])
+    whole = HyperLogLog.from_values(pd.concat([values, values[:100]]))
+    np.testing.assert_array_equal((left | right).registers, whole.registers)
+    restored = HyperLogLog.from_bytes(whole.to_bytes())
+    assert restored.p == whole.p and restored.count() == whole.count()
+    np.testing.assert_array_equal(estimate(np.stack([left.registers, right.registers])),
+                                  [left.count(), right.count()])
+    with pytest.raises(ValueError):
+        left.merge(HyperLogLog(p=10))
@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# # Validation Tests
+#
+# Every check flags exactly the rows that break it, failing rows land in one
+# quarantine file per source and run with readable reasons, and the valid
+# rows come back with plain integer dtypes.
+#
+#     cd "py file" && python -m pytest -q
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backends import PandasBackend
+from conftest import dirty_export, synthetic_export, write_export
+from validation import REASONS, quarantine_columns, validate
+
+# Reasons of the rows dirty_export() breaks, in row order
+DIRTY_ROWS = [
+    {'null_customer_id'},
+    {'null_amount'},
+    {'quantity_range', 'amount_mismatch'},
+    {'unit_price_range', 'amount_mismatch'},
+    {'discount_range', 'amount_mismatch'},
+    {'tax_range', 'amount_mismatch'},
+    {'shipping_range', 'amount_mismatch'},
+    {'date_range'},
+    {'total_range', 'amount_mismatch'},
+    {'amount_mismatch'},
+]
+
+
+@pytest.fixture(scope="module")
+def dirty(tmp_path_factory):
+    path = write_export(tmp_path_factory.mktemp("dirty") / "a.csv", dirty_export(synthetic_export(), repeats=0))
+    return PandasBackend().load(path)
+
+
+def test_reasons_per_row(dirty, tmp_path):
+    valid, checked = validate(dirty, "a.csv", run="r1", quarantine_dir=str(tmp_path))
+    assert checked['rows'] == len(dirty)
+    assert checked['quarantined'] == len(DIRTY_ROWS)
+    assert len(valid) == len(dirty) - len(DIRTY_ROWS)
+
+    expected = {reason: sum(reason in row for row in DIRTY_ROWS) for reason in REASONS}
+    assert checked['reasons'] == {reason: count for reason, count in expected.items() if count}
+
+    assert checked['files'] == [str(tmp_path / "r1" / "a.csv")]
+    written = pd.read_csv(checked['files'][0])
+    assert [set(reasons.split("|")) for reasons in written['reasons']] == DIRTY_ROWS
+    assert list(written.columns) == quarantine_columns(dirty.columns)
+    # money is written back in dollars
+    assert written.loc[3, 'unit_price'] == -1.0
+
+
+def test_rerun_rewrites_quarantine(dirty, tmp_path):
+    for _ in range(2):
+        _, checked = validate(dirty, "a.csv", run="r1", quarantine_dir=str(tmp_path))
+    assert len(pd.read_csv(checked['files'][0])) == len(DIRTY_ROWS)
+
+
+def test_partitions_get_own_files(dirty, tmp_path):
+    df = dirty.assign(source_partition=np.where(np.arange(len(dirty)) < 5, "p1.csv.gz", "p2.csv"))
+    _, checked = validate(df, run="r1", quarantine_dir=str(tmp_path))
+    assert sorted(checked['files']) == [str(tmp_path / "r1" / "p1.csv"), str(tmp_path / "r1" / "p2.csv")]
+    assert 'source_partition' not in pd.read_csv(checked['files'][0]).columns
+
+
+def test_chunks_and_dtypes(dirty):
+    valid, checked = validate(dirty, quarantine_dir=None)
+    chunked, chunked_checked = validate(dirty, quarantine_dir=None, chunk_size=7)
+    pd.testing.assert_frame_equal(chunked, valid)
+    assert chunked_checked == checked == {**checked, 'files': []}
+    assert valid['total_amount'].dtype.kind == "i"
+
+
+@pytest.mark.parametrize("off_by, flagged", [(0.04, False), (0.06, True)])
+def test_amount_tolerance(off_by, flagged, tmp_path):
+    raw = synthetic_export(rows=4)
+    raw.loc[0, 'TotalAmount'] = round(raw.loc[0, 'TotalAmount'] + off_by, 2)
+    df = PandasBackend().load(write_export(tmp_path / "a.csv", raw))
+    _, checked = validate(df, quarantine_dir=None)
+    assert checked['reasons'] == ({'amount_mismatch': 1} if flagged else {})
+
+
+def test_schema_check(dirty):
+    with pytest.raises(ValueError, match="missing column 'tax'"):
+        validate(dirty.drop(columns='tax'), quarantine_dir=None)
+    with pytest.raises(ValueError, match="'quantity' is"):
+        validate(dirty.assign(quantity=dirty['quantity'].astype(str)), quarantine_dir=None)
@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# # Watch Mode Tests
+#
+# A file that grew is read from its recorded offset, a rewritten or shrunk
+# file is read whole, re-delivered rows are dropped, and the running
+# aggregates match a rebuild from every row.
+#
+#     cd "py file" && python -m pytest -q
+
+import pandas as pd
+import pytest
+
+from backends import PandasBackend
+from conftest import synthetic_export, write_export
+from dedup import FingerprintIndex
+from watch import WatchState, ingest_file, read_new_rows
+
+
+@pytest.fixture
+def landed(tmp_path):
+    """A raw folder with a.csv holding the first 100 rows of an export, and the full export."""
+    raw = synthetic_export()
+    folder = tmp_path / "raw"
+    folder.mkdir()
+    path = write_export(folder / "a.csv", raw.head(100))
+    return folder, path, raw
+
+
+def _append(path, rows):
+    rows.to_csv(path, mode="a", header=False, index=False, date_format="%Y-%m-%d")
+
+
+def test_grown_file_reads_tail_only(landed):
+    _, path, raw = landed
+    backend = PandasBackend()
+    first, position = read_new_rows(path, backend, None)
+    assert len(first) == 100
+
+    _append(path, raw.iloc[100:130])
+    tail, position = read_new_rows(path, backend, position)
+    assert len(tail) == 30
+    assert tail['order_id'].tolist() == backend.read(path)['order_id'].iloc[100:].tolist()
+
+    nothing, _ = read_new_rows(path, backend, position)
+    assert nothing.empty
+
+
+@pytest.mark.parametrize("rows", [slice(0, 50), slice(100, 200)])
+def test_rewritten_file_reads_whole(landed, rows):
+    _, path, raw = landed
+    backend = PandasBackend()
+    _, position = read_new_rows(path, backend, None)
+    # shrunk, or rewritten with other rows of at least the same size
+    write_export(path, raw.iloc[rows])
+    again, _ = read_new_rows(path, backend, position)
+    assert len(again) == len(raw.iloc[rows])
+
+
+def test_ingest_drops_redelivered_rows(landed, run_dir):
+    folder, path, raw = landed
+    backend, index, positions = PandasBackend(), FingerprintIndex(None), {}
+    rows, report = ingest_file(path, str(folder), backend, index, positions)
+    assert report == {'file': "a.csv", 'new_rows': len(rows), 'duplicates': 0, 'quarantined': 0}
+
+    # the appended part repeats 10 rows already read
+    _append(path, pd.concat([raw.iloc[90:100], raw.iloc[100:120]]))
+    rows, report = ingest_file(path, str(folder), backend, index, positions)
+    assert (report['duplicates'], report['new_rows'], len(rows)) == (10, 20, 20)
+
+    # the same rows in another file are all duplicates
+    other = write_export(folder / "b.csv", raw.iloc[100:120])
+    rows, report = ingest_file(other, str(folder), backend, index, positions)
+    assert rows.empty and report['duplicates'] == 20
+
+
+def test_running_state_matches_rebuild(loaded):
+    state = WatchState(loaded.iloc[:150])
+    state.add(loaded.iloc[150:])
+    whole = WatchState(loaded)
+
+    assert state.orders.kpis() == pytest.approx(whole.orders.kpis())
+    pd.testing.assert_frame_equal(state.timeline.level('month'), whole.timeline.level('month'))
+    pd.testing.assert_frame_equal(state.customers.table, whole.customers.table.astype({'customer_id': str}),
+                                  check_dtype=False)
+    backend = PandasBackend()
+    for dim in ('category', 'brand'):
+        got = state.totals.top_by_dimension(None, dim)
+        want = backend.top_by_dimension(loaded, dim)
+        assert dict(zip(got[dim].astype(str), got['total_amount'])) == \
+            pytest.approx(dict(zip(want[dim].astype(str), want['total_amount'])))
@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# # Rolling Window Tests
+#
+# Window sums and the O(1) windowed maximum match brute force, days without
+# sales count as zero, and period-over-period deltas compare aligned windows
+# and leave partial ones out.
+#
+#     cd "py file" && python -m pytest -q
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from time_rollups import TimeRollup
+from windows import DELTA_WINDOW, RollingWindows, window_max, window_sums
+
+
+@pytest.mark.parametrize("window", [1, 3, 7, 10, 12])
+def test_window_sums_and_max(window):
+    rng = np.random.default_rng(window)
+    values = rng.integers(0, 50, 10)
+    registers = rng.integers(0, 30, (10, 4)).astype(np.uint8)
+
+    want = pd.Series(values).rolling(window, min_periods=1).sum().to_numpy()
+    np.testing.assert_array_equal(window_sums(values, window), want)
+    brute = np.stack([registers[max(0, i - window + 1):i + 1].max(axis=0) for i in range(len(registers))])
+    np.testing.assert_array_equal(window_max(registers, window), brute)
+
+
+def _daily(days, cents, start="2022-01-01", every=1):
+    """One order of `cents` on every `every`-th day."""
+    dates = pd.date_range(start, periods=days, freq=f"{every}D")
+    return pd.DataFrame({
+        'order_id': [f"o{i}" for i in range(len(dates))],
+        'order_date': dates,
+        'customer_id': [f"c{i % 5}" for i in range(len(dates))],
+        'total_amount': np.asarray(cents, dtype="int64") if np.ndim(cents) else np.full(len(dates), cents),
+        'quantity': 1,
+        'discount': 0.0,
+    })
+
+
+def test_gaps_count_as_zero(loaded):
+    table = RollingWindows.build(TimeRollup.build(_daily(10, 100, every=3))).table
+    assert len(table) == 28  # every calendar day from the first to the last sale
+    assert table['orders_7d'].tolist()[:7] == [1, 1, 1, 2, 2, 2, 3]
+    assert table['total_amount_7d'].iloc[6] == pytest.approx(3.0)
+    assert table['aov_7d'].iloc[6] == pytest.approx(1.0)
+
+    windows = RollingWindows.build(TimeRollup.build(loaded))
+    daily = loaded.groupby(loaded['order_date'].dt.normalize())['total_amount'].sum() / 100
+    daily = daily.reindex(windows.table['day'], fill_value=0)
+    np.testing.assert_allclose(windows.metric('total_amount', 28), daily.rolling(28, min_periods=1).sum())
+
+
+def test_empty_window_has_no_aov():
+    df = pd.concat([_daily(1, 100), _daily(1, 100, start="2022-01-20")], ignore_index=True)
+    table = RollingWindows.build(TimeRollup.build(df)).table
+    assert np.isnan(table['aov_7d'].iloc[12])
+
+
+def test_deltas():
+    days = 364 + 2 * DELTA_WINDOW
+    # revenue doubles after the first year
+    cents = np.where(np.arange(days) < 364 + DELTA_WINDOW, 100, 200)
+    windows = RollingWindows.build(TimeRollup.build(_daily(days, cents)))
+
+    deltas = windows.deltas()
+    assert deltas['total_revenue']['value'] == pytest.approx(56.0)
+    assert deltas['total_revenue']['mom'] == pytest.approx(1.0)
+    assert deltas['total_revenue']['yoy'] == pytest.approx(1.0)
+    assert deltas['total_orders']['mom'] == pytest.approx(0.0)
+    assert deltas['aov']['mom'] == pytest.approx(1.0)
+
+    # 40 days in: the window four weeks earlier is partial
+    early = windows.deltas(as_of="2022-02-09")
+    assert early['total_revenue']['value'] == pytest.approx(28.0)
+    assert np.isnan(early['total_revenue']['mom']) and np.isnan(early['total_revenue']['yoy'])
+    assert np.isnan(windows.deltas(as_of="2021-01-01")['total_revenue']['value'])
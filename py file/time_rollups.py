@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# # Time Rollups
+#
+# A daily base (revenue, quantity, line items, discount, order count plus
+# distinct-customer and distinct-order sketches) is computed once from the
+# transactions. Week, month,
+# quarter and year levels are derived by merging consecutive days of that
+# base, so no level rescans the raw rows. Rollups of two batches of data can
+# be merged the same way.
+
+import numpy as np
+import pandas as pd
+
+from money import to_dollars
+from sketches import DEFAULT_PRECISION, estimate, grouped_registers, hash_values
+
+
+# Rollup level -> pandas period frequency
+LEVELS = {
+    'day': 'D',
+    'week': 'W',
+    'month': 'M',
+    'quarter': 'Q',
+    'year': 'Y',
+}
+
+# Additive daily columns. `order_count` is exact (an order has one order date);
+# `orders` in the level tables is the sketch estimate, which stays correct when
+# one order's lines arrive in different batches.
+SUM_COLUMNS = ('total_amount', 'quantity', 'lines', 'discount', 'order_count')
+
+
+class TimeRollup:
+    """Daily base with mergeable distinct counts, rolled up on demand."""
+
+    def __init__(self, days, sums, customers, orders, p=DEFAULT_PRECISION):
+        self.days = pd.DatetimeIndex(days)  # sorted, unique
+        self.sums = sums                    # {column: array per day}
+        self.customers = customers          # (n_days, 2**p) registers
+        self.orders = orders                # (n_days, 2**p) registers
+        self.p = p
+
+    @classmethod
+    def build(cls, df, p=DEFAULT_PRECISION):
+        """One pass over the transactions -> daily base."""
+        day_codes, days = pd.factorize(df['order_date'].dt.normalize(), sort=True)
+        n_days = len(days)
+
+        sums = {
+            'total_amount': np.bincount(day_codes, weights=df['total_amount'].to_numpy(dtype='float64'), minlength=n_days),
+            'quantity': np.bincount(day_codes, weights=df['quantity'].to_numpy(dtype='float64'), minlength=n_days),
+            'lines': np.bincount(day_codes, minlength=n_days).astype('float64'),
+            'discount': np.bincount(day_codes, weights=df['discount'].to_numpy(dtype='float64'), minlength=n_days),
+        }
+        order_hashes = hash_values(df['order_id'])
+        # First line of every (day, order) pair; the day code is mixed into the hash
+        _, first = np.unique(order_hashes ^ (day_codes.astype(np.uint64) * np.uint64(0x9E3779B97F4A7C15)),
+                             return_index=True)
+        sums['order_count'] = np.bincount(day_codes[first], minlength=n_days).astype('float64')
+        customers = grouped_registers(day_codes, n_days, hash_values(df['customer_id']), p)
+        orders = grouped_registers(day_codes, n_days, order_hashes, p)
+        return cls(days, sums, customers, orders, p)
+
+    def _reduce(self, keys):
+        """Collapse consecutive days sharing a key (keys must be sorted)."""
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+        sums = {col: np.add.reduceat(values, starts) for col, values in self.sums.items()}
+        customers = np.maximum.reduceat(self.customers, starts, axis=0)
+        orders = np.maximum.reduceat(self.orders, starts, axis=0)
+        return starts, sums, customers, orders
+
+    def periods(self, name="month"):
+        """(period starts, sums, customer registers, order registers) of one level.
+
+        The raw mergeable state behind `level`: sums stay in cents and the
+        sketches are not estimated yet.
+        """
+        if name not in LEVELS:
+            raise ValueError(f"Unknown level {name!r}; choose one of {', '.join(LEVELS)}")
+        if not len(self.days):
+            return self.days, {col: values[:0] for col, values in self.sums.items()}, self.customers, self.orders
+
+        periods = self.days.to_period(LEVELS[name])
+        starts, sums, customers, orders = self._reduce(periods.asi8)
+        return periods[starts].start_time, sums, customers, orders
+
+    def level(self, name="month"):
+        """Totals and distinct counts per period of the given level."""
+        starts, sums, customers, orders = self.periods(name)
+        if not len(starts):
+            return pd.DataFrame(columns=['period', *SUM_COLUMNS, 'customers', 'orders'])
+
+        table = pd.DataFrame({'period': starts})
+        for col in SUM_COLUMNS:
+            table[col] = sums[col]
+        table['total_amount'] = to_dollars(table['total_amount'])  # summed in cents
+        table['quantity'] = table['quantity'].astype('int64')
+        table['lines'] = table['lines'].astype('int64')
+        table['order_count'] = table['order_count'].astype('int64')
+        table['customers'] = estimate(customers)
+        table['orders'] = estimate(orders)
+        return table
+
+    def merge(self, other):
+        """Combine two rollups (e.g. yesterday's base and a newly landed file)."""
+        if other.p != self.p:
+            raise ValueError("Cannot merge rollups with different sketch precision")
+
+        days = self.days.append(other.days)
+        order = np.argsort(days.asi8, kind='stable')
+        combined = TimeRollup(
+            days[order],
+            {col: np.concatenate([self.sums[col], other.sums[col]])[order] for col in self.sums},
+            np.concatenate([self.customers, other.customers])[order],
+            np.concatenate([self.orders, other.orders])[order],
+            self.p,
+        )
+        starts, sums, customers, orders = combined._reduce(combined.days.asi8)
+        return TimeRollup(combined.days[starts], sums, customers, orders, self.p)
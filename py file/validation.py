@@ -0,0 +1,230 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# # Data-Quality Validation
+#
+# Every check is a whole-column NumPy expression evaluated chunk by chunk
+# (the polars backend evaluates the same checks as Polars expressions, see
+# `polars_reason_mask`). Each failing check sets one bit in a per-row reason
+# mask; rows with any bit set never reach the KPIs. They are written with
+# readable reason codes to one quarantine file per source and run,
+# `../file/quarantine/<run>/<source>.csv`, always with the same column order.
+#
+# Amount identity (discount is a rate between 0 and 1; money columns arrive
+# as integer cents from the cleaning stage and are checked in dollars):
+#
+#     total_amount = quantity * unit_price * (1 - discount) + tax + shipping_cost
+
+import os
+import re
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from dedup import LINEAGE_COLUMNS
+from money import CENTS, MONEY_COLUMNS, in_dollars, settle_dtypes
+
+
+QUARANTINE_DIR = "../file/quarantine"
+
+MIN_DATE = "2000-01-01"  # earliest accepted order date
+TOLERANCE = 0.05         # dollars the amount identity may be off by
+
+REQUIRED_COLUMNS = {
+    'order_id': 'text',
+    'order_date': 'datetime',
+    'customer_id': 'text',
+    'quantity': 'numeric',
+    'unit_price': 'numeric',
+    'discount': 'numeric',
+    'tax': 'numeric',
+    'shipping_cost': 'numeric',
+    'total_amount': 'numeric',
+}
+
+# Reason code -> bit in the per-row mask
+REASONS = [
+    'null_order_id', 'null_customer_id', 'null_order_date',
+    'null_amount', 'quantity_range', 'unit_price_range', 'discount_range',
+    'tax_range', 'shipping_range', 'total_range', 'date_range',
+    'amount_mismatch',
+]
+REASON_BITS = {reason: np.uint32(1 << bit) for bit, reason in enumerate(REASONS)}
+
+AMOUNT_COLUMNS = ['quantity', 'unit_price', 'discount', 'tax', 'shipping_cost', 'total_amount']
+
+
+def check_schema(df):
+    """Raise ValueError when a required column is missing or has the wrong type."""
+    problems = []
+    for col, kind in REQUIRED_COLUMNS.items():
+        if col not in df.columns:
+            problems.append(f"missing column {col!r}")
+        elif kind == 'numeric' and not pd.api.types.is_numeric_dtype(df[col]):
+            problems.append(f"{col!r} is {df[col].dtype}, expected numeric")
+        elif kind == 'datetime' and not pd.api.types.is_datetime64_any_dtype(df[col]):
+            problems.append(f"{col!r} is {df[col].dtype}, expected datetime")
+    if problems:
+        raise ValueError("Schema check failed: " + "; ".join(problems))
+
+
+def reason_mask(chunk, min_date, max_date, tolerance):
+    """Bit mask of failed checks for every row of the chunk."""
+    mask = np.zeros(len(chunk), dtype=np.uint32)
+
+    def flag(failed, reason):
+        np.bitwise_or(mask, REASON_BITS[reason], out=mask, where=failed)
+
+    # --- Nulls ---
+    flag(chunk['order_id'].isna().to_numpy(), 'null_order_id')
+    flag(chunk['customer_id'].isna().to_numpy(), 'null_customer_id')
+    dates = chunk['order_date'].to_numpy(dtype='datetime64[ns]')
+    flag(np.isnat(dates), 'null_order_date')
+
+    amounts = {col: chunk[col].to_numpy(dtype='float64', na_value=np.nan) for col in AMOUNT_COLUMNS}
+    for col in MONEY_COLUMNS:
+        amounts[col] = amounts[col] / CENTS
+    flag(np.isnan(np.column_stack(list(amounts.values()))).any(axis=1), 'null_amount')
+
+    # --- Value ranges (NaN compares False, so nulls are only flagged once) ---
+    flag(amounts['quantity'] < 1, 'quantity_range')
+    flag(amounts['unit_price'] < 0, 'unit_price_range')
+    flag((amounts['discount'] < 0) | (amounts['discount'] > 1), 'discount_range')
+    flag(amounts['tax'] < 0, 'tax_range')
+    flag(amounts['shipping_cost'] < 0, 'shipping_range')
+    flag(amounts['total_amount'] < 0, 'total_range')
+
+    # --- Date bounds ---
+    flag((dates < min_date) | (dates > max_date), 'date_range')
+
+    # --- Arithmetic identity ---
+    expected = (
+        amounts['quantity'] * amounts['unit_price'] * (1 - amounts['discount'])
+        + amounts['tax'] + amounts['shipping_cost']
+    )
+    flag(np.abs(expected - amounts['total_amount']) > tolerance, 'amount_mismatch')
+    return mask
+
+
+def polars_reason_mask(pl, min_date, max_date, tolerance):
+    """The checks of `reason_mask` as one Polars expression (UInt32 bit mask).
+
+    NaN and nulls fail no comparison, as in the NumPy version.
+    """
+    amounts = {
+        col: pl.col(col).cast(pl.Float64).fill_nan(None) / (CENTS if col in MONEY_COLUMNS else 1)
+        for col in AMOUNT_COLUMNS
+    }
+    date = pl.col('order_date')
+    expected = (
+        amounts['quantity'] * amounts['unit_price'] * (1 - amounts['discount'])
+        + amounts['tax'] + amounts['shipping_cost']
+    )
+    checks = {
+        'null_order_id': pl.col('order_id').is_null(),
+        'null_customer_id': pl.col('customer_id').is_null(),
+        'null_order_date': date.is_null(),
+        'null_amount': pl.any_horizontal([value.is_null() for value in amounts.values()]),
+        'quantity_range': amounts['quantity'] < 1,
+        'unit_price_range': amounts['unit_price'] < 0,
+        'discount_range': (amounts['discount'] < 0) | (amounts['discount'] > 1),
+        'tax_range': amounts['tax'] < 0,
+        'shipping_range': amounts['shipping_cost'] < 0,
+        'total_range': amounts['total_amount'] < 0,
+        'date_range': (date < pl.lit(pd.Timestamp(min_date))) | (date > pl.lit(pd.Timestamp(max_date))),
+        'amount_mismatch': (expected - amounts['total_amount']).abs() > tolerance,
+    }
+    return pl.sum_horizontal([
+        pl.when(failed.fill_null(False)).then(pl.lit(int(REASON_BITS[reason]), pl.UInt32)).otherwise(pl.lit(0, pl.UInt32))
+        for reason, failed in checks.items()
+    ]).cast(pl.UInt32)
+
+
+def date_bounds(min_date=MIN_DATE, max_date=None):
+    """Allowed order dates as datetime64[ns]; the default upper bound is tomorrow."""
+    return (
+        np.datetime64(pd.Timestamp(min_date), 'ns'),
+        np.datetime64(pd.Timestamp(max_date) if max_date else pd.Timestamp.now().normalize() + pd.Timedelta(days=1), 'ns'),
+    )
+
+
+def describe_reasons(mask):
+    """Turn reason masks into 'code|code' strings (only called for failing rows)."""
+    return np.array([
+        "|".join(reason for reason, bit in REASON_BITS.items() if value & bit)
+        for value in mask
+    ], dtype=object)
+
+
+def quarantine_columns(columns):
+    """Fixed column order of a quarantine file: required columns, the rest sorted, then reasons.
+
+    Lineage columns added by the pipeline are left out.
+    """
+    present = [col for col in columns if col not in (*LINEAGE_COLUMNS, 'reasons')]
+    return [
+        *(col for col in REQUIRED_COLUMNS if col in present),
+        *sorted(col for col in present if col not in REQUIRED_COLUMNS),
+        'reasons',
+    ]
+
+
+def quarantine(bad, masks, source="data", run=None, quarantine_dir=QUARANTINE_DIR):
+    """Write the failing rows with their reason codes; returns the files written.
+
+    Rows of a partitioned frame go to one file per partition. A file is
+    rewritten, never appended to, so re-running a source does not repeat rows.
+    """
+    if not len(bad) or not quarantine_dir:
+        return []
+    run = run or datetime.now().strftime("%Y%m%dT%H%M%S")
+    bad = in_dollars(bad.assign(reasons=describe_reasons(masks)))
+    partition = LINEAGE_COLUMNS[0]
+    groups = bad.groupby(partition, observed=True, sort=False) if partition in bad.columns else [(source, bad)]
+
+    written = []
+    for name, rows in groups:
+        path = os.path.join(quarantine_dir, run, re.sub(r"\.csv(\.\w+)?$", "", str(name)) + ".csv")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        rows[quarantine_columns(bad.columns)].to_csv(path, index=False)
+        written.append(path)
+    return written
+
+
+def report(rows, failed_masks):
+    """Rows checked, rows quarantined and failures per reason."""
+    return {
+        'rows': int(rows),
+        'quarantined': int(len(failed_masks)),
+        'reasons': {
+            reason: int(np.count_nonzero(failed_masks & bit))
+            for reason, bit in REASON_BITS.items()
+            if np.any(failed_masks & bit)
+        },
+    }
+
+
+def validate(df, source="data", run=None, quarantine_dir=QUARANTINE_DIR, min_date=MIN_DATE, max_date=None,
+             tolerance=TOLERANCE, chunk_size=1_000_000):
+    """Check the cleaned frame; return `(valid rows, report)`.
+
+    Failing rows are written to the quarantine file of `source` (of each
+    partition, for a partitioned frame) for this `run` with a `reasons`
+    column. The report counts rows checked, rows quarantined and failures
+    per reason, and lists the quarantine files written.
+    """
+    check_schema(df)
+    min_date, max_date = date_bounds(min_date, max_date)
+
+    masks = np.empty(len(df), dtype=np.uint32)
+    for start in range(0, len(df), chunk_size):
+        chunk = df.iloc[start:start + chunk_size]
+        masks[start:start + len(chunk)] = reason_mask(chunk, min_date, max_date, tolerance)
+
+    failed = masks != 0
+    checked = report(len(df), masks[failed])
+    checked['files'] = quarantine(df[failed], masks[failed], source, run, quarantine_dir)
+
+    # Money columns that had nulls were nullable integers; the nulls are gone now
+    return settle_dtypes(df[~failed].reset_index(drop=True)), checked
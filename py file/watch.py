@@ -0,0 +1,298 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# # Watch Mode
+#
+# Long-running refresh of the dashboard. The raw-data directory is polled;
+# when a partition file is added or changes (and has stopped growing), only
+# its rows are ingested:
+#
+# 1. the new bytes are parsed: for a file that grew, only the tail appended
+#    since the recorded offset (a file that shrank, was rewritten or is
+#    compressed is read whole)
+# 2. the rows are cleaned, and rows already ingested are dropped (dedup.py)
+# 3. the rows are validated (validation.py)
+# 4. the running aggregates absorb them: time rollup (merge), order table,
+#    customer feature table (update) and revenue / quantity totals per
+#    dimension
+# 5. the watched stages are re-run against those aggregates; the figure
+#    cache rewrites only figures whose input tables moved, and the combined
+#    dashboard is rebuilt when any figure changed
+#
+#     python watch.py --raw-dir ../file/raw_data --visuals-dir ../visuals
+#
+# Price bins, the geo map and the discount charts need a scan of every row
+# and are refreshed by a normal pipeline.py run.
+
+import argparse
+import hashlib
+import importlib.util
+import io
+import os
+import time
+
+import pandas as pd
+
+from backends import QUANTITY_DIMENSIONS, REVENUE_DIMENSIONS, get_backend
+from compressed import compression_of
+from customer_features import CustomerFeatures
+from dedup import FingerprintIndex, drop_duplicates
+from figure_cache import FigureCache
+from ingest import PARTITION_COLUMN, partition_paths
+from money import in_dollars, to_dollars
+from orders import OrderTable
+from pipeline import CACHE_DIR, STAGES, VISUALS_DIR, Context, load_clean, render, stage_columns
+from time_rollups import TimeRollup
+from validation import validate
+
+
+RAW_DIR = "../file/raw_data"
+POLL_SECONDS = 2.0
+
+# Bytes hashed at the start and at the end of the part of a file already read
+CHECK_BYTES = 64 * 1024
+
+# Stages whose inputs are all kept up to date incrementally
+WATCH_STAGES = [
+    'kpis', 'trends', 'rolling', 'dimensions', 'costs', 'products',
+    'concentration', 'loyalty', 'customers', 'segments',
+]
+
+# Only these columns are parsed from landed files
+WATCH_COLUMNS = stage_columns(WATCH_STAGES)
+
+# (group column, summed column) pairs kept as running totals
+TOTALS = (
+    [('month', 'total_amount')]
+    + [(dim, 'total_amount') for dim in REVENUE_DIMENSIONS]
+    + [(dim, 'quantity') for dim in QUANTITY_DIMENSIONS]
+)
+COST_COLUMNS = ('total_amount', 'tax', 'shipping_cost', 'discount')
+
+
+class RunningTotals:
+    """Grouped sums updated batch by batch, served through the backend API.
+
+    Stages call `ctx.backend.top_by_dimension(ctx.data, ...)` and friends; in
+    watch mode the backend is this object, so those calls read the running
+    totals instead of scanning the data.
+    """
+
+    name = "running"
+
+    def __init__(self):
+        self.sums = {pair: pd.Series(dtype='int64') for pair in TOTALS}
+        self.costs = {col: 0 for col in COST_COLUMNS}
+
+    def update(self, rows):
+        for (dim, value), current in self.sums.items():
+            grouped = rows.groupby(dim, observed=True)[value].sum().astype('int64')
+            if grouped.index.dtype.kind not in "iu":
+                # Batches have different categorical dictionaries: align on plain text
+                grouped.index = grouped.index.astype(str)
+            self.sums[(dim, value)] = current.add(grouped, fill_value=0).astype('int64')
+        for col in COST_COLUMNS:
+            self.costs[col] += rows[col].sum()
+        return self
+
+    def from_pandas(self, df):
+        return None
+
+    def cost_totals(self, data=None):
+        return {
+            'Revenue': to_dollars(self.costs['total_amount']),
+            'Tax': to_dollars(self.costs['tax']),
+            'Shipping Cost': to_dollars(self.costs['shipping_cost']),
+            'Discount': self.costs['discount'],
+        }
+
+    def monthly_revenue(self, data=None):
+        sums = self.sums[('month', 'total_amount')].sort_index()
+        return in_dollars(sums.rename_axis('month').reset_index(name='total_amount'))
+
+    def dimension_totals(self, data, dim, value='total_amount'):
+        return in_dollars(self.sums[(dim, value)].rename_axis(dim).reset_index(name=value))
+
+    def top_by_dimension(self, data, dim, value='total_amount', n=15):
+        grouped = self.sums[(dim, value)].rename_axis(dim).reset_index(name=value)
+        return in_dollars(
+            grouped.sort_values([value, dim], ascending=[False, True])
+            .head(n)
+            .reset_index(drop=True)
+        )
+
+
+class WatchState:
+    """Everything the watched stages read, kept up to date batch by batch."""
+
+    def __init__(self, df):
+        self.timeline = TimeRollup.build(df)
+        self.orders = OrderTable.build(df)
+        self.customers = CustomerFeatures.build(df)
+        self.totals = RunningTotals().update(df)
+
+    def add(self, rows):
+        self.timeline = self.timeline.merge(TimeRollup.build(rows))
+        self.orders.update(rows)
+        self.customers.update(rows)
+        self.totals.update(rows)
+
+    def context(self):
+        return Context(None, self.totals, timeline=self.timeline,
+                       orders=self.orders, customers=self.customers)
+
+
+def snapshot(raw_dir):
+    """{path: (size, mtime)} of every partition file in the directory."""
+    try:
+        paths = partition_paths(raw_dir)
+    except FileNotFoundError:
+        return {}
+    result = {}
+    for path in paths:
+        stat = os.stat(path)
+        result[path] = (stat.st_size, stat.st_mtime_ns)
+    return result
+
+
+def load_dashboard_builder(visuals_dir):
+    """`build_dashboard` from visuals/dashboard.py (it is not on the import path)."""
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "visuals", "dashboard.py")
+    spec = importlib.util.spec_from_file_location("dashboard", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return lambda: module.build_dashboard(visuals_dir)
+
+
+def prefix_digest(path, offset):
+    """Hash of the first and last CHECK_BYTES of the first `offset` bytes of a file."""
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        h.update(f.read(min(offset, CHECK_BYTES)))
+        f.seek(max(offset - CHECK_BYTES, 0))
+        h.update(f.read(offset - f.tell()))
+    return h.hexdigest()
+
+
+def read_position(path):
+    """`(offset, digest)` marking a file as read up to its current end."""
+    size = os.path.getsize(path)
+    return size, prefix_digest(path, size)
+
+
+def read_new_rows(path, backend, position):
+    """Cleaned rows of `path` not read yet, and the new read position.
+
+    When the file only grew since `position`, just the header and the
+    appended bytes are parsed. A file that shrank or whose read part changed
+    (and a compressed file, which cannot be read from an offset) is read whole.
+    """
+    offset, digest = position if position is not None else (0, None)
+    if (
+        offset
+        and compression_of(path) is None
+        and os.path.getsize(path) >= offset
+        and prefix_digest(path, offset) == digest
+    ):
+        with open(path, "rb") as f:
+            header = f.readline()
+            f.seek(offset)
+            tail = f.read()
+        rows = backend.read(io.BytesIO(header + tail), columns=WATCH_COLUMNS)
+    else:
+        rows = backend.read(path, columns=WATCH_COLUMNS)
+    return rows, read_position(path)
+
+
+def ingest_file(path, raw_dir, backend, index, positions):
+    """Clean, deduplicate and validate the rows of one landed file.
+
+    Rows any file in the fingerprint `index` delivered before are dropped.
+    `positions` maps each file to how far it has been read and is updated.
+    """
+    name = os.path.relpath(path, raw_dir)
+    rows, positions[path] = read_new_rows(path, backend, positions.get(path))
+    rows[PARTITION_COLUMN] = name
+    rows, dedup_report = drop_duplicates(rows, index, source=os.path.abspath(path), append=True)
+    rows, validation_report = validate(rows, source=name)
+    return rows, {'file': name, 'new_rows': len(rows),
+                  'duplicates': dedup_report['rows'] - dedup_report['kept'],
+                  'quarantined': validation_report['quarantined']}
+
+
+def refresh(state, figure_cache, visuals_dir, stages=WATCH_STAGES):
+    """Re-run the watched stages; returns the HTML files rewritten."""
+    ctx = state.context()
+    written = []
+    for name in stages:
+        _, figures = STAGES[name](ctx)
+        written += render(figures, figure_cache, visuals_dir)
+    return written
+
+
+def watch(raw_dir=RAW_DIR, visuals_dir=VISUALS_DIR, interval=POLL_SECONDS, polls=None, cache_dir=CACHE_DIR):
+    """Poll `raw_dir` and refresh the dashboard as files land.
+
+    Runs until interrupted, or for `polls` polls when given.
+    """
+    backend = get_backend("pandas")
+    figure_cache = FigureCache(os.path.join(cache_dir, "figures"))
+    build_dashboard = load_dashboard_builder(visuals_dir)
+
+    # Bootstrap from whatever is already there (cached after the first run)
+    seen = snapshot(raw_dir)
+    df = load_clean(raw_dir, backend, cache_dir=cache_dir, columns=WATCH_COLUMNS)[0] if seen else None
+    state = WatchState(df) if df is not None and len(df) else None
+    # The bootstrap files were recorded in the index when they were ingested
+    index = FingerprintIndex(os.path.join(cache_dir, "dedup"))
+    positions = {path: read_position(path) for path in seen}
+    if state is not None and refresh(state, figure_cache, visuals_dir):
+        build_dashboard()
+    del df
+    print(f"Watching {raw_dir} ({len(seen)} files)")
+
+    pending = {}
+    count = 0
+    while polls is None or count < polls:
+        count += 1
+        time.sleep(interval)
+        current = snapshot(raw_dir)
+        changed = {path: stat for path, stat in current.items() if seen.get(path) != stat}
+
+        # Only ingest files whose size and mtime held still for one poll
+        ready = sorted(path for path, stat in changed.items() if pending.get(path) == stat)
+        pending = {path: stat for path, stat in changed.items() if path not in ready}
+        if not ready:
+            continue
+
+        started = time.perf_counter()
+        for path in ready:
+            rows, report = ingest_file(path, raw_dir, backend, index, positions)
+            seen[path] = current[path]
+            print(report)
+            if not len(rows):
+                continue
+            if state is None:
+                state = WatchState(rows)
+            else:
+                state.add(rows)
+
+        if state is None:
+            continue
+        written = refresh(state, figure_cache, visuals_dir)
+        if written:
+            build_dashboard()
+        print(f"Refreshed {len(written)} figure(s) in {time.perf_counter() - started:.2f}s: {', '.join(written)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Refresh the dashboard as raw files land")
+    parser.add_argument("--raw-dir", default=RAW_DIR, help="directory the exports land in")
+    parser.add_argument("--visuals-dir", default=VISUALS_DIR, help="where figures and dashboard.html go")
+    parser.add_argument("--interval", type=float, default=POLL_SECONDS, help="seconds between polls")
+    args = parser.parse_args()
+
+    try:
+        watch(args.raw_dir, args.visuals_dir, args.interval)
+    except KeyboardInterrupt:
+        pass
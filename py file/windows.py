@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# # Rolling Windows
+#
+# Trailing 7 / 28 / 90-day metrics for every calendar day, built on the daily
+# base of the time rollup (time_rollups.py) rather than on the transactions:
+#
+# - revenue, orders, quantity and discount: one cumulative sum per column, a
+#   window is the difference of two cumulative values
+# - active customers: distinct-count sketches merged over the window with a
+#   running maximum that is O(1) per day whatever the window length
+# - AOV: window revenue / window orders
+#
+# Month-over-month and year-over-year deltas for the KPI cards compare the
+# 28-day window ending on a day with the one 4 weeks and 52 weeks earlier, so
+# weekdays line up. Windows at the start of the data cover fewer days; deltas
+# against them are left out (NaN).
+
+import numpy as np
+import pandas as pd
+
+from money import to_dollars
+from sketches import estimate
+
+
+WINDOWS = (7, 28, 90)
+
+# Window compared by the period-over-period deltas, and the lags used
+DELTA_WINDOW = 28
+LAGS = {'mom': 28, 'yoy': 364}
+
+# KPI card -> rolling metric
+KPI_METRICS = {
+    'total_revenue': 'total_amount',
+    'aov': 'aov',
+    'total_orders': 'orders',
+    'total_customers': 'customers',
+    'total_quantity': 'quantity',
+    'total_discount': 'discount',
+}
+
+
+def window_sums(values, window):
+    """Trailing `window`-day sums of a daily series, from one cumulative sum."""
+    cumulative = np.concatenate([[0], np.cumsum(values)])
+    ends = np.arange(1, len(values) + 1)
+    return cumulative[ends] - cumulative[np.maximum(ends - window, 0)]
+
+
+def window_max(registers, window):
+    """Trailing `window`-row element-wise maximum of a register stack.
+
+    Rows are cut into blocks of `window` rows; a window spans at most two
+    blocks, so its maximum is the suffix maximum of the first block part and
+    the prefix maximum of the second (van Herk / Gil-Werman).
+    """
+    n = len(registers)
+    blocks = -(-n // window)
+    padded = np.zeros((blocks * window, registers.shape[1]), dtype=registers.dtype)
+    padded[:n] = registers
+    shaped = padded.reshape(blocks, window, registers.shape[1])
+    prefix = np.maximum.accumulate(shaped, axis=1).reshape(padded.shape)[:n]
+    suffix = np.maximum.accumulate(shaped[:, ::-1], axis=1)[:, ::-1].reshape(padded.shape)[:n]
+
+    result = prefix.copy()  # the first window - 1 days only reach back to day 0
+    if window <= n:
+        result[window - 1:] = np.maximum(suffix[:n - window + 1], prefix[window - 1:])
+    return result
+
+
+class RollingWindows:
+    """One row per calendar day with its trailing-window metrics."""
+
+    def __init__(self, table, windows=WINDOWS):
+        self.table = table
+        self.windows = windows
+
+    @classmethod
+    def build(cls, timeline, windows=WINDOWS):
+        """Every window from the rollup's daily base (days without sales count as zero)."""
+        days = timeline.days
+        if len(days):
+            days = pd.date_range(days[0], days[-1], freq='D')
+        slots = np.searchsorted(days.asi8, timeline.days.asi8)
+
+        def dense(values):
+            filled = np.zeros((len(days), *values.shape[1:]), dtype=values.dtype)
+            filled[slots] = values
+            return filled
+
+        daily = {col: dense(timeline.sums[col]) for col in ('total_amount', 'order_count', 'quantity', 'discount')}
+        customers = dense(timeline.customers)
+
+        table = pd.DataFrame({'day': days})
+        for window in windows:
+            revenue = window_sums(daily['total_amount'], window)  # cents
+            orders = window_sums(daily['order_count'], window)
+            aov = np.full(len(days), np.nan)
+            np.divide(revenue, orders, out=aov, where=orders > 0)
+
+            table[f'total_amount_{window}d'] = to_dollars(revenue)
+            table[f'orders_{window}d'] = orders.astype('int64')
+            table[f'aov_{window}d'] = to_dollars(aov)
+            table[f'customers_{window}d'] = estimate(window_max(customers, window))
+            table[f'quantity_{window}d'] = window_sums(daily['quantity'], window).astype('int64')
+            table[f'discount_{window}d'] = window_sums(daily['discount'], window)
+        return cls(table, windows)
+
+    def metric(self, name, window):
+        """Daily series of one metric ('total_amount', 'aov', ...) for one window."""
+        return self.table.set_index('day')[f'{name}_{window}d']
+
+    def deltas(self, as_of=None, window=DELTA_WINDOW):
+        """Per KPI card: the window value ending `as_of` (default: last day) and its MoM / YoY change.
+
+        Changes are relative (0.05 = +5%) and NaN when the earlier window is not
+        fully covered by the data or is zero.
+        """
+        if as_of is None:
+            end = len(self.table) - 1
+        else:
+            end = int(self.table['day'].searchsorted(pd.Timestamp(as_of), side='right')) - 1
+
+        result = {}
+        for kpi, name in KPI_METRICS.items():
+            values = self.table[f'{name}_{window}d'].to_numpy(dtype='float64')
+            value = values[end] if end >= 0 else np.nan
+            result[kpi] = {'value': float(value)}
+            for change, lag in LAGS.items():
+                earlier = end - lag
+                previous = values[earlier] if earlier >= window - 1 else np.nan
+                result[kpi][change] = float(value / previous - 1) if previous else np.nan
+        return result
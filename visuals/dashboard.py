@@ -6,13 +6,6 @@ visuals_folder = "."
 # Path for the combined dashboard
 combined_file = "dashboard.html"
 
-# Automatically find all .html files except the dashboard itself
-html_files = [f for f in os.listdir(visuals_folder) if f.endswith(".html") and f != combined_file]
-
-if not html_files:
-    print("⚠️ No HTML files found in the folder!")
-    exit()
-
 # Base HTML with dark theme and grid layout
 base_html = """
 <!DOCTYPE html>
@@ -33,18 +26,32 @@ base_html = """
 <div class="grid-container">
 """
 
-# Write the base HTML
-with open(combined_file, "w", encoding="utf-8") as f:
-    f.write(base_html)
 
-# Add each figure as an iframe
-for file in html_files:
-    iframe_html = f'<div class="grid-item"><iframe src="{file}"></iframe></div>\n'
-    with open(combined_file, "a", encoding="utf-8") as f:
-        f.write(iframe_html)
+def build_dashboard(visuals_folder=visuals_folder, combined_file=combined_file):
+    """Combine every figure HTML of `visuals_folder` into one grid page.
+
+    Returns the dashboard path, or None when there are no figures yet.
+    """
+    # Automatically find all .html files except the dashboard itself
+    html_files = sorted(f for f in os.listdir(visuals_folder) if f.endswith(".html") and f != combined_file)
+
+    if not html_files:
+        print("⚠️ No HTML files found in the folder!")
+        return None
+
+    # Add each figure as an iframe
+    items = "".join(f'<div class="grid-item"><iframe src="{file}"></iframe></div>\n' for file in html_files)
+
+    # Write to a temporary file first so a browser never sees a half-written page
+    path = os.path.join(visuals_folder, combined_file)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        f.write(base_html + items + "</div>\n</body>\n</html>")
+    os.replace(path + ".tmp", path)
+
+    print(f"✅ Dashboard created: {path}")
+    return path
 
-# Close HTML tags
-with open(combined_file, "a", encoding="utf-8") as f:
-    f.write("</div>\n</body>\n</html>")
 
-print(f"✅ Dashboard created: {combined_file}")
\ No newline at end of file
+if __name__ == "__main__":
+    if build_dashboard() is None:
+        exit()